@@ -1,36 +1,49 @@
 
 import argparse
+import os
+import socket
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
-from utils import network_utils
+from classes.server.SessionRecorder import SessionRecorder
+from utils import file_utils, network_utils
 
-LOCAL_IP = network_utils.get_local_ip()
-TCP_PORT = network_utils.get_random_available_port()
+# Port of the test server when none is requested (the one the IDE and older configs expect)
+DEFAULT_HTTP_PORT = 8080
 
-DEFAULT_CONFIG = {
+def get_default_config() -> dict[str, Any]:
+    """
+    Returns the project configuration injected by the launcher (computed on demand, finding the
+    local ip address opens a socket, see 'network_utils.get_local_ip').
+    """
+    local_ip = network_utils.get_local_ip()
+    return {
 
-    # Configuration Injection
-    "Logger.level": 10,
+        # Configuration Injection
+        "Logger.level": 10,
 
-    "HttpPublisher.ip": LOCAL_IP,
-    "HttpPublisher.port": 8080,
-    "HttpPublisher.endpoint": "tests",
+        "HttpPublisher.ip": local_ip,
+        "HttpPublisher.port": DEFAULT_HTTP_PORT,
+        "HttpPublisher.endpoint": "tests",
 
-    # Internal
-    "$$parameters$$.run_name": "xUnit Tests",
+        # Internal
+        "$$parameters$$.run_name": "xUnit Tests",
 
-    "$$parameters$$.remote_server": False,
-    "$$parameters$$.remote_server_address": LOCAL_IP,
-    "$$parameters$$.remote_server_port": TCP_PORT,
+        "$$parameters$$.remote_server": False,
+        "$$parameters$$.remote_server_address": local_ip,
 
-    "$$parameters$$.test_server_address": LOCAL_IP,
-    "$$parameters$$.test_server_port": 8080,
-}
+        "$$parameters$$.test_server_address": local_ip,
+        "$$parameters$$.test_server_port": DEFAULT_HTTP_PORT,
+    }
 
 class BaseCommand:
     def __init__(self, args: argparse.Namespace):
         self.args = args
+        self.run_id: Optional[str] = None
+
+        # Listening sockets reserved for the servers of this invocation (see 'reserve_socket')
+        self.sockets: dict[str, socket.socket] = {}
 
     @classmethod
     def register_command(cls, subparsers: argparse._SubParsersAction):
@@ -44,3 +57,97 @@ class BaseCommand:
 
     def get_root_folder(self) -> Path:
         return self.args.base_folder
+
+    @staticmethod
+    def add_run_arguments(parser: argparse.ArgumentParser, http_port: int = 0):
+        """
+        Adds the options that keep concurrent launcher invocations on the same host apart.
+
+        Args:
+            http_port (int): The default test server port (0 picks a free one).
+        """
+        parser.add_argument('-rid', '--run-id', type=str, default=None, help='Keeps the workspace and results of this invocation apart from concurrent ones, under "workspace/runs/<RUN_ID>" and "results/<RUN_ID>" ("auto" generates one)')
+        parser.add_argument('-hp', '--http-port', type=int, default=http_port, help=f'The port of the test server, written into the project config (default: {http_port or "a free port"})')
+
+    def get_run_id(self) -> Optional[str]:
+        """
+        Returns the id of this invocation, None when it's not namespaced (the shared folders are used).
+        """
+        if self.run_id is None:
+            run_id = getattr(self.args, 'run_id', None)
+            if run_id == 'auto':
+                run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+            self.run_id = run_id
+        return self.run_id
+
+    def get_workspace_folder(self) -> Path:
+        run_id = self.get_run_id()
+        workspace = self.get_root_folder() / 'workspace'
+        return workspace / 'runs' / run_id if run_id else workspace
+
+    def get_results_folder(self) -> Path:
+        run_id = self.get_run_id()
+        results = self.get_root_folder() / 'results'
+        return results / run_id if run_id else results
+
+    def reserve_socket(self, name: str, port: int = 0) -> socket.socket:
+        """
+        Returns the listening socket of one of the servers (reserved on first use, port 0 picks a free one).
+        The servers are handed the socket itself, so the port written into the project config can't be
+        taken by another process before they start, and every target of the run is served on the same port.
+        """
+        if name not in self.sockets:
+            self.sockets[name] = network_utils.reserve_port(network_utils.get_local_ip(), port)
+        return self.sockets[name]
+
+    def get_http_socket(self) -> socket.socket:
+        """Returns the socket of the test server ('--http-port', 0 picks a free port)."""
+        return self.reserve_socket('http', getattr(self.args, 'http_port', DEFAULT_HTTP_PORT))
+
+    def get_remote_socket(self, project: Optional[str] = None) -> socket.socket:
+        """Returns the socket of the remote control server (always a free port, one per project of a batch)."""
+        return self.reserve_socket(f'remote:{project}' if project else 'remote')
+
+    def get_http_port(self) -> int:
+        return self.get_http_socket().getsockname()[1]
+
+    def get_remote_port(self, project: Optional[str] = None) -> int:
+        return self.get_remote_socket(project).getsockname()[1]
+
+    def close_sockets(self):
+        for sock in self.sockets.values():
+            sock.close()
+        self.sockets.clear()
+
+    def get_default_config(self, project: Optional[str] = None) -> dict[str, Any]:
+        """
+        Returns the project configuration injected by the launcher, pointing at this invocation's servers
+        (the test server is shared, each project of a batch gets its own remote control server).
+        """
+        return {
+            **get_default_config(),
+            "HttpPublisher.port": self.get_http_port(),
+            "$$parameters$$.test_server_port": self.get_http_port(),
+            "$$parameters$$.remote_server_port": self.get_remote_port(project),
+        }
+
+    def prepare_project(self, project_yyp: Path) -> Path:
+        """
+        Returns the project to build. Runs patch the project (config.json and options), so a namespaced
+        run works on a copy in its workspace instead of the shared project folder.
+        """
+        if self.get_run_id() is None:
+            return project_yyp
+
+        destination = self.get_workspace_folder() / 'projects' / project_yyp.parent.name
+        file_utils.copy_folder(project_yyp.parent, destination, True)
+        return destination / project_yyp.name
+
+    def get_recorder(self, run_name: str) -> Optional[SessionRecorder]:
+        """
+        Returns a session recorder for the given run (only when '--record-session' is provided).
+        """
+        folder = getattr(self.args, 'record_session', None)
+        if not folder:
+            return None
+        return SessionRecorder(self.get_root_folder() / folder / f"{run_name.replace(':', '_')}.ndjson.gz")
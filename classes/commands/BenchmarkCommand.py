@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import aiohttp
+
+from classes.commands.BaseCommand import BaseCommand
+from classes.model.TestResult import TestResult
+from classes.server import RemoteProtocol, SessionRecorder, SimulatedRunner
+from classes.server.RemoteControlServer import ExecutionMode, RemoteControlServer
+from classes.server.RemoteProtocol import Capability
+from classes.server.TestFrameworkServer import TestFrameworkServer
+from utils import bench_utils, data_utils, file_utils, network_utils
+from utils.logging_utils import LOGGER
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Command class for running the launcher micro benchmarks. These don't require a
+    GameMaker install and work on synthetic (but realistic) result payloads, the server
+    benchmarks talk to a simulated runner (see 'simulateRunner') over the real TCP protocol.
+    """
+
+    BENCHMARKS = ['compression', 'encoding', 'server', 'recovery', 'startup']
+
+    # Launcher invocations measured by the 'startup' benchmark (name: arguments)
+    STARTUP_COMMANDS = {
+        'help': ['--help'],
+        'runServer': ['runServer', '--help'],
+    }
+
+    # Protocol configurations measured by the 'server' benchmark
+    SERVER_CONFIGS = {
+        'plain': [],
+        'binary_zlib': [Capability.BINARY, Capability.ZLIB],
+        'multiplex': [Capability.BINARY, Capability.ZLIB, Capability.MULTIPLEX],
+    }
+
+    @classmethod
+    def register_command(cls, subparsers: argparse._SubParsersAction):
+        """
+        Registers the 'benchmark' command with the argument parser.
+
+        Args:
+            subparsers (argparse._SubParsersAction): The subparsers action from argparse to add the command to.
+        """
+        parser: argparse.ArgumentParser = subparsers.add_parser('benchmark', help='Runs the launcher benchmarks (no GameMaker install required)')
+        parser.add_argument('-b', '--benchmarks', type=str, default=','.join(cls.BENCHMARKS), help=f'A comma separated list of benchmarks to run (available: {cls.BENCHMARKS})')
+        parser.add_argument('-n', '--test-count', type=int, default=2000, help='The number of synthetic test results to use (default: 2000)')
+        parser.add_argument('-fr', '--failure-rate', type=float, default=0.1, help='The ratio of failed tests in the synthetic results (default: 0.1)')
+        parser.add_argument('-d', '--duration-ms', type=float, default=1, help='How long each simulated test takes, in milliseconds (default: 1)')
+        parser.add_argument('-mif', '--max-in-flight', type=int, default=8, help='Maximum number of async tests in flight for the multiplexed server benchmark (default: 8)')
+        parser.add_argument('-cr', '--crash-rate', type=float, default=0.005, help='The ratio of simulated tests that crash the runner in the recovery benchmark (default: 0.005)')
+        parser.add_argument('-hr', '--hang-rate', type=float, default=0.001, help='The ratio of simulated tests that hang the runner in the recovery benchmark (default: 0.001)')
+        parser.add_argument('-ht', '--hang-timeout', type=float, default=1, help='Seconds before a hanging runner is killed in the recovery benchmark (default: 1)')
+        parser.add_argument('-sr', '--startup-runs', type=int, default=5, help='How many times each launcher invocation is timed in the startup benchmark, the fastest one is kept (default: 5)')
+        parser.add_argument('-shb', '--startup-help-budget-ms', type=float, default=400, help="The startup budget of 'launcher.py --help' in milliseconds, the benchmark fails above it (default: 400)")
+        parser.add_argument('-ssb', '--startup-server-budget-ms', type=float, default=1200, help="The startup budget of 'launcher.py runServer' in milliseconds, the benchmark fails above it (default: 1200)")
+        parser.add_argument('-o', '--output-file', type=str, default='benchmark.json', help='The path to the JSON file where the report is written')
+        parser.set_defaults(command_class=cls)
+
+    async def execute(self):
+        """
+        Executes the requested benchmarks and writes a report that can be compared between versions.
+        """
+        names: list[str] = self.get_argument('benchmarks').split(',')
+
+        report = {}
+        for name in names:
+            if name not in self.BENCHMARKS:
+                LOGGER.error(f"Unknown benchmark '{name}' (available: {self.BENCHMARKS})")
+                continue
+
+            LOGGER.info(f"Running benchmark '{name}'")
+            report[name] = await getattr(self, f'benchmark_{name}')()
+            LOGGER.info(f"Benchmark '{name}': {json.dumps(report[name])}")
+
+        file_utils.save_data_as_json(report, self.get_root_folder() / self.get_argument('output_file'))
+
+        if not report.get('startup', {}).get('within_budget', True):
+            LOGGER.error('The launcher startup is over budget')
+            sys.exit(1)
+
+    def get_records(self) -> list[dict]:
+        return bench_utils.generate_result_records(self.get_argument('test_count'), self.get_argument('failure_rate'))
+
+    async def benchmark_compression(self) -> dict:
+        """
+        Measures the size reduction of compressed result payloads, both for the TCP channel
+        (one compressed frame per test) and for the /tests HTTP endpoint (a single document).
+        Both are decoded back through the real server paths, the benchmark fails on a mismatch.
+        """
+        records = self.get_records()
+        payloads = [json.dumps(record).encode() for record in records]
+        document = json.dumps({ 'data': { 'run_name': 'benchmark', 'results': records } }).encode()
+
+        plain_frames = [RemoteProtocol.encode_frame(payload) for payload in payloads]
+        zlib_frames = [RemoteProtocol.encode_frame(payload, compressed=True) for payload in payloads]
+
+        plain_size = sum(len(frame) for frame in plain_frames)
+        zlib_size = sum(len(frame) for frame in zlib_frames)
+        gzip_size = len(gzip.compress(document))
+        deflate_size = len(zlib.compress(document))
+
+        # Round trip through the decoders the servers actually use (a mismatch fails the benchmark)
+        start = time.perf_counter()
+        decoded = await self.read_frames(zlib_frames)
+        decode_time = time.perf_counter() - start
+        if decoded != payloads:
+            raise RuntimeError('The compressed TCP frames were not decoded back to their payloads')
+
+        with tempfile.TemporaryDirectory() as folder:
+            deflate_time = await self.post_results(document, 'deflate', len(records), Path(folder))
+            gzip_time = await self.post_results(document, 'gzip', len(records), Path(folder))
+
+        return {
+            'tests': len(records),
+            'tcp': {
+                'plain_bytes': plain_size,
+                'zlib_bytes': zlib_size,
+                'reduction': round(1 - zlib_size / plain_size, 4),
+                'decode_seconds': round(decode_time, 6),
+            },
+            'http': {
+                'plain_bytes': len(document),
+                'gzip_bytes': gzip_size,
+                'deflate_bytes': deflate_size,
+                'gzip_reduction': round(1 - gzip_size / len(document), 4),
+                'deflate_reduction': round(1 - deflate_size / len(document), 4),
+                'gzip_post_seconds': round(gzip_time, 6),
+                'deflate_post_seconds': round(deflate_time, 6),
+            },
+        }
+
+    @staticmethod
+    async def read_frames(frames: list[bytes]) -> list[bytes]:
+        """
+        Decodes frames as the remote control server does (see 'RemoteProtocol.read_frame').
+        """
+        reader = asyncio.StreamReader()
+        reader.feed_data(b''.join(frames))
+        reader.feed_eof()
+        return [(await RemoteProtocol.read_frame(reader)).payload for _ in frames]
+
+    @staticmethod
+    async def post_results(document: bytes, encoding: str, expected: int, folder: Path) -> float:
+        """
+        Posts a results document to the /tests endpoint of a local TestFrameworkServer with the given
+        'Content-Encoding' and checks every record was received.
+
+        Returns:
+            float: The time (in seconds) until the receipt was returned.
+        """
+        body = gzip.compress(document) if encoding == 'gzip' else zlib.compress(document)
+
+        server = TestFrameworkServer(output_path=folder)
+        with network_utils.reserve_port('127.0.0.1') as sock:
+            await server.start(sock=sock)
+            try:
+                async with aiohttp.ClientSession() as session:
+                    start = time.perf_counter()
+                    async with session.post(f'http://127.0.0.1:{sock.getsockname()[1]}/tests', data=body, headers={ 'Content-Type': 'application/json', 'Content-Encoding': encoding }) as response:
+                        receipt = await response.json() if response.status == 202 else { 'error': await response.text() }
+                    elapsed = time.perf_counter() - start
+            finally:
+                await server.stop()
+
+        if receipt.get('received') != expected:
+            raise RuntimeError(f"The {encoding} results post was not decoded back to its {expected} records: {receipt}")
+        return elapsed
+
+    async def benchmark_encoding(self) -> dict:
+        """
+        Compares the server side decoding of binary result records against the JSON path
+        (both only decoding and decoding plus building the result model).
+        """
+        records = self.get_records()
+        json_payloads = [json.dumps(record) for record in records]
+        binary_payloads = [RemoteProtocol.encode_record(record)[RemoteProtocol.FRAME_HEADER.size:] for record in records]
+
+        json_decode = bench_utils.measure(lambda: [data_utils.json_parse(payload) for payload in json_payloads])
+        binary_decode = bench_utils.measure(lambda: [RemoteProtocol.decode_record(payload) for payload in binary_payloads])
+
+        json_model = bench_utils.measure(lambda: [TestResult(**data_utils.json_parse(payload)['details']) for payload in json_payloads])
+        binary_model = bench_utils.measure(lambda: [TestResult(**RemoteProtocol.decode_record(payload)['details']) for payload in binary_payloads])
+
+        json_size = sum(len(payload) + 1 for payload in json_payloads)
+        binary_size = sum(len(payload) + RemoteProtocol.FRAME_HEADER.size for payload in binary_payloads)
+
+        return {
+            'tests': len(records),
+            'json_bytes': json_size,
+            'binary_bytes': binary_size,
+            'reduction': round(1 - binary_size / json_size, 4),
+            'json_decode_seconds': round(json_decode, 6),
+            'binary_decode_seconds': round(binary_decode, 6),
+            'json_model_seconds': round(json_model, 6),
+            'binary_model_seconds': round(binary_model, 6),
+        }
+
+    async def run_simulated_session(self, capabilities: list[Capability], folder: Path) -> tuple[float, list[dict]]:
+        """
+        Runs the remote control server against an in-process simulated runner.
+
+        Returns:
+            tuple[float, list[dict]]: The wall time of the run (in seconds) and the recorded session.
+        """
+        tests = SimulatedRunner.generate_tests(
+            self.get_argument('test_count'),
+            duration=self.get_argument('duration_ms') / 1000,
+            failure_rate=self.get_argument('failure_rate'),
+            async_rate=0.5)
+
+        max_in_flight = self.get_argument('max_in_flight') if Capability.MULTIPLEX in capabilities else 1
+        recorder = SessionRecorder.SessionRecorder(folder / 'session.ndjson.gz')
+        server = RemoteControlServer(ExecutionMode.AUTOMATIC, run_name='benchmark', capabilities=capabilities, max_in_flight=max_in_flight, recorder=recorder, output_path=folder)
+        runner = SimulatedRunner.SimulatedRunner(tests)
+
+        with network_utils.reserve_port('127.0.0.1') as sock:
+            port = sock.getsockname()[1]
+            start = time.perf_counter()
+            await asyncio.gather(server._serve('127.0.0.1', port, sock), runner.run('127.0.0.1', port))
+            elapsed = time.perf_counter() - start
+
+        recorder.close()
+        return elapsed, SessionRecorder.load_session(recorder.path)
+
+    async def benchmark_server(self) -> dict:
+        """
+        Measures the throughput of the remote control server (tests per second) and the overhead
+        of each command (round trip minus the simulated test duration) for each protocol configuration.
+        """
+        duration = self.get_argument('duration_ms') / 1000
+        report = { 'tests': self.get_argument('test_count'), 'test_duration_ms': self.get_argument('duration_ms') }
+
+        for name, capabilities in self.SERVER_CONFIGS.items():
+            with tempfile.TemporaryDirectory() as folder:
+                elapsed, session = await self.run_simulated_session(capabilities, Path(folder))
+
+            round_trips = SessionRecorder.get_round_trips(session)
+            overheads = { command: [max(value - duration, 0) if command == 'RUN' else value for value in values] for command, values in round_trips.items() }
+
+            report[name] = {
+                'seconds': round(elapsed, 6),
+                'tests_per_second': round(self.get_argument('test_count') / elapsed, 2),
+                'overhead': { command: bench_utils.summarize(values) for command, values in overheads.items() },
+            }
+
+        return report
+
+    async def benchmark_recovery(self) -> dict:
+        """
+        Measures how long it takes to recover from runner crashes and hangs, running the simulated
+        runner as a real (monitored and restarted) process.
+        """
+        sock = network_utils.reserve_port('127.0.0.1')
+        port = sock.getsockname()[1]
+        args = ['launcher.py', 'simulateRunner',
+            '--host', '127.0.0.1',
+            '--port', str(port),
+            '--test-count', str(self.get_argument('test_count')),
+            '--failure-rate', str(self.get_argument('failure_rate')),
+            '--crash-rate', str(self.get_argument('crash_rate')),
+            '--hang-rate', str(self.get_argument('hang_rate'))]
+
+        with sock, tempfile.TemporaryDirectory() as folder:
+            recorder = SessionRecorder.SessionRecorder(Path(folder) / 'session.ndjson.gz')
+            server = RemoteControlServer(ExecutionMode.AUTOMATIC, timeout=self.get_argument('hang_timeout') / 60, run_name='benchmark', recorder=recorder, output_path=Path(folder))
+
+            start = time.perf_counter()
+            await server.serve_or_wait_for_space(sys.executable, args, interactive=False, sock=sock)
+            elapsed = time.perf_counter() - start
+
+            session = SessionRecorder.load_session(recorder.path)
+
+        tests = SimulatedRunner.generate_tests(self.get_argument('test_count'), crash_rate=self.get_argument('crash_rate'), hang_rate=self.get_argument('hang_rate'))
+
+        return {
+            'tests': len(tests),
+            'crashes': sum(test.crash for test in tests),
+            'hangs': sum(test.hang for test in tests),
+            'hang_timeout_seconds': self.get_argument('hang_timeout'),
+            'seconds': round(elapsed, 6),
+            'recovery': bench_utils.summarize(SessionRecorder.get_recovery_latencies(session)),
+        }
+
+    async def benchmark_startup(self) -> dict:
+        """
+        Measures how long the launcher takes to start (wall time and import time, fastest of a few runs)
+        and checks it against the startup budgets. The slowest top level imports are reported.
+        """
+        budgets = { 'help': self.get_argument('startup_help_budget_ms'), 'runServer': self.get_argument('startup_server_budget_ms') }
+        report = { 'runs': self.get_argument('startup_runs') }
+
+        for name, args in self.STARTUP_COMMANDS.items():
+            best = None
+            for _ in range(self.get_argument('startup_runs')):
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(sys.executable, '-X', 'importtime', 'launcher.py', *args, cwd=self.get_root_folder(), stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+                _, stderr = await process.communicate()
+                elapsed = time.perf_counter() - start
+
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, stderr.decode('utf-8', errors='replace'))
+
+            elapsed, output = best
+            import_seconds, imports = bench_utils.parse_import_times(output)
+            slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:5]
+
+            report[name] = {
+                'seconds': round(elapsed, 6),
+                'import_seconds': round(import_seconds, 6),
+                'budget_ms': budgets[name],
+                'within_budget': elapsed * 1000 <= budgets[name],
+                'slowest_imports_ms': { module: round(seconds * 1000, 3) for module, seconds in slowest },
+            }
+            if not report[name]['within_budget']:
+                LOGGER.warning(f"Starting 'launcher.py {' '.join(args)}' took {elapsed * 1000:.0f}ms (budget: {budgets[name]:.0f}ms)")
+
+        report['within_budget'] = all(report[name]['within_budget'] for name in self.STARTUP_COMMANDS)
+        return report
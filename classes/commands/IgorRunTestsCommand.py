@@ -1,10 +1,11 @@
 
+import asyncio
 from functools import partial
+import hashlib
 from pathlib import Path
 import re
 import argparse
 import subprocess
-import time
 from typing import Any, Optional, Tuple
 import requests
 import zipfile
@@ -14,12 +15,17 @@ import os
 import shutil
 import platform
 
-from classes.commands.BaseCommand import DEFAULT_CONFIG, TCP_PORT, BaseCommand
+from classes.commands.BaseCommand import BaseCommand
+from classes.commands.IndexTestsCommand import get_test_index
+from classes.devices.AndroidEmulator import AndroidEmulator, SNAPSHOT_QUICKBOOT
+from classes.devices.DevicePool import DevicePool
 from classes.server.RemoteControlServer import (RemoteControlServer, ExecutionMode)
+from classes.server import RemoteProtocol
 from classes.server.TestFrameworkServer import manage_server
-from utils import async_utils, file_utils, logging_utils, network_utils
+from utils import async_utils, cache_utils, crash_utils, data_utils, file_utils, logging_utils, network_utils, shard_utils, stage_utils
 from utils.logging_utils import LOGGER
 from utils.path_utils import ROOT_DIR
+from utils.trace_utils import TRACER
 
 REDACTED_WORDS = ['-ak=', 'access-key']
 REDACTED_MESSAGE = "<redacted to prevent exposure of sensitive data>"
@@ -37,30 +43,57 @@ DRIVER_DOWNLOAD_BASE_URL = 'https://chromedriver.storage.googleapis.com/'
 
 USER_DIR = ROOT_DIR / 'user'
 PROJECTS_DIR = ROOT_DIR / 'projects'
-WORKSPACE_DIR = ROOT_DIR / 'workspace'
 
 PROJECT_SCRIPT_PATH = PROJECTS_DIR / 'upgrade_project.bat'
 
-IGOR_DIR = WORKSPACE_DIR / 'igor'
-CACHE_DIR = WORKSPACE_DIR / 'cache'
-TEMP_DIR = WORKSPACE_DIR / 'temp'
-OUTPUT_DIR = WORKSPACE_DIR / 'output'
-TEMP_FILE = OUTPUT_DIR / 'xUnit.win'
-TARGET_FILE = OUTPUT_DIR / 'xUnit.zip'
-RUNTIME_DIR = WORKSPACE_DIR / 'runtime'
 
-IGOR_PATH = IGOR_DIR / 'igor.exe'
+# Installed runtimes are kept between runs (by version, see 'get_runtime_store')
+RUNTIME_STORE_DIR = cache_utils.CACHE_ROOT / 'runtimes'
+
+# Igor's incremental compile caches are kept between runs (by project, platform, runner and runtime)
+COMPILE_CACHE_DIR = cache_utils.CACHE_ROOT / 'compile'
 
 SANDBOXED_PLATFORMS = ['windows', 'mac', 'linux']
 
+# The device of the desktop platforms that is the machine running the launcher (the projects of a batch run on it at once)
+LOCAL_DEVICE = 'local'
+
 class IgorRunTestsCommand(BaseCommand):
     
     def __init__(self, options: argparse.Namespace):
         BaseCommand.__init__(self, options)
 
+        # Shared cache entries in use by this run (released once it ends)
+        self.leases: list[Tuple[cache_utils.LruStore, str]] = []
+
+        # The emulator booted (or reused) for the android targets
+        self.android_emulator: Optional[AndroidEmulator] = None
+
+        # The original path of the projects copied into the workspace (see 'prepare_project')
+        self.project_sources: dict[Path, Path] = {}
+
+        # The remote control servers of the runs in progress (by project)
+        self.remote_servers: dict[str, RemoteControlServer] = {}
+
+        # Folders of this invocation (see 'get_workspace_folder'), nothing here is shared with concurrent runs
+        self.workspace_dir = self.get_workspace_folder()
+        self.user_dir = self.workspace_dir / 'user' if self.get_run_id() else USER_DIR
+        self.igor_dir = self.workspace_dir / 'igor'
+        self.igor_path = self.igor_dir / 'igor.exe'
+        self.temp_dir = self.workspace_dir / 'temp'
+        self.output_dir = self.workspace_dir / 'output'
+
     @classmethod
     def register_command(cls, subparsers: argparse._SubParsersAction):
         parser: argparse.ArgumentParser = subparsers.add_parser('igorRunTests', help='Runs the testframework and collects all results')
+        cls.add_arguments(parser)
+        parser.set_defaults(command_class=cls)
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser):
+        """
+        Adds the options of an igor run (also used by the commands built on it, see 'watch').
+        """
 
         # Auxiliary function that validates a list of targets (platform|device,platform|device,...)
         def validate_targets(input) -> str:
@@ -113,8 +146,18 @@ class IgorRunTestsCommand(BaseCommand):
                 raise argparse.ArgumentTypeError(f"Invalid project path provided. This path can be relative or absolute but must exist.")
             return resolved_path
 
-        parser.add_argument('-p', '--project-path', type=validate_yyp, required=True, help=f'The path to the project to be executed (.yyp).')
-        parser.add_argument('-t', '--targets', type=validate_targets, required=False, default='windows|Local', help=f'A comma separated list of "platform|config" pairs to run the framework on (default: windows|local)')
+        # Auxiliary function that validates a list of paths to yyps (path,path,...)
+        def validate_projects(input) -> list[Path]:
+            projects = [validate_yyp(path.strip()) for path in input.split(',')]
+            # Each project gets a workspace folder named after its own
+            names = [project.parent.name for project in projects]
+            if len(set(names)) != len(names):
+                raise argparse.ArgumentTypeError(f"Invalid project paths provided. The projects of a batch must be in folders with different names.")
+            return projects
+
+        parser.add_argument('-p', '--project-path', type=validate_projects, required=True, help=f'The path to the project to be executed (.yyp), a comma separated list runs a batch of projects sharing the setup, runtime and test server')
+        parser.add_argument('-pp', '--parallel-projects', type=int, default=2, help='How many projects of a batch are built and run at once (default: 2)')
+        parser.add_argument('-t', '--targets', type=validate_targets, required=False, default='windows|Local', help=f'A comma separated list of "platform|config" pairs to run the framework on, a platform listed with several devices shares its tests between them (default: windows|local)')
         parser.add_argument('-r', '--runners', type=validate_runners, required=False, default='vm', help=f'Runner(s) to run the test on (default: vm)')
         parser.add_argument('-f', '--feed', type=str, required=False, default='https://gms.yoyogames.com/Zeus-Runtime-NuBeta.rss', help=f'RSS feed to use (default: Beta)')
         parser.add_argument('-uf', '--user-folder', type=partial(validate_path, arg='--user-folder'), required=True, help='The path to the GameMaker\' user folder')
@@ -122,119 +165,140 @@ class IgorRunTestsCommand(BaseCommand):
         parser.add_argument('-rv', '--runtime-version', type=validate_version, default=None, help='Runner version to use (default: <latest>)')
         parser.add_argument('-rn', '--run-name', default='xUnit', help='The name to be given to the test run')
         parser.add_argument('-h5r', '--html5-runner', type=partial(validate_path, arg='--html5-runner', required=False), required=False, help='A custom HTML5 runner to use instead of the runtime one')
-
-        parser.set_defaults(command_class=cls)
+        parser.add_argument('-cmp', '--compression', choices=['none', 'zlib'], default='none', help='Compression to negotiate for the results sent by the runner (default: none)')
+        parser.add_argument('-re', '--result-encoding', choices=['json', 'binary'], default='json', help='Encoding to negotiate for the test results sent by the runner (default: json)')
+        parser.add_argument('-mif', '--max-in-flight', type=int, default=1, help='Maximum number of async tests running at once on the runner (default: 1, no multiplexing)')
+        parser.add_argument('-sh', '--shard', type=shard_utils.validate_shard, default=None, help='Only run a shard of the tests, as "<INDEX>/<COUNT>" (ie.: 3/8)')
+        parser.add_argument('-shs', '--shard-strategy', choices=shard_utils.SHARD_STRATEGIES, default='hash', help='How tests are assigned to shards (default: hash)')
+        parser.add_argument('-shd', '--shard-durations', type=str, default=None, help='A result JSON file (or folder) with previous durations, used by the duration strategy')
+        parser.add_argument('-crh', '--crash-history', type=str, default=str(crash_utils.CRASH_HISTORY_DIR), help=f'The folder where the tests that crashed the runner are remembered (per target), they run last and alone in the next runs ("none" disables, default: {crash_utils.CRASH_HISTORY_DIR})')
+        parser.add_argument('-mrd', '--max-restart-delay', type=float, default=crash_utils.DEFAULT_MAX_RESTART_DELAY, help=f'The longest wait before restarting a runner that exits before running a test, in seconds (the wait doubles on each such exit, default: {crash_utils.DEFAULT_MAX_RESTART_DELAY})')
+        parser.add_argument('-cll', '--crash-loop-limit', type=int, default=crash_utils.DEFAULT_CRASH_LOOP_LIMIT, help=f'The remaining tests are failed once the runner exited this many times in a row before running a test (default: {crash_utils.DEFAULT_CRASH_LOOP_LIMIT}, 0 never gives up)')
+        parser.add_argument('-de', '--debug-endpoints', type=data_utils.validate_bool, default=False, help='Adds the /debug endpoints (profiling, memory diffs and asyncio task counts) to the test server (default: false)')
+        parser.add_argument('-trf', '--trace-file', type=str, default=None, help='Writes a Chrome trace (Perfetto) JSON file with the timings of every stage and test of the run')
+        BaseCommand.add_run_arguments(parser)
+        parser.add_argument('-rst', '--runtime-store', type=str, default=str(RUNTIME_STORE_DIR), help=f'The folder where installed runtimes are kept between runs (default: {RUNTIME_STORE_DIR})')
+        parser.add_argument('-rsb', '--runtime-store-budget', type=float, default=20, help='The disk budget of the runtime store in GB, least recently used runtimes are removed past it (default: 20)')
+        parser.add_argument('-cc', '--compile-cache', type=str, default=str(COMPILE_CACHE_DIR), help=f'The folder where igor compile caches are kept between runs, making repeated YYC builds incremental (default: {COMPILE_CACHE_DIR})')
+        parser.add_argument('-ccb', '--compile-cache-budget', type=float, default=10, help='The disk budget of the compile caches in GB, least recently used ones are removed past it (default: 10)')
+        parser.add_argument('-fct', '--feed-cache-ttl', type=float, default=600, help='How long runtime feed lookups are cached, in seconds (default: 600, 0 disables the cache)')
+        parser.add_argument('-avd', '--emulator-avd', type=str, default=None, help='The Android Virtual Device to run the android tests on (default: the first one)')
+        parser.add_argument('-esn', '--emulator-snapshot', type=str, default=SNAPSHOT_QUICKBOOT, help=f'How the emulator boots: "{SNAPSHOT_QUICKBOOT}" (from the quickboot snapshot), "cold" or the name of a snapshot to load (default: {SNAPSHOT_QUICKBOOT})')
+        parser.add_argument('-eka', '--emulator-keep-alive', type=data_utils.validate_bool, default=False, help='Leaves the emulator running after the run, the next runs reuse it instead of booting (default: false)')
+        parser.add_argument('-ehl', '--emulator-headless', type=data_utils.validate_bool, default=False, help='Runs the emulator without window, audio and boot animation (default: false)')
+        parser.add_argument('-ebt', '--emulator-boot-timeout', type=float, default=300, help='How long to wait for the emulator to boot, in seconds (default: 300)')
+        parser.add_argument('-adb', '--adb-path', type=str, default=None, help='The adb executable to use (default: the one of the Android SDK)')
+        parser.add_argument('-emp', '--emulator-path', type=str, default=None, help='The emulator executable to use (default: the one of the Android SDK)')
+        parser.add_argument('-rs', '--record-session', type=str, default=None, help='A folder where the runner sessions are recorded (one "<run name>.ndjson.gz" per run), they can be replayed with simulateRunner')
 
     def get_runners(self, ) -> list[str]:
         runners = self.get_argument('runners')
         # Create a list by splitting each runner
         return list(map(str.upper, runners.split(',')))
 
-    def get_targets(self) -> dict[str, str]:
-        # Execute igor to install the requested runtime version
+    def get_targets(self) -> list[Tuple[str, str]]:
         targets: str = self.get_argument('targets')
         # Split the string into key-value pairs
         pairs = targets.split(',')
-        # Create a dictionary by splitting each pair into a key and a value
-        return dict(pair.split('|') for pair in pairs)
+        # Split each pair into a platform and a device (a platform can be listed with several devices)
+        return [tuple(pair.split('|', 1)) for pair in pairs]
 
     async def execute(self):
 
         # Configure logging
         logging_utils.config_logger()
 
-        # Clean workspace
-        self.remove_directory(USER_DIR)
-        self.remove_directory(WORKSPACE_DIR)
-
-        self.ensure_directories_exist([ CACHE_DIR, OUTPUT_DIR, ROOT_DIR / 'results' ])
-
-        # Download and extract igor
-        self.download_and_extract(IGOR_URL, IGOR_DIR)
-        assert(IGOR_PATH.exists())
+        trace_file: Optional[str] = self.get_argument('trace_file')
+        if trace_file:
+            TRACER.start(self.get_root_folder() / trace_file)
 
-        # Copy user folder locally (cache the local copy path)
-        user_folder: Path = self.get_argument('user_folder')
-        user_folder = file_utils.copy_folder(user_folder, USER_DIR, True)
-        assert(user_folder.exists())
-
-        # Execute igor to get license file
-        access_key: str = self.get_argument('access_key')
-        license_path = user_folder / 'licence.plist'
-        await self.igor_get_license(access_key, license_path)
-        assert(license_path.exists())
-
-        # Exectute igor to get the latest runtime version
-        runtime_version: str = self.get_argument('runtime_version')
-        rss_feed: str = self.get_argument('feed')
-        runtime_version = await self.igor_get_runtime_version(user_folder, rss_feed, runtime_version)
-        assert(runtime_version is not None)
+        try:
+            with TRACER.span('igorRunTests'):
+                await self.run_pipeline()
+        finally:
+            # Also when the setup or the tests failed (an emulator left booting would block the next runs)
+            await self.stop_android_emulator()
+            self.release_leases()
+            self.close_sockets()
+            if trace_file:
+                LOGGER.info(f"Trace written to {TRACER.save()}")
+
+    async def prepare_run(self) -> Tuple[DevicePool, dict[str, Any]]:
+        """
+        Cleans the workspace and runs the setup (see 'run_setup').
+
+        Returns:
+            Tuple[DevicePool, dict[str, Any]]: The devices of the targets and the result of each setup step.
+        """
+
+        # Clean workspace (only the folders of this invocation, concurrent runs keep theirs)
+        for directory in [self.user_dir, self.igor_dir, self.temp_dir, self.output_dir, self.workspace_dir / 'projects']:
+            self.remove_directory(directory)
+
+        # Left by older versions (runtimes and compile caches are now kept in the shared stores)
+        for directory in [self.workspace_dir / 'cache', self.workspace_dir / 'runtime']:
+            if directory.exists():
+                self.remove_directory(directory)
+
+        self.ensure_directories_exist([ self.output_dir, self.get_results_folder() ])
 
-        # Execute igor to install the requested runtime version
         targets = self.get_targets()
+        device_pool = DevicePool(targets, shared=[(platform, device) for platform, device in targets if platform in SANDBOXED_PLATFORMS and device.lower() == LOCAL_DEVICE])
+        platforms = device_pool.platforms
 
-        platforms = targets.keys()
-        runtime_path = await self.igor_install_runtime(user_folder, rss_feed, runtime_version, platforms)
-        assert(runtime_path.exists())
+        # Setup stages run concurrently where they don't depend on each other
+        setup = await self.run_setup(platforms)
 
-        # TODO
-        # Execute ProjectTool to ensure correct project format
-        # project_tool_path = runtime_path / 'bin' / 'projecttool' / 'windows' / 'x64' / 'ProjectTool.exe'
-        # assert(project_tool_path.exists())
+        # Save 'local_settings.json' to workspace and local user (just to be on the safe side)
+        settings, _ = setup['load settings']
+        file_utils.save_to_file(settings, setup['copy user folder'] / 'local_settings.json')
 
-        # os.environ['PROJECTTOOL'] = str(project_tool_path)
-        # subprocess.run([PROJECT_SCRIPT_PATH])
+        # Clean results folder (the results of namespaced runs are kept)
+        file_utils.clean_directory(self.get_results_folder(), files_only=True)
 
-        # Load settings
-        settings_path = user_folder / 'local_settings.json'
-        settings = file_utils.read_from_file(settings_path)
+        return device_pool, setup
 
-        # Prepare for HTML5
-        if 'HTML5' in platforms:
-            # Download and install the correct version of ChromeDriver
-            driver_path = self.download_chrome_driver(runtime_path)
-            assert(driver_path.exists())
+    async def run_pipeline(self):
+        device_pool, setup = await self.prepare_run()
 
-            # Set custom HTML5 runner (scripts folder)
-            html5_runner: Path = self.get_argument('html5_runner')
-            if html5_runner:
-                settings = self.update_html5_runner_path(settings, html5_runner)
+        user_folder: Path = setup['copy user folder']
+        runtime_version: str = setup['runtime info']
+        runtime_path: Path = setup['install runtime']
+        igor_path = self.get_igor_runner_path(runtime_path)
+        projects: list[Path] = setup['prepare projects']
 
-        android_emulator_running = False
-        android_sdk_location = None
+        use_nobuild = self.accepts_no_build_param(runtime_version)
 
-        # Prepare the Android emulator
-        if 'android' in platforms:
-            # Update debug runner path (command line will always run debug runner)
-            settings = self.update_android_runner(settings)
-            
-            # Retrieve the AndroidSDK path from settings
-            android_sdk_location, _, _ = self.check_android_paths(settings)
+        # The projects of a batch run concurrently (up to '--parallel-projects'), a failing one doesn't stop the others
+        semaphore = asyncio.Semaphore(max(self.get_argument('parallel_projects'), 1))
 
-            android_emulator_running = self.start_android_emulator(android_sdk_location)
+        async def run_project(project_yyp: Path):
+            async with semaphore:
+                await self.run_project(project_yyp, device_pool, igor_path, user_folder, runtime_path, use_nobuild)
 
-        # Save 'local_settings.json' to workspace and local user (just to be on the safe side)
-        file_utils.save_to_file(settings, settings_path)
+        async def run_projects():
+            results = await asyncio.gather(*(run_project(project_yyp) for project_yyp in projects), return_exceptions=True)
+            errors = [(project_yyp, result) for project_yyp, result in zip(projects, results) if isinstance(result, BaseException)]
+            for project_yyp, error in errors:
+                LOGGER.error(f"Project '{self.get_project_name(project_yyp)}' failed: {error!r}")
+            if errors:
+                raise errors[0][1]
 
-        # Get the igor runner path
-        igor_path = runtime_path / 'bin' / 'igor' / 'windows' / 'x64' / 'igor.exe'
-                
-        # Configure project
-        project_yyp: Path = self.get_argument('project_path')
-        project_config: dict[str, Any] = self.get_argument('project_config')
-        project_folder = project_yyp.parent
+        # One test server for the whole run (the results of each project are kept apart by run name)
+        await manage_server(run_projects, sock=self.get_http_socket(), debug_endpoints=self.get_argument('debug_endpoints'), output_path=self.get_results_folder())
 
-        self.project_set_config(DEFAULT_CONFIG, project_config, project_folder)
+    async def run_project(self, project_yyp: Path, device_pool: DevicePool, igor_path: Path, user_folder: Path, runtime_path: Path, use_nobuild: bool):
+        """
+        Runs the tests of a project on every platform, runner and sandbox combination (one after the other).
+        """
+        project_folder = project_yyp.parent
+        project_name = self.get_project_name(project_yyp)
+        batch = len(self.get_argument('project_path')) > 1
 
         # For all except HTML5
         runners = self.get_runners()
 
-        # Clean results folder
-        file_utils.clean_directory(ROOT_DIR / 'results')
-
-        use_nobuild = self.accepts_no_build_param(runtime_version)
-
-        for platform, device in targets.items():
+        for platform in device_pool.platforms:
             # Determine whether sandbox tests are needed
             is_sandboxed = platform in SANDBOXED_PLATFORMS
 
@@ -250,15 +314,141 @@ class IgorRunTestsCommand(BaseCommand):
                 
                 for runner in platform_runners:
                     runner_part = f'_{runner}' if runner else ''
+                    project_part = f'_{project_name}' if batch else ''
                     
-                    file_utils.clean_directory(OUTPUT_DIR)
-                    
-                    run_name = f"{self.get_argument('run_name')}_{platform}{runner_part}{sandbox_part}"
-                    await self.igor_run_tests(igor_path, project_yyp, user_folder, runtime_path, platform, device, runner, run_name, use_nobuild = use_nobuild)
+                    run_name = f"{self.get_argument('run_name')}{project_part}_{platform}{runner_part}{sandbox_part}{shard_utils.get_run_suffix(self.get_argument('shard'))}"
+
+                    # The build is shared by all the devices of the platform when it's run with '/nobuild' (otherwise each run would rebuild it)
+                    fan_out = bool(runner and use_nobuild)
+                    if not fan_out and len(device_pool.devices[platform]) > 1:
+                        LOGGER.warning(f"'{run_name}' can't be shared between devices (the runtime doesn't support '/nobuild'), running it on one device")
+
+                    async with device_pool.lease(platform, None if fan_out else 1) as devices:
+                        with TRACER.span(run_name, track=f'project {project_name}' if batch else 'launcher', platform=platform, device=','.join(devices), runner=runner or ''):
+                            await self.igor_run_tests(igor_path, project_yyp, user_folder, runtime_path, platform, devices, runner, run_name, use_nobuild = use_nobuild, sandbox = sandbox)
+
+    async def run_setup(self, platforms) -> dict[str, Any]:
+        """
+        Runs the setup steps as a dependency graph (see 'stage_utils.run_stages'): the user folder copy,
+        project configuration, ChromeDriver download and emulator boot overlap the igor steps, which
+        run in order (licence, runtime info, runtime install). A failing step cancels the others.
+
+        Returns:
+            dict[str, Any]: The result of each step (by name).
+        """
+        access_key: str = self.get_argument('access_key')
+        rss_feed: str = self.get_argument('feed')
+
+        # Download and extract igor
+        async def download_igor(results):
+            await asyncio.to_thread(self.download_and_extract, IGOR_URL, self.igor_dir)
+            assert(self.igor_path.exists())
+
+        # Copy user folder locally (cache the local copy path)
+        async def copy_user_folder(results) -> Path:
+            user_folder = await asyncio.to_thread(file_utils.copy_folder, self.get_argument('user_folder'), self.user_dir, True)
+            assert(user_folder.exists())
+            return user_folder
+
+        # Execute igor to get license file
+        async def fetch_licence(results):
+            license_path = results['copy user folder'] / 'licence.plist'
+            await self.igor_get_license(access_key, license_path)
+            assert(license_path.exists())
+
+        # Exectute igor to get the latest runtime version
+        async def runtime_info(results) -> str:
+            runtime_version = await self.igor_get_runtime_version(results['copy user folder'], rss_feed, self.get_argument('runtime_version'))
+            assert(runtime_version is not None)
+            return runtime_version
 
-        # Close Android emulator
-        if android_emulator_running:
-            self.stop_android_emulator(android_sdk_location)
+        # Execute igor to install the requested runtime version
+        async def install_runtime(results) -> Path:
+            runtime_path = await self.igor_install_runtime(results['copy user folder'], rss_feed, results['runtime info'], platforms)
+            assert(runtime_path.exists())
+            return runtime_path
+
+        # TODO
+        # Execute ProjectTool to ensure correct project format
+        # project_tool_path = runtime_path / 'bin' / 'projecttool' / 'windows' / 'x64' / 'ProjectTool.exe'
+        # assert(project_tool_path.exists())
+
+        # os.environ['PROJECTTOOL'] = str(project_tool_path)
+        # subprocess.run([PROJECT_SCRIPT_PATH])
+
+        # Load settings (saved once the setup is done) and the AndroidSDK path
+        async def load_settings(results) -> Tuple[str, Optional[Path]]:
+            android_sdk_location = None
+            settings = file_utils.read_from_file(results['copy user folder'] / 'local_settings.json')
+
+            # Set custom HTML5 runner (scripts folder)
+            html5_runner: Path = self.get_argument('html5_runner')
+            if 'HTML5' in platforms and html5_runner:
+                settings = self.update_html5_runner_path(settings, html5_runner)
+
+            if 'android' in platforms:
+                # Update debug runner path (command line will always run debug runner)
+                settings = self.update_android_runner(settings)
+
+                # Retrieve the AndroidSDK path from settings
+                android_sdk_location, _, _ = self.check_android_paths(settings)
+
+            return settings, android_sdk_location
+
+        # Download and install the correct version of ChromeDriver (HTML5)
+        async def download_chrome_driver(results):
+            driver_path = await asyncio.to_thread(self.download_chrome_driver, results['install runtime'])
+            assert(driver_path.exists())
+
+        # Boot (or reuse) the Android emulator, it's stopped once the run is over (see 'execute')
+        async def boot_android_emulator(results) -> str:
+            _, android_sdk_location = results['load settings']
+            self.android_emulator = self.get_android_emulator(android_sdk_location)
+            return await self.android_emulator.start()
+
+        # Copy the projects into the workspace (namespaced runs only, the projects get patched)
+        async def prepare_projects(results) -> list[Path]:
+            projects: list[Path] = self.get_argument('project_path')
+            prepared = await asyncio.gather(*(asyncio.to_thread(self.prepare_project, project_yyp) for project_yyp in projects))
+            self.project_sources.update(zip(prepared, projects))
+            return prepared
+
+        # Configure projects (each one talks to its own remote control server)
+        async def configure_projects(results):
+            project_config: dict[str, Any] = self.get_argument('project_config')
+            for project_yyp in results['prepare projects']:
+                project_name = self.get_project_name(project_yyp)
+                default_config = self.get_default_config(project_name)
+                if len(results['prepare projects']) > 1:
+                    # Keeps the results the projects publish to the shared test server apart
+                    default_config['$$parameters$$.run_name'] = f'{project_name} Tests'
+                self.project_set_config(default_config, project_config, project_yyp.parent)
+
+        stages = [
+            stage_utils.Stage('download igor', download_igor),
+            stage_utils.Stage('copy user folder', copy_user_folder),
+            stage_utils.Stage('fetch licence', fetch_licence, ('download igor', 'copy user folder')),
+            stage_utils.Stage('runtime info', runtime_info, ('fetch licence',)),
+            stage_utils.Stage('install runtime', install_runtime, ('runtime info',)),
+            stage_utils.Stage('load settings', load_settings, ('copy user folder',)),
+            stage_utils.Stage('prepare projects', prepare_projects),
+            stage_utils.Stage('configure projects', configure_projects, ('prepare projects',)),
+        ]
+        if 'HTML5' in platforms:
+            stages.append(stage_utils.Stage('download chrome driver', download_chrome_driver, ('install runtime',)))
+        if 'android' in platforms:
+            stages.append(stage_utils.Stage('boot android emulator', boot_android_emulator, ('load settings',)))
+
+        return await stage_utils.run_stages(stages)
+
+    @staticmethod
+    def get_igor_runner_path(runtime_path: Path) -> Path:
+        return runtime_path / 'bin' / 'igor' / 'windows' / 'x64' / 'igor.exe'
+
+    @staticmethod
+    def get_project_name(project_yyp: Path) -> str:
+        # The name of the project folder (also the one of its copy in the workspace, see 'prepare_project')
+        return project_yyp.parent.name
 
     def remove_directory(self, directory: Path):
         if os.path.exists(directory):
@@ -279,14 +469,6 @@ class IgorRunTestsCommand(BaseCommand):
             else:
                 LOGGER.info(f'Directory already exists: {directory}')
 
-    def change_directory(self, path: Path):
-        LOGGER.info(f'Changing directory to {path}')
-        try:
-            os.chdir(path)
-            LOGGER.info(f'Successfully changed directory to {os.getcwd()}')
-        except Exception as e:
-            LOGGER.error(f'Failed to change directory: {e}')
-
     def download_and_extract(self, url, extract_path: Path):
         # Download the file
         LOGGER.info('Downloading file from URL: %s', url)
@@ -324,9 +506,43 @@ class IgorRunTestsCommand(BaseCommand):
     # Igor
 
     async def igor_get_license(self, access_key: str, output_path: Path):
-        await async_utils.run_and_capture(IGOR_PATH, [f'-ak={access_key}', f'-of={output_path}', 'Runtime', 'FetchLicense'])
+        await async_utils.run_and_capture(self.igor_path, [f'-ak={access_key}', f'-of={output_path}', 'Runtime', 'FetchLicense'])
+
+    def get_runtime_store(self) -> cache_utils.LruStore:
+        return cache_utils.LruStore(Path(self.get_argument('runtime_store')), int(self.get_argument('runtime_store_budget') * cache_utils.GIGABYTE))
+
+    def get_compile_cache_store(self) -> cache_utils.LruStore:
+        return cache_utils.LruStore(Path(self.get_argument('compile_cache')), int(self.get_argument('compile_cache_budget') * cache_utils.GIGABYTE))
+
+    def get_compile_cache_key(self, project_file: Path, platform: str, runner: Optional[str], runtime_path: Path, sandbox: Optional[bool] = None) -> str:
+        # Projects with the same name in different folders get different caches
+        project_file = self.project_sources.get(project_file, project_file)
+        project_hash = hashlib.sha1(str(project_file.resolve()).lower().encode()).hexdigest()[:8]
+        # Sandboxed builds change the project options, they get their own cache to stay incremental
+        sandbox_part = '-sandboxed' if sandbox else ''
+        return f'{project_file.stem}-{project_hash}-{platform}-{runner or "default"}-{runtime_path.name}{sandbox_part}'
+
+    def release_leases(self):
+        for store, key in self.leases:
+            store.release(key)
+        self.leases.clear()
 
     async def igor_get_runtime_version(self, user_folder: Path, feed: str, version: str):
+        # Feed lookups are cached for a short while (the latest version doesn't change every minute)
+        feed_cache = cache_utils.TtlCache(Path(self.get_argument('runtime_store')) / 'feed_cache.json', self.get_argument('feed_cache_ttl'))
+        cache_key = f'{feed}|{version or "latest"}'
+
+        cached_version = feed_cache.get(cache_key)
+        if cached_version is not None:
+            LOGGER.info(f"Using cached runtime version {cached_version} (feed lookup less than {self.get_argument('feed_cache_ttl')}s old)")
+            return cached_version
+
+        version = await self.igor_query_runtime_version(user_folder, feed, version)
+        if version is not None:
+            feed_cache.set(cache_key, version)
+        return version
+
+    async def igor_query_runtime_version(self, user_folder: Path, feed: str, version: str):
         # This will prevent browser cache
         cacheBust = random.randint(111111111, 999999999)
         # Setup arguments
@@ -335,7 +551,7 @@ class IgorRunTestsCommand(BaseCommand):
             args.append(version)
         
         # Execute command
-        result = await async_utils.run_and_capture(IGOR_PATH, args)
+        result = await async_utils.run_and_capture(self.igor_path, args)
 
         pattern = re.compile(r'Version (\d+\.\d+\.\d+\.\d+)')
         match = pattern.search(result)
@@ -346,21 +562,85 @@ class IgorRunTestsCommand(BaseCommand):
             return None
 
     async def igor_install_runtime(self, user_folder: Path, feed: str, version: str, platforms: list[str]):
-
-        # This will prevent browser cache
-        cacheBust = random.randint(111111111, 999999999)
-        # Prepare modules string
-        t = platforms
-        modules = ','.join(t).lower()
-        # Setup arguments
-        args = [f'/uf={user_folder}', f'/ru={feed}?cachebust={cacheBust}', f'/rp={RUNTIME_DIR}', f'/m={modules}', 'Runtime', 'Install', version]
-        
-        # Execute command
-        await async_utils.run_and_capture(IGOR_PATH, args)
-
-        return RUNTIME_DIR / f'runtime-{version}'
-
-    async def igor_run_tests(self, igor_path: Path, project_file: Path, user_folder: Path, runtime_path: Path, platform: str, device: str, runner: Optional[str] = None, run_name = 'xUnit', verbosity_level: Optional[int] = 4, use_nobuild = False):
+        """
+        Returns the path of the runtime, installed into the runtime store. A runtime already in the store
+        is reused and only the platform modules it doesn't have yet are installed into it.
+        """
+        store = self.get_runtime_store()
+        runtime_path = store.get_path(version) / f'runtime-{version}'
+        modules = sorted(set(platform.lower() for platform in platforms))
+
+        # Lease the runtime first so no other launcher evicts it while it's being used
+        async with store.lock():
+            store.lease(version)
+        self.leases.append((store, version))
+
+        async with store.entry_lock(version):
+            metadata = store.get_metadata(version) or {}
+            installed: list[str] = metadata.get('modules', []) if runtime_path.exists() else []
+            missing = [module for module in modules if module not in installed]
+
+            if not missing:
+                LOGGER.info(f"Reusing runtime {version} from the store (modules: {','.join(installed)})")
+                async with store.lock():
+                    store.touch(version)
+                return runtime_path
+
+            LOGGER.info(f"Installing runtime {version} modules: {','.join(missing)} (already installed: {','.join(installed) or 'none'})")
+
+            # This will prevent browser cache
+            cacheBust = random.randint(111111111, 999999999)
+            # Setup arguments
+            args = [f'/uf={user_folder}', f'/ru={feed}?cachebust={cacheBust}', f'/rp={store.get_path(version)}', f'/m={",".join(missing)}', 'Runtime', 'Install', version]
+
+            # Execute command
+            await async_utils.run_and_capture(self.igor_path, args)
+
+            # Modules are only recorded once installed (a failed install raises, it's retried by the next run)
+            async with store.lock():
+                await asyncio.to_thread(store.set_metadata, version, version=version, modules=sorted(installed + missing))
+                await asyncio.to_thread(store.evict, keep=(version,))
+
+        return runtime_path
+
+    async def igor_run_tests(self, igor_path: Path, project_file: Path, user_folder: Path, runtime_path: Path, platform: str, devices: list[str], runner: Optional[str] = None, run_name = 'xUnit', verbosity_level: Optional[int] = 4, use_nobuild = False, sandbox: Optional[bool] = None, server_options: Optional[dict[str, Any]] = None):
+
+        # The compile cache is locked for the whole build and run (igor writes to it in both)
+        compile_cache = self.get_compile_cache_store()
+        compile_cache_key = self.get_compile_cache_key(project_file, platform, runner, runtime_path, sandbox)
+        compile_cache_path = compile_cache.get_path(compile_cache_key)
+
+        async with compile_cache.lock():
+            compile_cache.lease(compile_cache_key)
+        self.leases.append((compile_cache, compile_cache_key))
+
+        async with compile_cache.entry_lock(compile_cache_key):
+            LOGGER.info(f"Using compile cache '{compile_cache_key}' ({'warm' if compile_cache.get_metadata(compile_cache_key) else 'cold'})")
+            compile_cache_path.mkdir(parents=True, exist_ok=True)
+
+            await self.igor_build_and_run_tests(igor_path, project_file, user_folder, runtime_path, compile_cache_path, platform, devices, runner, run_name, verbosity_level, use_nobuild, server_options)
+
+            # Only a successful build marks the cache as warm (a failed one raises)
+            async with compile_cache.lock():
+                await asyncio.to_thread(compile_cache.set_metadata, compile_cache_key, project=str(project_file), platform=platform, runner=runner, runtime=runtime_path.name)
+                await asyncio.to_thread(compile_cache.evict, keep=(compile_cache_key,))
+
+    async def igor_build_and_run_tests(self, igor_path: Path, project_file: Path, user_folder: Path, runtime_path: Path, compile_cache_path: Path, platform: str, devices: list[str], runner: Optional[str], run_name: str, verbosity_level: int, use_nobuild: bool, server_options: Optional[dict[str, Any]] = None):
+        """
+        Builds the project once and runs it on each of the devices, their runners share the tests (see 'RemoteControlServer.serve_runners').
+
+        Args:
+            server_options (dict[str, Any]): Extra options of the remote control server (ie.: the suites to run).
+        """
+        # Each project of a batch builds into its own folders
+        project_name = self.get_project_name(project_file)
+        temp_dir = self.temp_dir / project_name
+        output_dir = self.output_dir / project_name
+        output_dir.mkdir(parents=True, exist_ok=True)
+        file_utils.clean_directory(output_dir)
+
+        temp_file = output_dir / 'xUnit.win'
+        target_file = output_dir / 'xUnit.zip'
 
         # Setup verbosity level
         args_base = ['/v' for _ in range(verbosity_level)]
@@ -370,11 +650,11 @@ class IgorRunTestsCommand(BaseCommand):
             f'/uf={user_folder}',
             f'/rp={runtime_path}',
             f'/project={project_file}',
-            f'/cache={CACHE_DIR}',
-            f'/temp={TEMP_DIR}',
-            f'/of={TEMP_FILE}',
-            f'/tf={TARGET_FILE}',
-            f'/device={device}',
+            f'/cache={compile_cache_path}',
+            f'/temp={temp_dir}',
+            f'/of={temp_file}',
+            f'/tf={target_file}',
+            f'/device={devices[0]}',
         ]
 
         # Optionally add the runner argument
@@ -383,26 +663,33 @@ class IgorRunTestsCommand(BaseCommand):
         
         args_base += ['--', platform]
 
-        # Execute command (change working directory)
-        self.change_directory(WORKSPACE_DIR)
-
+        # Execute command (from the workspace)
         package_args = args_base + ['PackageZip']
-        await async_utils.run_and_capture(igor_path, package_args)
+        await async_utils.run_and_capture(igor_path, package_args, cwd=self.workspace_dir)
 
         # Improve test times using the '/nobuild' feature
         if runner and use_nobuild:
             args_base = ['/nobuild'] + args_base 
             if runner == 'VM':                
-                old_path = f'/of={TEMP_FILE}'
-                new_path = f"/of={TEMP_FILE.parent / 'data.win'}" 
+                old_path = f'/of={temp_file}'
+                new_path = f"/of={temp_file.parent / 'data.win'}" 
                 args_base = [string.replace(old_path, new_path) if old_path in string else string for string in args_base]
 
         run_args = args_base + ['Run']
+
+        # One run per device (all of them run the same build)
+        device_run_args = [[f'/device={device}' if arg == f'/device={devices[0]}' else arg for arg in run_args] for device in devices]
         
-        remote_server = RemoteControlServer(ExecutionMode.AUTOMATIC, run_name=run_name)
-        await manage_server(lambda: remote_server.serve_or_wait_for_space(igor_path, run_args, port=TCP_PORT))
- 
-        self.change_directory(ROOT_DIR)
+        capabilities = RemoteProtocol.capabilities_from_options(self.get_argument('compression'), self.get_argument('result_encoding'), self.get_argument('max_in_flight'))
+        test_index = get_test_index(project_file.parent)
+        crash_target = f"{project_name}_{platform}{f'_{runner}' if runner else ''}"
+        remote_server = RemoteControlServer(ExecutionMode.AUTOMATIC, run_name=run_name, capabilities=capabilities, max_in_flight=self.get_argument('max_in_flight'), test_index=test_index, recorder=self.get_recorder(run_name), output_path=self.get_results_folder(), **shard_utils.get_server_options(self.get_argument('shard'), self.get_argument('shard_strategy'), self.get_argument('shard_durations')), **crash_utils.get_server_options(self.get_argument('crash_history'), crash_target, self.get_argument('max_restart_delay'), self.get_argument('crash_loop_limit')), **(server_options or {}))
+        self.remote_servers[project_name] = remote_server
+        try:
+            with TRACER.span('run tests'):
+                await remote_server.serve_runners(igor_path, device_run_args, sock=self.get_remote_socket(project_name), cwd=self.workspace_dir)
+        finally:
+            self.remote_servers.pop(project_name, None)
 
     # HTML5 Specific
 
@@ -510,65 +797,26 @@ class IgorRunTestsCommand(BaseCommand):
 
         return sdk_location, ndk_location, jdk_location
 
-    def start_android_emulator(self, sdk_path: Path) -> str:
-        emulator_path = sdk_path / 'emulator' / 'emulator.exe'
-        adb_path = sdk_path / 'platform-tools' / 'adb.exe'
-
-        avd_list = subprocess.run([emulator_path, '-list-avds'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        avds = avd_list.stdout.decode().strip().splitlines()
-
-        if len(avds) == 0:
-            LOGGER.error('No Android Virtual Devices found.')
-            return None
-
-        emulator_name = avds[0]
-        LOGGER.info(f"Starting AVD: {emulator_name}")
-        with open(os.devnull, "w") as f:
-            subprocess.Popen([emulator_path, '-avd', emulator_name], stdout=f, stderr=f)
-        LOGGER.info('Emulator started')
-
-        # Wait for the emulator to appear in the adb devices list
-        LOGGER.info('Waiting for emulator to connect to ADB')
-        while True:
-            result = subprocess.run([adb_path, 'devices'], capture_output=True, text=True)
-            lines = result.stdout.strip().split("\n")[1:]
-            emulators = [line.split("\t")[0] for line in lines if "emulator" in line]
-            if len(emulators) > 0:
-                break
-            time.sleep(1)
-
-        emulator_id = emulators[0]
-        LOGGER.info(f'Connected emulator id: {emulator_id}')
-
-        # Wait for the emulator to fully boot
-        LOGGER.info('Waiting for emulator to fully boot')
-        counter = 0
-        while True:
-            boot_check = subprocess.run([adb_path, '-s', emulator_id, 'shell', 'am', 'broadcast', '-a', 'android.intent.action.MAIN', '-n', 'com.android.internal.util.WithFramework/com.android.internal.util.FrameworkInitializer'], capture_output=True, text=True)
-            
-            if "result=0" in boot_check.stdout:
-                break
-
-            LOGGER.info('Boot check: %s', boot_check.stdout.strip())
-            counter += 1
-            if counter > 120:  # Timeout after 120 seconds
-                LOGGER.error('Timeout waiting for emulator to fully boot')
-                break
-
-            time.sleep(1)
-
-        if "result=0" in boot_check.stdout:
-            LOGGER.info('Emulator is fully booted')
-
-        return emulator_id
-
-    def stop_android_emulator(self, sdk_path: Path):
-        # Stop the emulator
-        adb_path = sdk_path / 'platform-tools' / 'adb.exe'
-
-        LOGGER.info('Stopping Android emulator')
-        subprocess.run([adb_path, 'emu', 'kill'])
-        LOGGER.info('Emulator stopped')
+    def get_android_emulator(self, sdk_path: Optional[Path]) -> AndroidEmulator:
+        adb_path: Optional[str] = self.get_argument('adb_path')
+        emulator_path: Optional[str] = self.get_argument('emulator_path')
+        return AndroidEmulator(sdk_path,
+            avd=self.get_argument('emulator_avd'),
+            snapshot=self.get_argument('emulator_snapshot'),
+            headless=self.get_argument('emulator_headless'),
+            keep_alive=self.get_argument('emulator_keep_alive'),
+            boot_timeout=self.get_argument('emulator_boot_timeout'),
+            adb_path=Path(adb_path) if adb_path else None,
+            emulator_path=Path(emulator_path) if emulator_path else None,
+            log_path=self.workspace_dir / 'emulator.log')
+
+    async def stop_android_emulator(self):
+        if self.android_emulator is None:
+            return
+
+        with TRACER.span('stop android emulator'):
+            await self.android_emulator.stop()
+        self.android_emulator = None
 
     # Project Configuration
 
@@ -577,6 +825,7 @@ class IgorRunTestsCommand(BaseCommand):
         data = {
             **default_config,
             **project_config,
+            'HttpPublisher.compress': self.get_argument('compression') == 'zlib',
             '$$parameters$$.remote_server': True,
         }
 
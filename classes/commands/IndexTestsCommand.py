@@ -0,0 +1,61 @@
+import argparse
+from pathlib import Path
+
+from classes.commands.BaseCommand import BaseCommand
+from utils import file_utils, test_index_utils
+from utils.logging_utils import LOGGER
+from utils.path_utils import ROOT_DIR
+
+DEFAULT_PROJECT_PATH = ROOT_DIR / 'projects' / 'xUnit' / 'xUnit.yyp'
+INDEX_CACHE_DIR = ROOT_DIR / 'workspace' / 'index'
+
+class IndexTestsCommand(BaseCommand):
+    """
+    Command class for building the static test index of a project. The index lists the suites,
+    tests and platform filters straight from the GML sources, so no build is required.
+    """
+
+    @classmethod
+    def register_command(cls, subparsers: argparse._SubParsersAction):
+        """
+        Registers the 'indexTests' command with the argument parser.
+
+        Args:
+            subparsers (argparse._SubParsersAction): The subparsers action from argparse to add the command to.
+        """
+        parser: argparse.ArgumentParser = subparsers.add_parser('indexTests', help='Builds the static test index of a project (no GameMaker install required)')
+        parser.add_argument('-p', '--project-path', type=str, default=str(DEFAULT_PROJECT_PATH), help='The path to the project file (.yyp)')
+        parser.add_argument('-o', '--output-file', type=str, default='test_index.json', help='The path to the JSON file where the index is written')
+        parser.add_argument('-pl', '--platform', type=str, default=None, help=f'Only list the tests that can run on the given platform (available: {test_index_utils.ALL_PLATFORMS})')
+        parser.add_argument('-tf', '--tests-file', type=str, default=None, help='A file with the output of the runner TESTS command to check the index against')
+        parser.set_defaults(command_class=cls)
+
+    async def execute(self):
+        """
+        Builds the index (reusing the cached suites whose files didn't change) and writes it.
+        """
+        project_folder = Path(self.get_argument('project_path')).parent
+        index = get_test_index(project_folder)
+
+        platform = self.get_argument('platform')
+        report = {
+            'summary': index.to_summary(),
+            'tests': test_index_utils.select_test_paths(index, platform),
+            'index': index.model_dump(),
+        }
+
+        LOGGER.info(f"Test index for '{index.project}': {report['summary']}")
+
+        tests_file = self.get_argument('tests_file')
+        if tests_file:
+            runtime_tests = [line.split('\t')[0] for line in file_utils.read_from_file(Path(tests_file)).splitlines() if line]
+            report['comparison'] = test_index_utils.compare_test_paths(index.get_test_paths(), runtime_tests)
+            test_index_utils.log_comparison(report['comparison'])
+
+        file_utils.save_data_as_json(report, self.get_root_folder() / self.get_argument('output_file'))
+
+def get_test_index(project_folder: Path):
+    """
+    Builds the test index of a project using the shared index cache.
+    """
+    return test_index_utils.build_test_index(project_folder, INDEX_CACHE_DIR / f'{project_folder.name}.json')
@@ -0,0 +1,73 @@
+import argparse
+import json
+from typing import Optional
+
+from classes.commands.BaseCommand import BaseCommand
+from classes.server.TestFrameworkServer import TestFrameworkServer
+from utils import file_utils, load_utils, network_utils
+from utils.logging_utils import LOGGER
+
+class LoadTestCommand(BaseCommand):
+    """
+    Command class for load testing the TestFrameworkServer endpoints (the ones used by the
+    network test suites). Opens concurrent HTTP and websocket clients and reports throughput,
+    latency percentiles and error rates, either against a running server or an in-process one.
+    """
+
+    @classmethod
+    def register_command(cls, subparsers: argparse._SubParsersAction):
+        """
+        Registers the 'loadTest' command with the argument parser.
+
+        Args:
+            subparsers (argparse._SubParsersAction): The subparsers action from argparse to add the command to.
+        """
+        parser: argparse.ArgumentParser = subparsers.add_parser('loadTest', help='Load tests the test server endpoints (echo, status and websockets)')
+        parser.add_argument('-u', '--url', type=str, default=None, help='The base url of a running test server (default: starts a local one)')
+        parser.add_argument('-e', '--endpoints', type=str, default=','.join(load_utils.ENDPOINTS), help=f'A comma separated list of endpoints to load (available: {load_utils.ENDPOINTS})')
+        parser.add_argument('-c', '--clients', type=int, default=32, help='The number of concurrent clients per endpoint (default: 32)')
+        parser.add_argument('-d', '--duration', type=float, default=10, help='How long each endpoint is loaded, in seconds (default: 10)')
+        parser.add_argument('-ps', '--payload-sizes', type=str, default='1024', help='A comma separated list of payload sizes in bytes, each one is loaded separately (default: 1024)')
+        parser.add_argument('-w', '--window', type=int, default=1, help='The number of messages each websocket client keeps in flight (default: 1, request/response)')
+        parser.add_argument('-to', '--timeout', type=float, default=10, help='The timeout of each request, in seconds (default: 10)')
+        parser.add_argument('-o', '--output-file', type=str, default='loadtest.json', help='The path to the JSON file where the report is written')
+        parser.set_defaults(command_class=cls)
+
+    async def execute(self):
+        """
+        Loads each endpoint (and payload size) in turn and writes a report that can be compared between versions.
+        """
+        endpoints = [name.strip() for name in self.get_argument('endpoints').split(',') if name.strip()]
+        payload_sizes = [int(size) for size in self.get_argument('payload_sizes').split(',') if size.strip()]
+
+        url: Optional[str] = self.get_argument('url')
+        server = None
+        sock = None
+        if url is None:
+            sock = network_utils.reserve_port('127.0.0.1')
+            server = TestFrameworkServer()
+            await server.start(sock=sock)
+            url = f'http://127.0.0.1:{sock.getsockname()[1]}'
+
+        report = { 'url': url, 'clients': self.get_argument('clients'), 'duration': self.get_argument('duration'), 'window': self.get_argument('window'), 'endpoints': {} }
+
+        try:
+            for endpoint in endpoints:
+                if endpoint not in load_utils.ENDPOINTS:
+                    LOGGER.error(f"Unknown endpoint '{endpoint}' (available: {load_utils.ENDPOINTS})")
+                    continue
+
+                # The status endpoint doesn't take a payload
+                sizes = [0] if endpoint == 'status' else payload_sizes
+
+                for size in sizes:
+                    name = endpoint if endpoint == 'status' else f'{endpoint}_{size}'
+                    LOGGER.info(f"Loading '{endpoint}' ({self.get_argument('clients')} clients, {size} bytes)")
+                    report['endpoints'][name] = await load_utils.run_load_test(url, endpoint, self.get_argument('clients'), self.get_argument('duration'), size, self.get_argument('timeout'), self.get_argument('window'))
+                    LOGGER.info(f"Load test '{name}': {json.dumps(report['endpoints'][name])}")
+        finally:
+            if server is not None:
+                await server.stop()
+                sock.close()
+
+        file_utils.save_data_as_json(report, self.get_root_folder() / self.get_argument('output_file'))
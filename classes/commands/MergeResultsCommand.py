@@ -0,0 +1,42 @@
+import argparse
+from pathlib import Path
+
+from classes.commands.BaseCommand import BaseCommand
+from utils import merge_utils
+from utils.logging_utils import LOGGER
+
+class MergeResultsCommand(BaseCommand):
+    """
+    Command class for merging result files (ie.: the outputs of sharded runs) into a single
+    JSON result and JUnit XML file.
+    """
+
+    @classmethod
+    def register_command(cls, subparsers: argparse._SubParsersAction):
+        """
+        Registers the 'mergeResults' command with the argument parser.
+
+        Args:
+            subparsers (argparse._SubParsersAction): The subparsers action from argparse to add the command to.
+        """
+        parser: argparse.ArgumentParser = subparsers.add_parser('mergeResults', help='Merges result files (ie.: from sharded runs) into a single result')
+        parser.add_argument('-in', '--inputs', type=str, default='results', help='A comma separated list of result JSON files or folders containing them (default: results)')
+        parser.add_argument('-of', '--output-folder', type=str, default='results/merged', help='The folder where the merged files are written (default: results/merged)')
+        parser.add_argument('-rn', '--run-name', type=str, default=None, help='The name of the merged run (default: the input run name without the shard suffix)')
+        parser.set_defaults(command_class=cls)
+
+    async def execute(self):
+        """
+        Merges the input result files, writing '<run name>.json' and '<run name>.xml' to the output folder.
+        """
+        root = self.get_root_folder()
+        output_folder: Path = root / self.get_argument('output_folder')
+        inputs = [root / path.strip() for path in self.get_argument('inputs').split(',') if path.strip()]
+
+        files = [file for file in merge_utils.get_result_files(inputs) if file.parent.resolve() != output_folder.resolve()]
+        if not files:
+            LOGGER.error(f"No result files found in {inputs}")
+            exit(1)
+
+        run_name = self.get_argument('run_name') or merge_utils.get_run_name(files[0])
+        merge_utils.merge_result_files(files, output_folder, run_name.replace(':', '_'), run_name)
@@ -1,8 +1,8 @@
 
 import argparse
-from classes.commands.BaseCommand import DEFAULT_CONFIG, BaseCommand
-from classes.server.TestFrameworkServer import manage_server
-from utils import (async_utils, file_utils)
+from classes.commands.BaseCommand import DEFAULT_HTTP_PORT, BaseCommand
+from classes.server.TestFrameworkServer import DEFAULT_MAX_MESSAGE_SIZE, DEFAULT_SEND_BUFFER_SIZE, manage_server
+from utils import (async_utils, data_utils, file_utils)
 
 class RunServerCommand(BaseCommand):
     """
@@ -20,6 +20,10 @@ class RunServerCommand(BaseCommand):
         """
         parser: argparse.ArgumentParser = subparsers.add_parser('runServer', help='Runs the test servers (useful for IDE execution)')
         parser.add_argument('-pcf', '--proj-config-file', type=str, required=False, help='The path to the project config file (config.json)')
+        parser.add_argument('-mms', '--max-message-size', type=int, default=DEFAULT_MAX_MESSAGE_SIZE, help=f'The maximum size of a websocket message in bytes, bigger ones close the connection (default: {DEFAULT_MAX_MESSAGE_SIZE})')
+        parser.add_argument('-sbs', '--send-buffer-size', type=int, default=DEFAULT_SEND_BUFFER_SIZE, help=f'The bytes buffered per websocket connection before echoing waits for the client (default: {DEFAULT_SEND_BUFFER_SIZE})')
+        cls.add_run_arguments(parser, http_port=DEFAULT_HTTP_PORT)
+        parser.add_argument('-de', '--debug-endpoints', type=data_utils.validate_bool, default=False, help='Adds the /debug endpoints (profiling, memory diffs and asyncio task counts) to the test server (default: false)')
         parser.set_defaults(command_class=cls)
 
     async def execute(self): 
@@ -33,10 +37,10 @@ class RunServerCommand(BaseCommand):
         # If a project configuration file is provided, update it with server information
         if project_config_file:
             data = {
-                **DEFAULT_CONFIG,
+                **self.get_default_config(),
                 "$$parameters$$.remote_server": False
             }
             file_utils.save_data_as_json(data, project_config_file)
 
         # Manage server: start, wait for user action (space key), then stop
-        await manage_server(async_utils.wait_for_space_key)
\ No newline at end of file
+        await manage_server(async_utils.wait_for_space_key, max_message_size=self.get_argument('max_message_size'), send_buffer_size=self.get_argument('send_buffer_size'), debug_endpoints=self.get_argument('debug_endpoints'), sock=self.get_http_socket(), output_path=self.get_results_folder())
\ No newline at end of file
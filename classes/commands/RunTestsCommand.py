@@ -1,11 +1,27 @@
 import argparse
+import asyncio
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
 from pathlib import Path
-from typing import Any
+from typing import Optional
 from classes.server.RemoteControlServer import (RemoteControlServer, ExecutionMode)
-from classes.commands.BaseCommand import DEFAULT_CONFIG, TCP_PORT, BaseCommand
+from classes.server import RemoteProtocol
+from classes.commands.BaseCommand import BaseCommand
+from classes.commands.IndexTestsCommand import get_test_index
 from classes.server.TestFrameworkServer import manage_server
-from utils import file_utils
-from utils.path_utils import ROOT_DIR
+from utils import async_utils, cache_utils, crash_utils, data_utils, file_utils, shard_utils
+from utils.logging_utils import LOGGER
+from utils.trace_utils import TRACER
+
+# Builds are kept between runs (by project and build inputs, see 'get_build_key')
+BUILD_STORE_DIR = cache_utils.CACHE_ROOT / 'builds'
+
+# Written before every run (with the ports of the servers), refreshed in reused builds instead of being part of their key
+CONFIG_FILE = 'datafiles/config.json'
 
 class RunTestsCommand(BaseCommand):
     """
@@ -30,67 +46,218 @@ class RunTestsCommand(BaseCommand):
         parser.add_argument('-tt', '--target-triple', choices=['x86_64-pc-windows-msvc'], default='x86_64-pc-windows-msvc', help=f'The target platform to build to')
         parser.add_argument('-ac', '--asset-compiler-path', type=str, required=True, help='The location of the GMRT asset compiler')
         parser.add_argument('-aca', '--asset-compiler-args', type=str, default="", help='The arguments to be pass through to the asset compiler')
-        parser.add_argument('-m', '--mode', choices=['build-run', 'build-only'], default='build-run', help='The mode to be used during compilation')
+        parser.add_argument('-m', '--mode', choices=['build-run', 'build-only'], default='build-run', help='Whether the build is run once done (default: build-run)')
         parser.add_argument('-bt', '--build-type', choices=['Debug', 'Release'], default='Debug', help='The type of build (Debug|Release)')
         parser.add_argument('-sbt', '--script-build-type', choices=['Debug', 'Release'], default='Debug', help='The type of script build (Debug|Release)')
         parser.add_argument('-rn', '--run-name', default='xUnit', help='The name to be given to the test run')
-        parser.add_argument('-ra', '--run-arguments', type=str, default="", help="Arguments to pass to the run mode of YYPC")
+        parser.add_argument('-ra', '--run-arguments', type=str, default="", help="Arguments to pass to the built executable")
+        parser.add_argument('-exe', '--executable', type=str, default=None, help='The executable produced by the build, relative to the output folder (default: "<project name>.exe")')
+        parser.add_argument('-bs', '--build-store', type=str, default=str(BUILD_STORE_DIR), help=f'The folder where builds are kept between runs, a build is reused while the project and build options are unchanged (default: {BUILD_STORE_DIR})')
+        parser.add_argument('-bsb', '--build-store-budget', type=float, default=5, help='The disk budget of the build store in GB, least recently used builds are removed past it (default: 5, 0 disables reuse)')
+        parser.add_argument('-cmp', '--compression', choices=['none', 'zlib'], default='none', help='Compression to negotiate for the results sent by the runner (default: none)')
+        parser.add_argument('-re', '--result-encoding', choices=['json', 'binary'], default='json', help='Encoding to negotiate for the test results sent by the runner (default: json)')
+        parser.add_argument('-mif', '--max-in-flight', type=int, default=1, help='Maximum number of async tests running at once on the runner (default: 1, no multiplexing)')
+        parser.add_argument('-sh', '--shard', type=shard_utils.validate_shard, default=None, help='Only run a shard of the tests, as "<INDEX>/<COUNT>" (ie.: 3/8)')
+        parser.add_argument('-shs', '--shard-strategy', choices=shard_utils.SHARD_STRATEGIES, default='hash', help='How tests are assigned to shards (default: hash)')
+        parser.add_argument('-shd', '--shard-durations', type=str, default=None, help='A result JSON file (or folder) with previous durations, used by the duration strategy')
+        parser.add_argument('-crh', '--crash-history', type=str, default=str(crash_utils.CRASH_HISTORY_DIR), help=f'The folder where the tests that crashed the runner are remembered (per target), they run last and alone in the next runs ("none" disables, default: {crash_utils.CRASH_HISTORY_DIR})')
+        parser.add_argument('-mrd', '--max-restart-delay', type=float, default=crash_utils.DEFAULT_MAX_RESTART_DELAY, help=f'The longest wait before restarting a runner that exits before running a test, in seconds (the wait doubles on each such exit, default: {crash_utils.DEFAULT_MAX_RESTART_DELAY})')
+        parser.add_argument('-cll', '--crash-loop-limit', type=int, default=crash_utils.DEFAULT_CRASH_LOOP_LIMIT, help=f'The remaining tests are failed once the runner exited this many times in a row before running a test (default: {crash_utils.DEFAULT_CRASH_LOOP_LIMIT}, 0 never gives up)')
+        cls.add_run_arguments(parser)
+        parser.add_argument('-man', '--manual', type=data_utils.validate_bool, default=False, help='Drives the runner from the console instead of running all the tests, type HELP for the commands (default: false)')
+        parser.add_argument('-de', '--debug-endpoints', type=data_utils.validate_bool, default=False, help='Adds the /debug endpoints (profiling, memory diffs and asyncio task counts) to the test server (default: false)')
+        parser.add_argument('-trf', '--trace-file', type=str, default=None, help='Writes a Chrome trace (Perfetto) JSON file with the timings of every stage and test of the run')
+        parser.add_argument('-rs', '--record-session', type=str, default=None, help='A folder where the runner sessions are recorded (one "<run name>.ndjson.gz" per run), they can be replayed with simulateRunner')
 
         parser.set_defaults(command_class=cls)
 
     async def execute(self):
 
         """
-        Executes the command to run the server. If a project configuration file is provided, 
-        it adds server information to the configuration and saves it. Then, it manages the server's 
-        lifecycle, waiting for user input to stop the server.
-        """       
-        self.project_write_config()
-
-        run_name = self.get_argument('run_name')
-        remote = RemoteControlServer(ExecutionMode.AUTOMATIC, run_name=run_name)
-
-        file_utils.clean_directory(ROOT_DIR / 'output' / 'results')
-
-        # THIS SHOULD BE JUST THE BUILD STEP
-        # await async_utils.run_and_capture(self.get_argument("yypc_path"), [
-        #     self.get_argument("project_path"), 
-        #     '-o', self.get_argument("output_folder"),
-        #     '-t', self.get_argument("template_folder"),
-        #     f'-toolchain={self.get_argument("toolchain_folder")}',
-        #     f'-target-triple={self.get_argument("target_triple")}',
-        #     f'-asset-compiler={self.get_argument("asset_compiler_path")}',
-        #     f'-asset-compiler-args={self.get_argument("asset_compiler_args")}',
-        #     f'-build-type=build-only',
-        #     f'-script-build-type={self.get_argument("script_build_type")}',
-        #     f'-mode={self.get_argument("mode")}',
-        #     f'-run-args={self.get_argument("run_arguments")}',
-        #     '-v'])
-        
-        # THIS SHOULD BE JUST THE RUN STEP
-        remote = RemoteControlServer(ExecutionMode.AUTOMATIC, run_name=run_name)
-        await manage_server(lambda:  remote.serve_or_wait_for_space(self.get_argument("yypc_path"), [
-            self.get_argument("project_path"), 
-            '-o', self.get_argument("output_folder"),
+        Executes the command to run the server. The project configuration (with the server information) is
+        saved into the project, which is built once with YYPC (or reused from the build store), then the
+        produced executable is run (and restarted when it exits) while the servers manage the tests.
+        """
+        trace_file = self.get_argument('trace_file')
+        if trace_file:
+            TRACER.start(self.get_root_folder() / trace_file)
+
+        project_path = self.prepare_project(Path(self.get_argument('project_path')))
+        self.project_write_config(project_path)
+
+        run_name = self.get_argument('run_name') + shard_utils.get_run_suffix(self.get_argument('shard'))
+        capabilities = RemoteProtocol.capabilities_from_options(self.get_argument('compression'), self.get_argument('result_encoding'), self.get_argument('max_in_flight'))
+        test_index = get_test_index(project_path.parent)
+        mode = ExecutionMode.MANUAL if self.get_argument('manual') else ExecutionMode.AUTOMATIC
+        remote = RemoteControlServer(mode, run_name=run_name, capabilities=capabilities, max_in_flight=self.get_argument('max_in_flight'), test_index=test_index, recorder=self.get_recorder(run_name), output_path=self.get_results_folder(), **shard_utils.get_server_options(self.get_argument('shard'), self.get_argument('shard_strategy'), self.get_argument('shard_durations')), **crash_utils.get_server_options(self.get_argument('crash_history'), f"{project_path.stem}_{self.get_argument('target_triple')}", self.get_argument('max_restart_delay'), self.get_argument('crash_loop_limit')))
+
+        output_folder = Path(self.get_argument('output_folder'))
+        if self.get_run_id():
+            output_folder = output_folder / self.get_run_id()
+        output_folder.mkdir(parents=True, exist_ok=True)
+
+        # Clean results folder (the results of namespaced runs are kept)
+        results_folder = self.get_results_folder()
+        results_folder.mkdir(parents=True, exist_ok=True)
+        file_utils.clean_directory(results_folder, files_only=True)
+
+        # Build once (or reuse a previous build), the executable is then run (and restarted) directly
+        with TRACER.span('build'):
+            executable = await self.build(project_path, output_folder)
+
+        if executable is None or self.get_argument('mode') == 'build-only':
+            self.close_sockets()
+            if trace_file:
+                LOGGER.info(f"Trace written to {TRACER.save()}")
+            if executable is None:
+                sys.exit(1)
+            return
+
+        run_args = shlex.split(self.get_argument('run_arguments'), posix=os.name != 'nt')
+        await manage_server(lambda: remote.serve_or_wait_for_space(executable, run_args, cwd=executable.parent, sock=self.get_remote_socket()), sock=self.get_http_socket(), debug_endpoints=self.get_argument('debug_endpoints'), output_path=self.get_results_folder())
+
+        if trace_file:
+            LOGGER.info(f"Trace written to {TRACER.save()}")
+
+    def get_build_args(self, project_path: Path, output_folder: Path) -> list[str]:
+        return [
+            str(project_path),
+            '-o', str(output_folder),
             '-t', self.get_argument("template_folder"),
             f'-toolchain={self.get_argument("toolchain_folder")}',
             f'-target-triple={self.get_argument("target_triple")}',
             f'-asset-compiler={self.get_argument("asset_compiler_path")}',
             f'-asset-compiler-args={self.get_argument("asset_compiler_args")}',
-            f'-build-type=build-run',
+            f'-build-type=build-only',
             f'-script-build-type={self.get_argument("script_build_type")}',
             f'-mode={self.get_argument("mode")}',
-            f'-run-args={self.get_argument("run_arguments")}',
-            '-v'], port=TCP_PORT))
+            '-v']
+
+    def get_build_key(self, project_path: Path) -> str:
+        """
+        Returns the key of the project's build in the build store: a fingerprint of the project files
+        (except the injected config, see 'refresh_config'), the compiler and the build options.
+        """
+        yypc_path = Path(self.get_argument('yypc_path'))
+        yypc_stat = yypc_path.stat() if yypc_path.exists() else None
+        options = [str(yypc_path.resolve()), str(yypc_stat.st_size if yypc_stat else 0), str(yypc_stat.st_mtime_ns if yypc_stat else 0)]
+        options += self.get_build_args(Path(project_path.name), Path('output'))
+        options += [self.get_argument('build_type'), self.get_argument('executable') or '']
+
+        fingerprint = cache_utils.fingerprint_folder(project_path.parent, frozenset([CONFIG_FILE]), tuple(options))
+        return f'{project_path.stem}-{fingerprint[:16]}'
+
+    def get_executable(self, project_path: Path, output_folder: Path) -> Optional[Path]:
+        executable = output_folder / (self.get_argument('executable') or f'{project_path.stem}.exe')
+        if executable.exists():
+            return executable
+
+        # Fall back on the newest executable of the output
+        candidates = sorted(output_folder.rglob('*.exe'), key=lambda path: path.stat().st_mtime, reverse=True)
+        return candidates[0] if candidates else None
+
+    def refresh_config(self, project_path: Path, output_folder: Path) -> int:
+        """
+        Replaces the copies of the project config in a reused build with the one written for this run (new ports).
+
+        Returns:
+            int: The number of copies replaced (none if the build doesn't keep the config as a loose file).
+        """
+        config = (project_path.parent / CONFIG_FILE).read_text(encoding='utf-8')
+        refreshed = 0
+        for path in output_folder.rglob('config.json'):
+            try:
+                if 'HttpPublisher.port' not in json.loads(path.read_text(encoding='utf-8')):
+                    continue
+            except (OSError, ValueError):
+                continue
+            path.write_text(config, encoding='utf-8')
+            refreshed += 1
+            LOGGER.debug(f"Refreshed the config of the build: {path}")
+        return refreshed
+
+    async def compile(self, project_path: Path, output_folder: Path) -> Optional[Path]:
+        """
+        Runs YYPC on the project (no build store).
+
+        Returns:
+            Path: The executable produced by the build, None if the build failed.
+        """
+        try:
+            await async_utils.run_and_capture(self.get_argument('yypc_path'), self.get_build_args(project_path, output_folder))
+        except subprocess.CalledProcessError as e:
+            LOGGER.error(f"The build failed (YYPC return code: {e.returncode})")
+            return None
+        return self.get_checked_executable(project_path, output_folder)
+
+    async def build(self, project_path: Path, output_folder: Path) -> Optional[Path]:
+        """
+        Builds the project with YYPC into the output folder, unless the build store has a build of the same
+        inputs (it's then copied into the output folder instead).
+
+        Returns:
+            Path: The executable produced by the build, None if the build failed.
+        """
+        budget = int(self.get_argument('build_store_budget') * cache_utils.GIGABYTE)
+        if budget <= 0:
+            return await self.compile(project_path, output_folder)
+
+        store = cache_utils.LruStore(Path(self.get_argument('build_store')), budget)
+        key = await asyncio.to_thread(self.get_build_key, project_path)
+
+        async with store.lock():
+            store.lease(key)
+        try:
+            async with store.entry_lock(key):
+                metadata = store.get_metadata(key)
+                cached_folder = store.get_path(key) / 'output'
+
+                if metadata is not None and cached_folder.exists():
+                    LOGGER.info(f"Reusing build '{key}' from the store (project and build options unchanged)")
+                    file_utils.clean_directory(output_folder)
+                    await asyncio.to_thread(shutil.copytree, cached_folder, output_folder, dirs_exist_ok=True)
+
+                    # The reused build would publish to the ports of the run that built it
+                    if await asyncio.to_thread(self.refresh_config, project_path, output_folder):
+                        async with store.lock():
+                            store.touch(key)
+                        return self.get_checked_executable(project_path, output_folder)
+
+                    LOGGER.warning(f"The build '{key}' has no loose copy of {CONFIG_FILE} to refresh, rebuilding it")
+                    file_utils.clean_directory(output_folder)
+                else:
+                    LOGGER.info(f"Building '{key}' (not in the store)")
+
+                executable = await self.compile(project_path, output_folder)
+
+                # Only successful builds are kept, and only if they can be pointed at the ports of later runs
+                if executable is not None and await asyncio.to_thread(self.refresh_config, project_path, output_folder):
+                    shutil.rmtree(cached_folder, ignore_errors=True)
+                    await asyncio.to_thread(shutil.copytree, output_folder, cached_folder)
+                    async with store.lock():
+                        await asyncio.to_thread(store.set_metadata, key, project=str(project_path), executable=executable.relative_to(output_folder).as_posix())
+                        await asyncio.to_thread(store.evict, keep=(key,))
+                elif executable is not None:
+                    LOGGER.warning(f"The build '{key}' has no loose copy of {CONFIG_FILE}, it's not kept in the store")
+                    shutil.rmtree(cached_folder, ignore_errors=True)
+                return executable
+        finally:
+            store.release(key)
+
+    def get_checked_executable(self, project_path: Path, output_folder: Path) -> Optional[Path]:
+        executable = self.get_executable(project_path, output_folder)
+        if executable is None:
+            LOGGER.error(f"The build didn't produce an executable in {output_folder}")
+        return executable
 
-    def project_write_config(self):
-        project_path = self.get_argument("project_path")
+    def project_write_config(self, project_path: Path):
         project_config = self.get_argument("project_config")
         yyp_folder = Path(project_path).parent
 
         config_data = {
-            **DEFAULT_CONFIG,
+            **self.get_default_config(),
             **project_config,
+            'HttpPublisher.compress': self.get_argument('compression') == 'zlib',
             '$$parameters$$.remote_server': True,
         }
 
@@ -0,0 +1,67 @@
+import argparse
+import sys
+from pathlib import Path
+
+from classes.commands.BaseCommand import BaseCommand
+from classes.server import SessionRecorder, SimulatedRunner
+from classes.server.RemoteProtocol import Capability
+from utils import network_utils
+from utils.logging_utils import LOGGER
+
+class SimulateRunnerCommand(BaseCommand):
+    """
+    Command class for running a simulated runner. It connects to a remote control server and talks
+    the same TCP protocol as the GameMaker runner, either running synthetic tests or replaying a
+    recorded session (see '--record-session'). Useful to exercise the launcher without GameMaker.
+    """
+
+    @classmethod
+    def register_command(cls, subparsers: argparse._SubParsersAction):
+        """
+        Registers the 'simulateRunner' command with the argument parser.
+
+        Args:
+            subparsers (argparse._SubParsersAction): The subparsers action from argparse to add the command to.
+        """
+        parser: argparse.ArgumentParser = subparsers.add_parser('simulateRunner', help='Runs a simulated runner against a remote control server (no GameMaker install required)')
+        parser.add_argument('-ho', '--host', type=str, default=None, help='The address of the remote control server (default: the local ip address)')
+        parser.add_argument('-po', '--port', type=int, required=True, help='The port of the remote control server')
+        parser.add_argument('-n', '--test-count', type=int, default=200, help='The number of synthetic tests (default: 200)')
+        parser.add_argument('-d', '--duration-ms', type=float, default=0, help='How long each synthetic test takes, in milliseconds (default: 0)')
+        parser.add_argument('-fr', '--failure-rate', type=float, default=0.1, help='The ratio of failed tests (default: 0.1)')
+        parser.add_argument('-cr', '--crash-rate', type=float, default=0, help='The ratio of tests that crash the runner (default: 0)')
+        parser.add_argument('-hr', '--hang-rate', type=float, default=0, help='The ratio of tests that hang the runner (default: 0)')
+        parser.add_argument('-ar', '--async-rate', type=float, default=0, help='The ratio of async tests, run concurrently when multiplexing (default: 0)')
+        parser.add_argument('-s', '--seed', type=int, default=0, help='The seed used to generate the tests (default: 0)')
+        parser.add_argument('-ses', '--session', type=str, default=None, help='A recorded session to replay instead of running synthetic tests')
+        parser.add_argument('-spd', '--speed', type=float, default=0, help='Replay speed relative to the recording (default: 0, reply immediately)')
+        parser.add_argument('-cap', '--capabilities', type=str, default=','.join(capability.value for capability in Capability), help='A comma separated list of the capabilities to accept (default: all)')
+        parser.set_defaults(command_class=cls)
+
+    async def execute(self):
+        """
+        Runs the simulated runner until the server tells it to exit. A simulated crash exits with
+        code 3, so a monitoring process (ie.: 'run_and_monitor_exe') restarts it like a real runner.
+        """
+        capabilities = [Capability(name.strip()) for name in self.get_argument('capabilities').split(',') if name.strip()]
+
+        session = None
+        tests = None
+        if self.get_argument('session'):
+            session = SessionRecorder.load_session(Path(self.get_argument('session')))
+        else:
+            tests = SimulatedRunner.generate_tests(
+                self.get_argument('test_count'),
+                duration=self.get_argument('duration_ms') / 1000,
+                failure_rate=self.get_argument('failure_rate'),
+                crash_rate=self.get_argument('crash_rate'),
+                hang_rate=self.get_argument('hang_rate'),
+                async_rate=self.get_argument('async_rate'),
+                seed=self.get_argument('seed'))
+
+        runner = SimulatedRunner.SimulatedRunner(tests=tests, session=session, capabilities=capabilities, speed=self.get_argument('speed'))
+        outcome = await runner.run(self.get_argument('host') or network_utils.get_local_ip(), self.get_argument('port'))
+        LOGGER.info(f"Simulated runner finished ({outcome})")
+
+        if outcome == SimulatedRunner.OUTCOME_CRASH:
+            sys.exit(3)
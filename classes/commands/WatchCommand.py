@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import re
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from classes.commands.IgorRunTestsCommand import IgorRunTestsCommand
+from classes.commands.IndexTestsCommand import get_test_index
+from classes.model.TestIndex import TestIndex
+from classes.model.TestResult import TestResult
+from classes.server.TestFrameworkServer import manage_server
+from utils import watch_utils
+from utils.logging_utils import LOGGER
+
+# Changes to these files can only affect the tests of the suites they declare (any other change can affect every test)
+SUITE_FILE = re.compile(r'^scripts/[^/]*TestSuite/')
+
+# Files of the project written by the launcher itself
+IGNORED_FILES = frozenset(['datafiles/config.json'])
+
+class WatchCommand(IgorRunTestsCommand):
+    """
+    Command class for the edit and run loop: the setup (igor, licence, runtime, emulator) and the test
+    server are done once, then the project is rebuilt (incrementally, through its compile cache) and the
+    affected suites are run again every time its files change. Results are streamed to the console.
+    """
+
+    def __init__(self, options: argparse.Namespace):
+        IgorRunTestsCommand.__init__(self, options)
+
+        # Whether the run in progress was stopped by a newer change
+        self.cycle_stopped = False
+
+    @classmethod
+    def register_command(cls, subparsers: argparse._SubParsersAction):
+        """
+        Registers the 'watch' command with the argument parser.
+
+        Args:
+            subparsers (argparse._SubParsersAction): The subparsers action from argparse to add the command to.
+        """
+        parser: argparse.ArgumentParser = subparsers.add_parser('watch', help='Re-runs the affected test suites whenever the project changes')
+        cls.add_arguments(parser)
+        parser.add_argument('-pi', '--poll-interval', type=float, default=0.5, help='How often the project files are checked for changes, in seconds (default: 0.5)')
+        parser.add_argument('-db', '--debounce', type=float, default=0.3, help='How long the project files must stay unchanged before a rebuild, in seconds (default: 0.3)')
+        parser.set_defaults(command_class=cls)
+
+    async def run_pipeline(self):
+        projects: list[Path] = self.get_argument('project_path')
+        if len(projects) > 1:
+            raise ValueError('The watch command runs a single project')
+
+        device_pool, setup = await self.prepare_run()
+
+        runtime_path: Path = setup['install runtime']
+        platform = device_pool.platforms[0]
+        runner = self.get_runners()[0] if platform != 'HTML5' else None
+        if len(device_pool.platforms) > 1 or len(self.get_runners()) > 1:
+            LOGGER.warning(f"Only the first target and runner are watched ({platform}, {runner or 'default'})")
+
+        run = {
+            'igor_path': self.get_igor_runner_path(runtime_path),
+            'project_file': setup['prepare projects'][0],
+            'user_folder': setup['copy user folder'],
+            'runtime_path': runtime_path,
+            'platform': platform,
+            'runner': runner,
+            'run_name': f"{self.get_argument('run_name')}_watch_{platform}{f'_{runner}' if runner else ''}",
+            'use_nobuild': self.accepts_no_build_param(setup['runtime info']),
+        }
+
+        # The devices are kept for the whole session (a build is shared by the devices of the platform when it's run with '/nobuild')
+        fan_out = bool(runner and run['use_nobuild'])
+        async with device_pool.lease(platform, None if fan_out else 1) as devices:
+            await manage_server(lambda: self.watch(projects[0].parent, { **run, 'devices': devices }), sock=self.get_http_socket(), debug_endpoints=self.get_argument('debug_endpoints'), output_path=self.get_results_folder())
+
+    async def watch(self, source_folder: Path, run: dict[str, Any]):
+        """
+        Runs the tests, then waits for changes and runs the affected suites again (until interrupted).
+        A change made while the tests are being built or run restarts them.
+        """
+        project_file: Path = run['project_file']
+        project_name = self.get_project_name(project_file)
+
+        snapshot = await asyncio.to_thread(watch_utils.snapshot_folder, source_folder, IGNORED_FILES)
+        index = await asyncio.to_thread(get_test_index, project_file.parent)
+        suites: Optional[list[str]] = None
+        changed_at = time.perf_counter()
+
+        while True:
+            cycle = asyncio.create_task(self.run_cycle(run, suites, changed_at))
+            interrupted = False
+
+            LOGGER.info(f"Watching {source_folder} for changes (Ctrl+C to stop)")
+            changes_task = asyncio.create_task(watch_utils.wait_for_changes(source_folder, snapshot, self.get_argument('poll_interval'), self.get_argument('debounce'), IGNORED_FILES))
+            try:
+                snapshot, changes = await changes_task
+            finally:
+                changes_task.cancel()
+                if not cycle.done():
+                    # Changed while building or running, the tests are stopped and the next cycle starts over
+                    LOGGER.info('Project changed, stopping the current run')
+                    interrupted = True
+                    await self.stop_cycle(cycle, project_name)
+
+            changed_at = time.perf_counter()
+            LOGGER.info(f"Changed: {', '.join(changes)}")
+
+            # A namespaced run builds a copy of the project (see 'prepare_project')
+            if project_file.parent != source_folder:
+                await asyncio.to_thread(watch_utils.sync_changes, source_folder, project_file.parent, changes)
+
+            new_index = await asyncio.to_thread(get_test_index, project_file.parent)
+            affected = self.get_affected_suites(index, new_index, changes)
+            index = new_index
+
+            # The suites of a stopped run still have to run
+            if interrupted:
+                suites = None if suites is None or affected is None else sorted(set(suites) | set(affected))
+            else:
+                suites = affected
+
+    async def stop_cycle(self, cycle: asyncio.Task, project_name: str):
+        self.cycle_stopped = True
+        remote_server = self.remote_servers.get(project_name)
+        if remote_server is not None:
+            # Stopping the server stops (and waits for) the runners
+            remote_server.stop_event.set()
+            await asyncio.gather(cycle, return_exceptions=True)
+        else:
+            cycle.cancel()
+            await asyncio.gather(cycle, return_exceptions=True)
+
+    async def run_cycle(self, run: dict[str, Any], suites: Optional[list[str]], changed_at: float):
+        """
+        Builds the project and runs the given suites (all of them when None), logging each result as it comes in.
+        """
+        if suites is not None and not suites:
+            LOGGER.info('No test suite affected by the changes')
+            return
+
+        counts = { 'passed': 0, 'failed': 0, 'skipped': 0 }
+        self.cycle_stopped = False
+
+        def on_result(suite: str, result: TestResult):
+            status = 'failed' if result.did_fail() or result.did_error() else 'skipped' if result.was_skipped() else 'passed'
+            counts[status] += 1
+            LOGGER.info(f"[{status.upper()}] {suite}@{result.name} ({result.duration / 1000:.1f}ms)")
+            for error in result.errors or []:
+                LOGGER.info(f"    {error.get('message', error) if isinstance(error, dict) else error}")
+
+        try:
+            await self.igor_run_tests(**run, server_options={ 'suites': suites, 'result_callback': on_result })
+        except Exception as e:
+            # A broken build doesn't end the session, the next change is tried again
+            LOGGER.error(f"Run failed: {e!r}")
+            return
+
+        LOGGER.info(f"{'All suites' if suites is None else f'Suites {suites}'}{' (stopped)' if self.cycle_stopped else ''}: {counts['passed']} passed, {counts['failed']} failed, {counts['skipped']} skipped ({time.perf_counter() - changed_at:.1f}s since the change)")
+
+    @staticmethod
+    def get_affected_suites(old_index: TestIndex, new_index: TestIndex, changes: list[str]) -> Optional[list[str]]:
+        """
+        Returns the registered suites whose scripts changed (or were added), None when a change can affect
+        any test (ie.: objects, shared scripts or the runner registering the suites).
+        """
+        if any(not SUITE_FILE.match(change) for change in changes):
+            return None
+
+        fingerprints = { suite.name: suite.fingerprint for suite in old_index.suites }
+        return [suite.name for suite in new_index.get_registered_suites() if fingerprints.get(suite.name) != suite.fingerprint]
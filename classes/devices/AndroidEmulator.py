@@ -0,0 +1,289 @@
+import asyncio
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+import psutil
+
+from utils import async_utils, cache_utils
+from utils.logging_utils import LOGGER
+from utils.trace_utils import TRACER
+
+EXE_SUFFIX = '.exe' if os.name == 'nt' else ''
+
+# Console ports the emulator accepts (the adb serial is 'emulator-<port>')
+FIRST_CONSOLE_PORT = 5554
+LAST_CONSOLE_PORT = 5682
+
+# Snapshot modes (any other value is the name of a snapshot to load)
+SNAPSHOT_QUICKBOOT = 'quickboot'
+SNAPSHOT_COLD = 'cold'
+
+# Booting the same AVD twice fails, launchers on the same machine take turns (see 'start')
+LOCK_DIR = cache_utils.CACHE_ROOT / 'emulators'
+
+# Launchers using an emulator hold a lease (one file per process, by AVD), it isn't stopped while leased (see 'stop')
+LEASE_DIR = LOCK_DIR / '.leases'
+
+class EmulatorError(Exception):
+    pass
+
+class AndroidEmulator:
+    """
+    Boots (or reuses) an Android emulator without blocking the event loop. The emulator boots from its
+    quickboot snapshot by default and is ready once 'adb wait-for-device' returns and 'sys.boot_completed'
+    is set. With 'keep_alive' the emulator is left running when the launcher exits, the next invocation
+    finds it through adb and skips the boot altogether. An emulator is only stopped by the launcher that
+    booted it, and not while other launchers still use it.
+
+    The 'adb' and 'emulator' executables default to the ones of the SDK, they can be replaced by any
+    program answering the same commands (ie.: a script faking them).
+    """
+
+    def __init__(self, sdk_path: Optional[Path], avd: Optional[str] = None, snapshot: str = SNAPSHOT_QUICKBOOT, headless: bool = False, keep_alive: bool = False, boot_timeout: float = 300, adb_path: Optional[Path] = None, emulator_path: Optional[Path] = None, log_path: Optional[Path] = None):
+        """
+        Args:
+            sdk_path (Path): The Android SDK folder (only used to find 'adb' and 'emulator').
+            avd (str): The AVD to boot (default: the first one listed by the emulator).
+            snapshot (str): 'quickboot' (load and save the quickboot snapshot), 'cold' (no snapshots) or the name of a snapshot to load (left unchanged).
+            headless (bool): Runs the emulator without window, audio and boot animation.
+            keep_alive (bool): Leaves the emulator running once the launcher is done.
+            boot_timeout (float): How long to wait for the boot to complete (in seconds).
+            log_path (Path): The file the emulator output is written to (default: discarded).
+        """
+        self.adb_path = adb_path or sdk_path / 'platform-tools' / f'adb{EXE_SUFFIX}'
+        self.emulator_path = emulator_path or sdk_path / 'emulator' / f'emulator{EXE_SUFFIX}'
+        self.avd = avd
+        self.snapshot = snapshot
+        self.headless = headless
+        self.keep_alive = keep_alive
+        self.boot_timeout = boot_timeout
+        self.log_path = log_path
+
+        self.serial: Optional[str] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.booted = False
+
+    async def run_tool(self, exe_path: Path, args: list[str], timeout: float = 30) -> tuple[int, str]:
+        """
+        Runs 'adb' or 'emulator' and returns its exit code and output (killed after 'timeout' seconds).
+        """
+        process = await asyncio.create_subprocess_exec(exe_path, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, stdin=asyncio.subprocess.DEVNULL)
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            async_utils.kill_process_tree(process.pid)
+            await process.wait()
+            raise
+        return process.returncode, stdout.decode('utf-8', errors='replace').strip()
+
+    async def adb(self, *args: str, timeout: float = 30) -> tuple[int, str]:
+        return await self.run_tool(self.adb_path, list(args), timeout)
+
+    async def list_avds(self) -> list[str]:
+        _, output = await self.run_tool(self.emulator_path, ['-list-avds'])
+        # Newer emulators print warnings before the list
+        return [line.strip() for line in output.splitlines() if line.strip() and not line.startswith(('INFO', 'WARNING', 'ERROR'))]
+
+    async def list_devices(self) -> dict[str, str]:
+        """
+        Returns the emulators known by adb (serial: state, ie.: 'emulator-5554': 'device').
+        """
+        _, output = await self.adb('devices')
+        devices = {}
+        for line in output.splitlines()[1:]:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].startswith('emulator-'):
+                devices[parts[0]] = parts[1]
+        return devices
+
+    async def get_avd_name(self, serial: str) -> Optional[str]:
+        returncode, output = await self.adb('-s', serial, 'emu', 'avd', 'name')
+        lines = output.splitlines()
+        return lines[0].strip() if returncode == 0 and lines else None
+
+    async def find_running(self) -> Optional[str]:
+        """
+        Returns the serial of a running emulator of the AVD, or None.
+        """
+        for serial in await self.list_devices():
+            if await self.get_avd_name(serial) == self.avd:
+                return serial
+        return None
+
+    async def is_booted(self, serial: str) -> bool:
+        returncode, output = await self.adb('-s', serial, 'shell', 'getprop', 'sys.boot_completed')
+        return returncode == 0 and output.strip() == '1'
+
+    def check_process(self, serial: str):
+        if self.process is not None and self.process.poll() is not None:
+            raise EmulatorError(f"Emulator '{serial}' exited with code {self.process.returncode} while booting (see {self.log_path or 'no log'})")
+
+    async def wait_until_booted(self, serial: str):
+        """
+        Waits for the device to come online ('adb wait-for-device') and for Android to finish booting.
+
+        Raises:
+            EmulatorError: If the emulator exits or doesn't boot within 'boot_timeout' seconds.
+        """
+        deadline = time.monotonic() + self.boot_timeout
+
+        # The emulator can die before coming online, its process is checked while adb waits
+        wait_task = asyncio.create_task(self.adb('-s', serial, 'wait-for-device', timeout=self.boot_timeout))
+        try:
+            while not wait_task.done():
+                self.check_process(serial)
+                await asyncio.wait({ wait_task }, timeout=1)
+            await wait_task
+        except asyncio.TimeoutError:
+            raise EmulatorError(f"Emulator '{serial}' didn't come online within {self.boot_timeout}s")
+        finally:
+            wait_task.cancel()
+            await asyncio.gather(wait_task, return_exceptions=True)
+
+        while not await self.is_booted(serial):
+            self.check_process(serial)
+            if time.monotonic() > deadline:
+                raise EmulatorError(f"Emulator '{serial}' didn't finish booting within {self.boot_timeout}s")
+            await asyncio.sleep(1)
+
+    def get_boot_args(self, port: int) -> list[str]:
+        args = ['-avd', self.avd, '-port', str(port)]
+
+        if self.snapshot == SNAPSHOT_COLD:
+            args += ['-no-snapshot']
+        elif self.snapshot != SNAPSHOT_QUICKBOOT:
+            # Named snapshots are kept as they are, each run starts from the same state
+            args += ['-snapshot', self.snapshot, '-no-snapshot-save']
+
+        if self.headless:
+            args += ['-no-window', '-no-audio', '-no-boot-anim']
+        return args
+
+    def spawn(self, args: list[str]) -> subprocess.Popen:
+        # The emulator gets its own session so it can outlive the launcher (see 'keep_alive')
+        options = {}
+        if os.name == 'nt':
+            options['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+        else:
+            options['start_new_session'] = True
+
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'ab') as log:
+                return subprocess.Popen([self.emulator_path, *args], stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, **options)
+        return subprocess.Popen([self.emulator_path, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, **options)
+
+    def _lease_path(self) -> Path:
+        return LEASE_DIR / self.avd / str(os.getpid())
+
+    def lease(self):
+        path = self._lease_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    def release(self):
+        self._lease_path().unlink(missing_ok=True)
+
+    def count_other_leases(self) -> int:
+        """Returns how many other running launchers use the emulator (leases of dead processes are removed)."""
+        folder = self._lease_path().parent
+        if not folder.exists():
+            return 0
+
+        count = 0
+        for lease in folder.iterdir():
+            if lease.name == str(os.getpid()):
+                continue
+            if lease.name.isdigit() and psutil.pid_exists(int(lease.name)):
+                count += 1
+            else:
+                lease.unlink(missing_ok=True)
+        return count
+
+    async def start(self) -> str:
+        """
+        Returns the serial of a booted emulator of the AVD, reusing a running one when possible.
+
+        Raises:
+            EmulatorError: If there's no AVD or the emulator doesn't boot.
+        """
+        if self.avd is None:
+            avds = await self.list_avds()
+            if not avds:
+                raise EmulatorError('No Android Virtual Devices found')
+            self.avd = avds[0]
+
+        async with cache_utils.FileLock(LOCK_DIR / f'{self.avd}.lock', timeout=self.boot_timeout * 2):
+            serial = await self.find_running()
+            if serial is not None:
+                LOGGER.info(f"Reusing running emulator '{serial}' (AVD: {self.avd})")
+                TRACER.instant('emulator reused', serial=serial, avd=self.avd)
+                await self.wait_until_booted(serial)
+                self.serial = serial
+                self.booted = True
+                self.lease()
+                return serial
+
+            used_ports = [int(serial.split('-')[1]) for serial in await self.list_devices() if serial.split('-')[1].isdigit()]
+            port = next((port for port in range(FIRST_CONSOLE_PORT, LAST_CONSOLE_PORT + 1, 2) if port not in used_ports), None)
+            if port is None:
+                raise EmulatorError('No free emulator console port')
+
+            args = self.get_boot_args(port)
+            LOGGER.info(f"Starting AVD '{self.avd}' ({self.snapshot} boot) with arguments {args}")
+            self.serial = f'emulator-{port}'
+            self.process = self.spawn(args)
+
+            start = time.perf_counter()
+            self.lease()
+            await self.wait_until_booted(self.serial)
+            self.booted = True
+            LOGGER.info(f"Emulator '{self.serial}' booted in {time.perf_counter() - start:.2f}s")
+            return self.serial
+
+    async def stop(self):
+        """
+        Stops the emulator if this instance started it, unless it's kept alive or other launchers still use
+        it (emulators that didn't finish booting are always stopped).
+        """
+        if self.avd is not None:
+            self.release()
+
+        if self.process is None:
+            return
+
+        if self.keep_alive and self.booted:
+            LOGGER.info(f"Leaving emulator '{self.serial}' running (kept alive for the next runs)")
+            return
+
+        # Launchers reusing the emulator take the lock first (see 'start'), none can start using it while it stops
+        async with cache_utils.FileLock(LOCK_DIR / f'{self.avd}.lock', timeout=self.boot_timeout * 2):
+            if self.booted and (others := self.count_other_leases()):
+                LOGGER.info(f"Leaving emulator '{self.serial}' running ({others} other launcher(s) still use it)")
+                return
+
+            await self.kill()
+
+    async def kill(self):
+        LOGGER.info(f"Stopping emulator '{self.serial}'")
+        try:
+            await self.adb('-s', self.serial, 'emu', 'kill')
+        except asyncio.TimeoutError:
+            LOGGER.warning(f"Emulator '{self.serial}' didn't answer the kill command")
+
+        # Give it time to shut down (and save the quickboot snapshot) before killing it
+        deadline = time.monotonic() + 60
+        while self.process.poll() is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+
+        if self.process.poll() is None:
+            LOGGER.warning(f"Emulator '{self.serial}' is still running, killing it")
+            async_utils.kill_process_tree(self.process.pid)
+            await asyncio.to_thread(self.process.wait)
+
+        LOGGER.info('Emulator stopped')
+        self.process = None
+        self.booted = False
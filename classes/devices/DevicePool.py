@@ -0,0 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+
+from utils.logging_utils import LOGGER
+
+class DevicePool:
+    """
+    The devices of each platform a run targets (several per platform, ie.: a farm of identical Android
+    devices). A device is leased to one matrix cell at a time, a cell leases every free device of its
+    platform so the tests of its build are shared between them. Shared devices (ie.: the local machine)
+    can be leased by several cells at once (the projects of a batch run on them concurrently).
+    """
+
+    def __init__(self, targets: list[tuple[str, str]], shared: Iterable[tuple[str, str]] = ()):
+        """
+        Args:
+            targets (list[tuple[str, str]]): The (platform, device) pairs, in the order they were given.
+            shared (Iterable[tuple[str, str]]): The (platform, device) pairs that are never leased exclusively.
+        """
+        self.devices: dict[str, list[str]] = {}
+        for platform, device in targets:
+            devices = self.devices.setdefault(platform, [])
+            if device in devices:
+                LOGGER.warning(f"Ignoring duplicated target '{platform}|{device}'")
+                continue
+            devices.append(device)
+
+        self.shared = set(shared)
+        self.leased: set[tuple[str, str]] = set()
+        self.changed = asyncio.Condition()
+
+    @property
+    def platforms(self) -> list[str]:
+        return list(self.devices.keys())
+
+    def get_free_devices(self, platform: str) -> list[str]:
+        return [device for device in self.devices[platform] if (platform, device) not in self.leased]
+
+    @asynccontextmanager
+    async def lease(self, platform: str, count: Optional[int] = None) -> AsyncIterator[list[str]]:
+        """
+        Leases the free devices of a platform (at most 'count', default: all of them), waiting until at
+        least one is free. The devices are given back when the block exits.
+        """
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.get_free_devices(platform))
+            devices = self.get_free_devices(platform)[:count]
+            self.leased.update((platform, device) for device in devices if (platform, device) not in self.shared)
+
+        try:
+            yield devices
+        finally:
+            async with self.changed:
+                self.leased.difference_update((platform, device) for device in devices)
+                self.changed.notify_all()
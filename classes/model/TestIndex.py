@@ -0,0 +1,72 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class IndexedTest(BaseModel):
+    name: Optional[str] = None
+    kind: str = "fact"
+    line: int = 0
+    object: Optional[str] = None
+    platform_filter: Optional[str] = None
+    disabled: bool = False
+    exclusive: bool = False
+
+    def is_async(self):
+        return self.kind != "fact"
+
+    def get_flags(self) -> list[str]:
+        """
+        Returns the flags reported by the runner for this test (see the TESTS command when multiplexing).
+        """
+        flags = []
+        if self.is_async():
+            flags.append("async")
+        if self.exclusive:
+            flags.append("exclusive")
+        return flags
+
+class IndexedSuite(BaseModel):
+    name: str = ""
+    file: str = ""
+    fingerprint: str = ""
+    tags: list[str] = []
+    folder: Optional[str] = None
+    registered: bool = False
+    platform_filter: Optional[str] = None
+    tests: list[IndexedTest] = []
+
+    def get_test_paths(self) -> list[str]:
+        return [f'{self.name}@{test.name}' for test in self.tests if test.name is not None]
+
+    def has_dynamic_tests(self):
+        return any(test.name is None for test in self.tests)
+
+class TestIndex(BaseModel):
+    project: str = ""
+    suites: list[IndexedSuite] = []
+
+    def get_registered_suites(self) -> list[IndexedSuite]:
+        return [suite for suite in self.suites if suite.registered]
+
+    def get_test_paths(self) -> list[str]:
+        """
+        Returns the test paths ('<suite>@<test>') in the same order as the runner's TESTS command.
+        """
+        return [path for suite in self.get_registered_suites() for path in suite.get_test_paths()]
+
+    def get_test_flags(self) -> dict[str, list[str]]:
+        return { f'{suite.name}@{test.name}': test.get_flags() for suite in self.get_registered_suites() for test in suite.tests if test.name is not None }
+
+    def get_test_count(self):
+        return sum(len(suite.tests) for suite in self.get_registered_suites())
+
+    def to_summary(self):
+        registered = self.get_registered_suites()
+        return {
+            'suites': len(registered),
+            'unregistered_suites': [suite.name for suite in self.suites if not suite.registered],
+            'tests': self.get_test_count(),
+            'async_tests': sum(1 for suite in registered for test in suite.tests if test.is_async()),
+            'filtered_tests': sum(1 for suite in registered for test in suite.tests if test.platform_filter or suite.platform_filter),
+            'disabled_tests': sum(1 for suite in registered for test in suite.tests if test.disabled),
+            'dynamic_tests': sum(1 for suite in registered for test in suite.tests if test.name is None),
+        }
@@ -1,16 +1,37 @@
 import asyncio
+import fnmatch
+import functools
+import socket
 import time
+from collections import deque
 from enum import Enum, auto
 from pathlib import Path
-from typing import Any, Coroutine, Optional
+from typing import Any, Callable, Coroutine, Optional, Union
 from xml.etree import ElementTree
 from classes.model.TestFrameworkResult import TestFrameworkResult
+from classes.model.TestIndex import TestIndex
 from classes.model.TestResult import TestResult
 from classes.model.TestSuiteResult import TestSuiteResult
-from utils import async_utils, data_utils, file_utils, network_utils
+from classes.server import RemoteProtocol
+from classes.server.RemoteProtocol import Capability
+from classes.server.SessionRecorder import SessionRecorder
+from utils import async_utils, console_utils, crash_utils, data_utils, file_utils, network_utils, shard_utils, test_index_utils
+from utils.metrics_utils import REGISTRY
+from utils.trace_utils import TRACER
 from utils.logging_utils import LOGGER
 from utils.path_utils import ROOT_DIR
 
+# Maximum size of a single frame received from the runner
+MAX_FRAME_SIZE = 8000000
+
+# Metrics (exposed by the '/metrics' endpoint of the test server)
+TESTS_TOTAL = REGISTRY.gauge('gmtf_tests_total', 'Tests to run', ('run',))
+TESTS_COMPLETED = REGISTRY.counter('gmtf_tests_completed_total', 'Tests completed (including the ones failed by a crash or a hang)', ('run', 'result'))
+TESTS_PER_SECOND = REGISTRY.gauge('gmtf_tests_per_second', 'Average test throughput since the run started', ('run',))
+COMMAND_ROUND_TRIP = REGISTRY.histogram('gmtf_command_round_trip_seconds', 'Time between sending a command to the runner and receiving its reply', ('run', 'command'))
+RUNNER_TIMEOUTS = REGISTRY.counter('gmtf_runner_timeouts_total', 'Times the runner did not reply in time (and was killed)', ('run',))
+BYTES_RECEIVED = REGISTRY.counter('gmtf_bytes_received_total', 'Frame payload bytes received from the runner', ('run',))
+
 class ExecutionMode(Enum):
     AUTOMATIC = "automatic"
     MANUAL = "manual"
@@ -22,34 +43,122 @@ class State(Enum):
     FINISHED = auto()
 
 class RemoteCommand(Enum):
+    HELLO = "HELLO"
     GET_TESTS = "TESTS"
     RUN = "RUN {}"  # Placeholder for test path
+    RUN_TAGGED = "RUN {} {}"  # Placeholders for request id and test path (when multiplexing)
     EXIT = "EXIT"
     QUIT = "QUIT"
 
+class ConsoleCommand(Enum):
+    """
+    Commands of the manual mode console handled by the server itself (anything else is sent to the runner).
+    """
+    RUN = "RUN"  # Followed by a glob pattern (ie.: 'BasicArrayTestSuite@*'), a test path is sent to the runner as is
+    STOP = "STOP"
+    HISTORY = "HISTORY"
+    HELP = "HELP"
+
+CONSOLE_HELP = """Commands are sent to the runner (TESTS, RUN <test>, EXIT, QUIT, ...), except:
+    RUN <glob>    Runs every test matching the pattern (ie.: BasicArrayTestSuite@*), streaming the results
+    STOP          Stops the tests started by 'RUN <glob>' once the current one is done
+    HISTORY       Lists the previous commands, '!<n>' runs the n-th one again
+Several commands can be given at once separated by ';', the runner commands are sent together and their replies read in order."""
+
+class RunnerLane:
+    """
+    A connected runner. Runners sharing the tests (ie.: the same build running on every device of a
+    device pool) each get a lane holding the tests it was sent and the commands waiting for its reply.
+    """
+
+    def __init__(self, index: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.index = index
+        self.reader = reader
+        self.writer = writer
+        self.in_flight: dict[Optional[int], str] = {}
+        self.sent_at: dict[Optional[int], tuple[str, float, str]] = {}
+
+        # The protocol features negotiated with this runner (see 'RemoteControlServer._negotiate_capabilities')
+        self.capabilities: list[Capability] = []
+
+        # The runner executable this connection is attributed to (see 'RemoteControlServer.serve_runners')
+        self.runner: Optional[int] = None
+
 class RemoteControlServer:
 
-    def __init__(self, mode: ExecutionMode, timeout: int = 1, run_name = 'xUnit'):
+    def __init__(self, mode: ExecutionMode, timeout: float = 1, run_name = 'xUnit', capabilities: Optional[list[Capability]] = None, max_in_flight: int = 1, test_index: Optional[TestIndex] = None, shard: Optional[tuple[int, int]] = None, shard_strategy: str = 'hash', durations: Optional[dict[str, float]] = None, recorder: Optional[SessionRecorder] = None, output_path: Optional[Path] = None, suites: Optional[list[str]] = None, result_callback: Optional[Callable[[str, TestResult], None]] = None, crash_history: Optional[crash_utils.CrashHistory] = None, restart_delay: float = 0.5, max_restart_delay: float = crash_utils.DEFAULT_MAX_RESTART_DELAY, crash_loop_limit: int = crash_utils.DEFAULT_CRASH_LOOP_LIMIT):
         """
         Initialize the RemoteControlServer with the given mode.
         
         Args:
             mode (Mode): The mode of operation, either AUTOMATIC or MANUAL.
+            capabilities (list[Capability]): Optional protocol features to offer to the runner.
+            max_in_flight (int): Maximum number of async tests running at once (requires the MULTIPLEX capability).
+            test_index (TestIndex): The static test index of the project, checked against the tests reported by the runner (optional).
+            shard (tuple[int, int]): Only run the tests of this shard (1 based index, count).
+            shard_strategy (str): How tests are assigned to shards, either 'hash' or 'duration'.
+            durations (dict[str, float]): Known test durations (used by the 'duration' strategy).
+            recorder (SessionRecorder): Records the session (commands and frames) for later replay (optional).
+            output_path (Path): The folder where the result files are written (default: results).
+            suites (list[str]): Only run the tests of these suites (default: all of them).
+            result_callback (Callable): Called with the suite name and result of every test as they come in (ie.: to stream them to the console).
+            crash_history (CrashHistory): The tests that crashed the runner in previous runs (run last), updated with the crashes of this run (optional).
+            restart_delay (float): The wait before restarting a runner that exited (in seconds).
+            max_restart_delay (float): The longest wait before restarting a runner that keeps exiting before running a test.
+            crash_loop_limit (int): The remaining tests are failed once the runners exited this many times in a row before running a test (0: never).
         """
         self.mode = mode
         self.timeout = timeout
         self.run_name = run_name
+        self.max_in_flight = max(1, max_in_flight)
+        self.test_index = test_index
+        self.shard = shard
+        self.shard_strategy = shard_strategy
+        self.durations = durations or {}
+        self.recorder = recorder
+        self.output_path = output_path or ROOT_DIR / 'results'
+        self.suites = suites
+        self.result_callback = result_callback
+        self.crash_history = crash_history
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.crash_loop_limit = crash_loop_limit
+
+        self.offered_capabilities = capabilities or []
 
         self.tests = []
+        self.test_flags: dict[str, set[str]] = {}
         self.current_test_index = 0
+        self.retry_tests: deque[str] = deque()
+        self.next_request_id = 0
+        self.started_at: Optional[float] = None
+        self.completed_tests = 0
         self.state = State.WAITING
         self.stop_event = asyncio.Event()
         self.reboot_event = asyncio.Event()
         self.strategy = self._select_strategy()
+
+        # Connected runners (several when they share the tests, see 'serve_runners')
+        self.lanes: list[RunnerLane] = []
+        self.next_lane_index = 0
+        self.lanes_changed = asyncio.Event()
+        self.start_lock = asyncio.Lock()
+
+        # Runner executables (see 'serve_runners'), each one is told when its runner made progress. Connections
+        # are attributed to the executables in the order they were started (the runners can't be told apart)
+        self.progress_events: list[asyncio.Event] = []
+        self.starting_runners: deque[int] = deque()
+        self.crash_looping_runners = 0
         
         self.framework_result: TestFrameworkResult = None
         self.suite_results: dict[str, TestSuiteResult] = {}
 
+        # Manual mode: the operator's console (kept when the runner reconnects) and the lines put aside while tests were running
+        self.console: Optional[console_utils.AsyncConsole] = None
+        self.pending_lines: deque[Optional[str]] = deque()
+        if self.mode == ExecutionMode.MANUAL and self.result_callback is None:
+            self.result_callback = self._print_result
+
     def _select_strategy(self) -> Coroutine[Any,Any,None]:
         """
         Select the strategy based on the mode.
@@ -64,12 +173,12 @@ class RemoteControlServer:
         else:
             raise ValueError(f"Unknown mode: {self.mode}")
 
-    def _process_test_result(self, data: str):
+    def _process_test_result(self, lane: RunnerLane, data: Union[str, dict]):
         LOGGER.debug("Received test result data")
 
         try:
-            # Parse the incoming data as JSON
-            data_json: dict = data_utils.json_parse(data[:-1])
+            # Parse the incoming data as JSON (binary records are already decoded)
+            data_json: dict = data if isinstance(data, dict) else data_utils.json_parse(data)
 
             # Extract necessary fields from the parsed JSON
             result_data: Optional[dict] = data_json.get('details')
@@ -87,6 +196,26 @@ class RemoteControlServer:
 
         self._add_test_result(result_data, suite, timestamp)
 
+        # A test completed, it didn't crash the runner (anymore)
+        self._mark_progress(lane)
+        if self.crash_history is not None:
+            self.crash_history.record_pass(f"{suite}@{result_data['name']}")
+
+    def _mark_progress(self, lane: RunnerLane):
+        if lane.runner is not None and lane.runner < len(self.progress_events):
+            self.progress_events[lane.runner].set()
+
+    def _runner_started(self, runner: int):
+        # The next connection is the one of the runner started first
+        if runner in self.starting_runners:
+            self.starting_runners.remove(runner)
+        self.starting_runners.append(runner)
+
+    def _runner_exited(self, runner: int):
+        # A runner exiting before it connected (ie.: crashing on boot) doesn't get the next connection
+        if runner in self.starting_runners:
+            self.starting_runners.remove(runner)
+
     def _add_test_result(self, result_data: dict, suite: str, timestamp: float):
         # Initialize framework result if not already set
         if not self.framework_result:
@@ -103,10 +232,17 @@ class RemoteControlServer:
         # Add the test result to the current suite
         result = TestResult(**result_data)
         self.suite_results[suite].tests.append(result)
+        if self.result_callback:
+            self.result_callback(suite, result)
+
+        self.completed_tests += 1
+        TESTS_COMPLETED.inc(labels=(self.run_name, result.result.lower()))
+        if self.started_at is not None:
+            TESTS_PER_SECOND.set(self.completed_tests / max(time.perf_counter() - self.started_at, 1e-6), (self.run_name,))
         LOGGER.debug(f"Added test result: {result_data['name']} with status {result_data['result']}")
 
-    def _inject_dummy_result(self, result = 'failed', duration = 0, assertions = 0, errors:Optional[list] = None, exceptions:Optional[list] = None):
-        current_test = self.tests[self.current_test_index]
+    def _inject_dummy_result(self, result = 'failed', duration = 0, assertions = 0, errors:Optional[list] = None, exceptions:Optional[list] = None, test: Optional[str] = None):
+        current_test = test or self.tests[self.current_test_index]
         suite_name, test_name = current_test.split('@')
 
         result_data = {
@@ -120,6 +256,73 @@ class RemoteControlServer:
 
         self._add_test_result(result_data, suite_name, time.time())
 
+    def _inject_pending_results(self, lane: RunnerLane, message: str):
+        """
+        Fails the tests the runner was running (all its in flight tests when multiplexing) and records
+        them in the crash history. The runner did get to run them, its restart isn't backed off.
+        Nothing is recorded when the run is being stopped (the runner was closed on purpose).
+        """
+        if self.stop_event.is_set():
+            lane.in_flight.clear()
+            self.lanes_changed.set()
+            return
+
+        for test in lane.in_flight.values():
+            self._inject_dummy_result(result = 'failed', errors = [ { 'message': message } ], test = test)
+            if self.crash_history is not None:
+                self.crash_history.record_crash(test)
+        if lane.in_flight:
+            self._mark_progress(lane)
+        lane.in_flight.clear()
+        self.lanes_changed.set()
+
+    def _peek_test(self) -> Optional[str]:
+        if self.retry_tests:
+            return self.retry_tests[0]
+        if self.current_test_index < len(self.tests):
+            return self.tests[self.current_test_index]
+        return None
+
+    def _claim_test(self) -> Optional[str]:
+        """
+        Returns the next test to run (tests handed back by a runner first), each test is only given to one runner.
+        """
+        if self.retry_tests:
+            return self.retry_tests.popleft()
+        if self.current_test_index < len(self.tests):
+            self.current_test_index += 1
+            return self.tests[self.current_test_index - 1]
+        return None
+
+    def _hand_back_test(self, lane: RunnerLane, request_id: Optional[int]):
+        # The command never reached the runner, the test goes to the next runner asking for one
+        test = lane.in_flight.pop(request_id, None)
+        if test is not None:
+            self.retry_tests.appendleft(test)
+            self.lanes_changed.set()
+
+    async def _wait_for_lanes(self, lane: RunnerLane) -> bool:
+        """
+        Waits while the other runners still have tests running (the results are written once all are done).
+
+        Returns:
+            bool: True if tests were handed back in the meantime (this runner can run them).
+        """
+        while self._peek_test() is None and self.state != State.FINISHED and any(other.in_flight for other in self.lanes if other is not lane):
+            self.lanes_changed.clear()
+            await self.lanes_changed.wait()
+        return self._peek_test() is not None and self.state != State.FINISHED
+
+    def _request_reboot(self, lane: RunnerLane):
+        """
+        Restarts the runner after a hang. Runners sharing the tests are the same build and can't be told
+        apart, a hung one is dropped while others are connected and they are all restarted once none is left.
+        """
+        if any(other is not lane for other in self.lanes):
+            LOGGER.warning(f"Dropping hung runner (lane {lane.index}), {len(self.lanes) - 1} other runner(s) keep running the tests")
+            return
+        self.reboot_event.set()
+
     def _produce_xml_result(self, output_path : Path, filename: str):
         try:
             element = self.framework_result.to_xml()
@@ -160,8 +363,15 @@ class RemoteControlServer:
         except Exception as e:
             LOGGER.error(f"An unexpected error occurred while writing JSON file: {e}")
 
-    async def _serve(self, host: str, port: int):
-        server = await asyncio.start_server(lambda reader, writer: self._handle_client(reader, writer), host, port)
+    async def _serve(self, host: str, port: int, sock: Optional[socket.socket] = None):
+        """
+        Serves until stopped. A reserved listening socket (see 'network_utils.reserve_port') is served through
+        a duplicate, the reservation stays open so the same port can be served again (ie.: for the next target).
+        """
+        if sock is not None:
+            server = await asyncio.start_server(lambda reader, writer: self._handle_client(reader, writer), sock=sock.dup(), limit=MAX_FRAME_SIZE)
+        else:
+            server = await asyncio.start_server(lambda reader, writer: self._handle_client(reader, writer), host, port, limit=MAX_FRAME_SIZE)
         addr = server.sockets[0].getsockname()
         LOGGER.info(f'Serving on {addr}')
 
@@ -175,56 +385,186 @@ class RemoteControlServer:
         Handle the client connection and delegate to the appropriate strategy.
         """
         addr = writer.get_extra_info('peername')
-        LOGGER.info(f"Client connected: {addr}")
+        lane = RunnerLane(self.next_lane_index, reader, writer)
+        self.next_lane_index += 1
+        if self.starting_runners:
+            lane.runner = self.starting_runners.popleft()
+        self.lanes.append(lane)
+        LOGGER.info(f"Client connected: {addr} (lane {lane.index}, {len(self.lanes)} connected)")
+
+        if self.recorder:
+            self.recorder.record_connect()
+        connected_at = time.perf_counter()
 
         try:
+            # Negotiate optional protocol features (a restarted runner needs to negotiate again)
+            if self.mode == ExecutionMode.AUTOMATIC and not await self._negotiate_capabilities(lane):
+                return
+
+            # A runner restarted after all the tests were done (ie.: on another device) has nothing left to run
+            if self.mode == ExecutionMode.AUTOMATIC and self.state == State.FINISHED:
+                await self._send_command(lane, RemoteCommand.EXIT.value)
+                return
+
             # Only restore state if mode is AUTOMATIC and state is RUNNING
             if self.mode == ExecutionMode.AUTOMATIC and self.state == State.RUNNING:
-                await self._resume_running_tests(reader, writer)
+                await self._resume_running_tests(lane)
                 return  # If state was restored and handled, no need to run the strategy again
 
-            await self.strategy(reader, writer)
+            await self.strategy(lane)
         except asyncio.CancelledError:
             LOGGER.info("Connection closed.")
         except ConnectionResetError:
             LOGGER.error("Connection forcibly closed.")
         finally:
-            await self._cleanup(writer)
+            TRACER.complete('runner connection', connected_at, track='remote control', category='protocol', state=self.state.name, lane=lane.index)
+            self.lanes.remove(lane)
+            self.lanes_changed.set()
+            if self.recorder:
+                self.recorder.record_disconnect()
+            await self._cleanup(lane)
+
+    async def _negotiate_capabilities(self, lane: RunnerLane) -> bool:
+        """
+        Offers the optional protocol features to the runner (older runners will reply with an error message).
+
+        Returns:
+            bool: False if the connection was lost during the negotiation.
+        """
+        lane.capabilities = []
+        if not self.offered_capabilities:
+            return True
+
+        if await self._send_command(lane, RemoteProtocol.encode_hello(self.offered_capabilities)):
+            return False
+
+        response = await self._receive_response(lane)
+        if response is None:
+            return False
 
-    async def _resume_running_tests(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lane.capabilities = RemoteProtocol.decode_hello(response)
+        LOGGER.info(f"Negotiated capabilities (lane {lane.index}): {[capability.value for capability in lane.capabilities]}")
+        return True
+
+    async def _resume_running_tests(self, lane: RunnerLane):
         """
         Resume running tests if the server was in the RUNNING state when the client crashed.
         """
-        while self.current_test_index < len(self.tests):
-            command = RemoteCommand.RUN.value.format(self.tests[self.current_test_index])
+        if self.max_in_flight > 1 and Capability.MULTIPLEX in lane.capabilities:
+            await self._resume_running_tests_multiplexed(lane)
+            return
+
+        while True:
+            test = self._claim_test()
+            if test is None:
+                if await self._wait_for_lanes(lane):
+                    continue
+                break
+
+            command = RemoteCommand.RUN.value.format(test)
             LOGGER.debug(f"Sending command: {command}")
 
-            if await self._send_command(writer, command):
+            lane.in_flight[None] = test
+            if await self._send_command(lane, command):
                 LOGGER.warning("Failed to send command, aborting test run.")
+                self._hand_back_test(lane, None)
                 return
             
-            data = await self._receive_response(reader)
+            data = await self._receive_response(lane)
             if not data:
-                self.current_test_index += 1
+                # The runner is gone ('_receive_frame' already failed the test)
                 LOGGER.warning("No data received, aborting test run.")
                 return
-            else:
-                LOGGER.debug(f"Processing test result for test index {self.current_test_index}")
-                self._process_test_result(data)
 
-            self.current_test_index += 1
+            lane.in_flight.clear()
+            self.lanes_changed.set()
+
+            LOGGER.debug(f"Processing test result for test '{test}'")
+            self._process_test_result(lane, data)
+
+        await self._handle_test_execution_finished()
+
+    def _is_concurrent(self, test: str) -> bool:
+        # Tests that crashed the runner before run alone (a crash fails every test in flight)
+        if self.crash_history is not None and self.crash_history.is_suspect(test):
+            return False
+
+        flags = self.test_flags.get(test, set())
+        return 'async' in flags and 'exclusive' not in flags
+
+    def _can_dispatch(self, lane: RunnerLane, test: str) -> bool:
+        """
+        Checks if a test can be sent to the runner given the tests already in flight. Only
+        non exclusive async tests run concurrently, any other test runs on its own.
+        """
+        if not lane.in_flight:
+            return True
+
+        if len(lane.in_flight) >= self.max_in_flight or not self._is_concurrent(test):
+            return False
+
+        return all(self._is_concurrent(other) for other in lane.in_flight.values())
 
-        if self.current_test_index >= len(self.tests):
-            await self._handle_test_execution_finished(writer)
+    async def _resume_running_tests_multiplexed(self, lane: RunnerLane):
+        """
+        Same as '_resume_running_tests' but keeps up to 'max_in_flight' tests running at once,
+        results are matched with their test through the request id of tagged frames.
+        """
+        while True:
+
+            # Dispatch as many tests as allowed
+            while self._peek_test() is not None and self._can_dispatch(lane, self._peek_test()):
+                test = self._claim_test()
+                request_id = self.next_request_id
+                self.next_request_id += 1
+
+                command = RemoteCommand.RUN_TAGGED.value.format(request_id, test)
+                lane.in_flight[request_id] = test
+                if await self._send_command(lane, command, request_id):
+                    LOGGER.warning("Failed to send command, aborting test run.")
+                    self._hand_back_test(lane, request_id)
+                    self._inject_pending_results(lane, 'FATAL :: Runner exited while the test was running.')
+                    return
+
+            if not lane.in_flight:
+                if await self._wait_for_lanes(lane):
+                    continue
+                break
+
+            frame = await self._receive_frame(lane)
+            if frame is None:
+                # The runner is gone ('_receive_frame' already failed the tests in flight)
+                LOGGER.warning("No data received, aborting test run.")
+                return
+
+            test = lane.in_flight.pop(frame.request_id, None)
+            if test is None:
+                LOGGER.warning(f"Received a frame for an unknown request (id: {frame.request_id}), ignoring.")
+                continue
+
+            LOGGER.debug(f"Processing test result for test '{test}' (request id: {frame.request_id})")
+            self._process_test_result(lane, self._decode_frame(frame))
+            self.lanes_changed.set()
 
-    async def _handle_test_execution_finished(self, writer: asyncio.StreamWriter):
+        await self._handle_test_execution_finished()
+
+    async def _handle_test_execution_finished(self):
         """
-        Handle the actions to be taken once all tests have been executed.
+        Handle the actions to be taken once all tests have been executed (by any of the runners).
         """
+        if self.state == State.FINISHED:
+            return
+
         self.state = State.FINISHED
+        self.lanes_changed.set()
         LOGGER.info(f"State changed to {self.state}")
 
-        output_path = ROOT_DIR / 'results'
+        # No test ran (ie.: an empty shard), the result files are still expected
+        if not self.framework_result:
+            self.framework_result = TestFrameworkResult(name=self.run_name, timestamp=time.time())
+            LOGGER.info(f"No test was run, writing an empty result for {self.framework_result.name}")
+
+        output_path = self.output_path
         output_path.mkdir(parents=True, exist_ok=True)
 
         filename = self.run_name.replace(":", "_")
@@ -241,125 +581,401 @@ class RemoteControlServer:
 
         LOGGER.info("All tests executed successfully.")
 
-        await self._send_command(writer, RemoteCommand.EXIT.value)
-        LOGGER.info("Sent EXIT command to client.")
+        for lane in list(self.lanes):
+            await self._send_command(lane, RemoteCommand.EXIT.value)
+        LOGGER.info(f"Sent EXIT command to {len(self.lanes)} client(s).")
 
         self.stop_event.set()  # Signal that the run has finished
         LOGGER.info("Test run completion signal set.")
 
-    async def _handle_automatic_mode(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, restore=False):
+    async def _handle_automatic_mode(self, lane: RunnerLane, restore=False):
         """
         Handle client in automatic mode using a state machine.
         """
-        if not restore:
-            # Transition to STARTING state
-            self.state = State.STARTING
+        # Runners connecting at the same time wait for the first one to report the tests
+        async with self.start_lock:
+            if not restore and self.state != State.RUNNING and not await self._start_tests(lane):
+                return
+
+        # Transition to RUNNING state
+        if self.state != State.RUNNING:
+            self.state = State.RUNNING
             LOGGER.info(f"State changed to {self.state}")
 
-            # Step 1: GET TESTS command
-            if await self._send_command(writer, RemoteCommand.GET_TESTS.value):
-                return
+        # Resume running tests
+        await self._resume_running_tests(lane)
 
-            received_data = await self._receive_response(reader)
-            if not received_data:
-                return
+    async def _start_tests(self, lane: RunnerLane) -> bool:
+        """
+        Gets the tests from the runner (keeping the ones of this shard).
+
+        Returns:
+            bool: False if the connection was lost before the tests were received.
+        """
+        # Transition to STARTING state
+        self.state = State.STARTING
+        LOGGER.info(f"State changed to {self.state}")
+
+        # Step 1: GET TESTS command
+        if await self._send_command(lane, RemoteCommand.GET_TESTS.value):
+            return False
+
+        received_data = await self._receive_response(lane)
+        if not received_data:
+            return False
+
+        self._set_tests(received_data)
 
-            # Update test list
-            self.tests = received_data.splitlines()
+        if self.test_index is not None:
+            test_index_utils.log_comparison(test_index_utils.compare_test_paths(self.test_index.get_test_paths(), self.tests))
+
+        # Keep only the tests of this shard (the assignment only depends on the test list)
+        if self.shard is not None:
+            total = len(self.tests)
+            self.tests = shard_utils.select_shard(self.tests, self.shard, self.shard_strategy, self.durations)
+            LOGGER.info(f"Running shard {self.shard[0]}/{self.shard[1]} ({len(self.tests)} of {total} tests, strategy: {self.shard_strategy})")
+
+        # Keep only the tests of the requested suites
+        if self.suites is not None:
+            total = len(self.tests)
+            self.tests = [test for test in self.tests if test.split('@', 1)[0] in self.suites]
+            LOGGER.info(f"Running suites {self.suites} ({len(self.tests)} of {total} tests)")
+
+        # Tests that crashed the runner in previous runs go last
+        if self.crash_history is not None:
+            self.tests = self.crash_history.order(self.tests)
+
+        TESTS_TOTAL.set(len(self.tests), (self.run_name,))
+        self.started_at = time.perf_counter()
 
         # Transition to RUNNING state
         self.state = State.RUNNING
         LOGGER.info(f"State changed to {self.state}")
+        return True
 
-        # Resume running tests
-        await self._resume_running_tests(reader, writer)
+    def _set_tests(self, received_data: str):
+        # Update test list (when multiplexing each test is followed by a tab and its flags)
+        self.tests = []
+        for line in received_data.splitlines():
+            test, _, flags = line.partition('\t')
+            self.tests.append(test)
+            self.test_flags[test] = set(filter(None, flags.split(',')))
 
-    async def _handle_manual_mode(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    async def _handle_manual_mode(self, lane: RunnerLane):
         """
-        Handle client in manual mode using a state machine.
+        Handle client in manual mode: the operator's commands are sent to the runner and its replies printed
+        (see 'CONSOLE_HELP'). The console is read from a thread, the servers keep running while it waits.
         """
         # Transition to RUNNING state (since manual mode starts immediately)
         self.state = State.RUNNING
         LOGGER.info(f"State changed to {self.state}")
 
-        # Immediately set the stop event because manual control is ongoing
-        self.stop_event.set()
+        if self.console is None:
+            self.console = console_utils.AsyncConsole()
+            print(CONSOLE_HELP)
 
         while True:
-            # Use asyncio to read user input without blocking
-            command = input("Enter command and args: ")
+            line = self.pending_lines.popleft() if self.pending_lines else await self.console.read_line()
 
-            if await self._send_command(writer, command):
-                return
+            # A closed terminal ends the session
+            commands = [RemoteCommand.EXIT.value] if line is None else console_utils.split_commands(line)
 
-            if command.strip().upper() in [RemoteCommand.EXIT.value, RemoteCommand.QUIT.value]:
-                LOGGER.info("Waiting for client to disconnect...")
+            finished = await self._run_console_commands(lane, commands)
+            if finished is None:
+                return  # Connection lost, the console is kept for the restarted runner
+            if finished:
                 break
 
-            response = await self._receive_response(reader)
-            if not response:
-                return
-            
-            print(f'> {response}')
-
         # Transition to FINISHED state
         self.state = State.FINISHED
         LOGGER.info(f"State changed to {self.state}")
 
-    async def _send_command(self, writer: asyncio.StreamWriter, command: str) -> bool:
+        if self.framework_result:
+            filename = self.run_name.replace(":", "_")
+            self.output_path.mkdir(parents=True, exist_ok=True)
+            self._produce_xml_result(self.output_path, filename)
+            self._produce_json_result(self.output_path, filename)
+
+        self.console.close()
+        self.stop_event.set()  # Signal that the session has finished
+
+    async def _run_console_commands(self, lane: RunnerLane, commands: list[str]) -> Optional[bool]:
+        """
+        Runs the commands of a console line. Consecutive runner commands are pipelined (sent at once, then
+        their replies are read in order).
+
+        Returns:
+            bool: True if the session is over (EXIT or QUIT), None if the connection was lost.
+        """
+        pipeline: list[str] = []
+
+        async def flush() -> bool:
+            sent = pipeline.copy()
+            pipeline.clear()
+            for command in sent:
+                if await self._send_command(lane, command):
+                    return False
+
+            for command in sent:
+                response = await self._receive_response(lane)
+                if not response:
+                    return False
+                print(f'> {response}')
+            return True
+
+        for command in commands:
+            name, _, argument = command.partition(' ')
+            name = name.upper()
+            argument = argument.strip()
+
+            if name in [RemoteCommand.EXIT.value, RemoteCommand.QUIT.value]:
+                if not await flush() or await self._send_command(lane, command):
+                    return None
+                LOGGER.info("Waiting for client to disconnect...")
+                return True
+
+            is_local = name in [ConsoleCommand.STOP.value, ConsoleCommand.HISTORY.value, ConsoleCommand.HELP.value]
+            is_glob = name == ConsoleCommand.RUN.value and any(char in argument for char in '*?[')
+            if not is_local and not is_glob:
+                pipeline.append(command)
+                continue
+
+            if not await flush():
+                return None
+
+            if name == ConsoleCommand.HISTORY.value:
+                for index, entry in enumerate(self.console.history, 1):
+                    print(f'{index:>4}  {entry}')
+            elif name == ConsoleCommand.HELP.value:
+                print(CONSOLE_HELP)
+            elif name == ConsoleCommand.STOP.value:
+                print('No tests running')
+            elif not await self._run_matching_tests(lane, argument):
+                return None
+
+        if not await flush():
+            return None
+        return False
+
+    async def _run_matching_tests(self, lane: RunnerLane, pattern: str) -> bool:
+        """
+        Runs the tests matching a glob pattern one after the other, their results are printed as they come
+        in. The console is still read meanwhile: 'STOP' ends the run, other lines wait until it's done.
+
+        Returns:
+            bool: False if the connection was lost.
+        """
+        if not self.tests:
+            if await self._send_command(lane, RemoteCommand.GET_TESTS.value):
+                return False
+            received_data = await self._receive_response(lane)
+            if not received_data:
+                return False
+            self._set_tests(received_data)
+
+        tests = [test for test in self.tests if fnmatch.fnmatchcase(test, pattern)]
+        if not tests:
+            print(f"No test matches '{pattern}' ({len(self.tests)} tests)")
+            return True
+
+        print(f"Running {len(tests)} test(s) matching '{pattern}'")
+        started_at = time.perf_counter()
+        completed = 0
+        stopped = False
+
+        for test in tests:
+            # Lines typed meanwhile (the console keeps reading while tests run)
+            while self.console.has_line():
+                line = await self.console.read_line()
+                if line is not None and line.strip().upper() == ConsoleCommand.STOP.value:
+                    stopped = True
+                    break
+                self.pending_lines.append(line)
+                if line is None:
+                    break
+            if stopped:
+                break
+
+            lane.in_flight[None] = test
+            if await self._send_command(lane, RemoteCommand.RUN.value.format(test)):
+                lane.in_flight.clear()
+                return False
+
+            data = await self._receive_response(lane)
+            if not data:
+                print(f"Runner disconnected, ran {completed} of {len(tests)} test(s) matching '{pattern}'")
+                return False
+
+            lane.in_flight.clear()
+            self._process_test_result(lane, data)
+            completed += 1
+
+        print(f"Ran {completed} of {len(tests)} test(s) matching '{pattern}' in {time.perf_counter() - started_at:.1f}s{' (stopped)' if stopped else ''}")
+        return True
+
+    def _print_result(self, suite: str, result: TestResult):
+        status = 'failed' if result.did_fail() or result.did_error() else 'skipped' if result.was_skipped() else 'passed'
+        print(f"[{status.upper()}] {suite}@{result.name} ({result.duration / 1000:.1f}ms)")
+        for error in result.errors or []:
+            print(f"    {error.get('message', error) if isinstance(error, dict) else error}")
+
+    async def _send_command(self, lane: RunnerLane, command: str, request_id: Optional[int] = None) -> bool:
         try:
-            writer.write(command.encode() + b'\0')
-            await writer.drain()
+            lane.writer.write(command.encode() + b'\0')
+            lane.sent_at[request_id] = (command.split(' ', 1)[0].upper(), time.perf_counter(), command)
+            if self.recorder:
+                self.recorder.record_command(command)
+            await lane.writer.drain()
             LOGGER.debug(f"Sent: {command}")
         except (ConnectionResetError, BrokenPipeError):
             LOGGER.error("Connection lost while sending data to client.")
             return True
         return False
 
-    async def _receive_response(self, reader: asyncio.StreamReader) -> str:
+    async def _receive_response(self, lane: RunnerLane) -> Union[str, dict]:
         """
         Receives data from the client and handles possible errors.
 
         Args:
-            reader (asyncio.StreamReader): The stream reader to receive data from.
+            lane (RunnerLane): The runner to receive data from.
 
         Returns:
-            str: The received data as a decoded string, or None if an error occurred.
+            str|dict: The received data as a decoded string (or a result record for binary
+            record frames), or None if an error occurred.
+        """
+        frame = await self._receive_frame(lane)
+        if frame is None:
+            return None
+
+        return self._decode_frame(frame)
+
+    def _decode_frame(self, frame: RemoteProtocol.Frame) -> Union[str, dict]:
+        if frame.type == RemoteProtocol.FRAME_RECORD:
+            return RemoteProtocol.decode_record(frame.payload)
+
+        decoded_data = frame.payload.decode().strip()
+        LOGGER.debug(f"Received: {decoded_data}")
+        return decoded_data
+
+    async def _receive_frame(self, lane: RunnerLane) -> Optional[RemoteProtocol.Frame]:
+        """
+        Receives a single frame from the client and handles possible errors. This is where the tests in
+        flight are failed when the runner is lost (callers only abort their run).
+
+        Returns:
+            Frame: The received frame, or None if an error occurred.
         """
         try:
-            data = await asyncio.wait_for(reader.read(8000000), self.timeout * 60)
-            if not data:
-                LOGGER.info("Client disconnected.")
-                return None
-            decoded_data = data.decode().strip()
-            LOGGER.debug(f"Received: {decoded_data}")
-            return decoded_data
+            frame = await asyncio.wait_for(RemoteProtocol.read_frame(lane.reader), self.timeout * 60)
+            if self.recorder:
+                self.recorder.record_frame(frame)
+
+            sent = lane.sent_at.pop(frame.request_id, None)
+            if sent is not None:
+                COMMAND_ROUND_TRIP.observe(time.perf_counter() - sent[1], (self.run_name, sent[0]))
+                TRACER.complete(sent[2], sent[1], track='runner commands', category='protocol', async_id=frame.request_id)
+            BYTES_RECEIVED.inc(len(frame.payload), (self.run_name,))
+            return frame
         except asyncio.TimeoutError:
+            RUNNER_TIMEOUTS.inc(labels=(self.run_name,))
+            TRACER.instant('runner timeout', track='runner commands', category='protocol')
             LOGGER.error(f"Client did not respond within {self.timeout} minutes. Killing process.")
-            self._inject_dummy_result(result = 'failed', errors= [ { 'message': f'FATAL :: Runner hanged for too long. Process killed.' } ])
-            self.reboot_event.set()
+            self._inject_pending_results(lane, 'FATAL :: Runner hanged for too long. Process killed.')
+            self._request_reboot(lane)
+            return None
+        except asyncio.IncompleteReadError:
+            LOGGER.info("Client disconnected.")
+            self._inject_pending_results(lane, 'FATAL :: Runner exited while the test was running.')
             return None
         except ConnectionResetError:
             LOGGER.error("Connection lost while reading data from client.")
-            self._inject_dummy_result(result = 'failed', errors= [ { 'message': f'FATAL :: Runner silently crashed.' } ])
+            self._inject_pending_results(lane, 'FATAL :: Runner silently crashed.')
             return None
 
-    async def _cleanup(self, writer: asyncio.StreamWriter):
+    async def _give_up_runner(self):
+        """
+        Called when a runner exited too many times in a row without running a test. Once none of the runners
+        can stay up the remaining tests are failed (instead of restarting the runners forever).
+        """
+        self.crash_looping_runners += 1
+        if self.crash_looping_runners < len(self.progress_events):
+            LOGGER.error(f"A runner can't stay up, {len(self.progress_events) - self.crash_looping_runners} other runner(s) keep running the tests")
+            return
+
+        LOGGER.error("The runner can't stay up, failing the remaining tests")
+        TRACER.instant('circuit breaker', track='remote control', category='protocol')
+
+        # No test list was received, the run would otherwise look like an empty (passed) one
+        if self.state in [State.WAITING, State.STARTING]:
+            message = f'FATAL :: Runner exited {self.crash_loop_limit} times in a row before reporting its tests.'
+            if self.crash_history is not None:
+                message += f' Crash history: {self.crash_history.path}'
+            self._inject_dummy_result(result = 'failed', errors = [ { 'message': message } ], test = 'Runner@runner_failed_to_start')
+        for lane in list(self.lanes):
+            self._inject_pending_results(lane, 'FATAL :: Runner exited while the test was running.')
+        while (test := self._claim_test()) is not None:
+            self._inject_dummy_result(result = 'failed', errors = [ { 'message': 'FATAL :: Runner kept crashing, the test was not run.' } ], test = test)
+
+        await self._handle_test_execution_finished()
+
+    async def _forward_reboots(self, reboot_events: list[asyncio.Event]):
+        while not self.stop_event.is_set():
+            if self.reboot_event.is_set():
+                self.reboot_event.clear()
+                for reboot_event in reboot_events:
+                    reboot_event.set()
+            await asyncio.sleep(0.1)
+
+    async def _cleanup(self, lane: RunnerLane):
         try:
-            writer.close()
-            await writer.wait_closed()
+            lane.writer.close()
+            await lane.writer.wait_closed()
         except Exception as e:
             LOGGER.error(f"Error during cleanup: {e}")
 
-    async def serve_or_wait_for_space(self, exe_path, args, port=8000):
+    async def serve_or_wait_for_space(self, exe_path, args, port=8000, host: Optional[str] = None, interactive: bool = True, cwd: Optional[Path] = None, sock: Optional[socket.socket] = None):
         """
         Serve the client or wait for the space key to stop the server.
+
+        Args:
+            sock (socket): A reserved listening socket to serve on (host and port are then ignored).
+            host (str): The address to listen on (default: the local ip address).
+            interactive (bool): Whether the space key stops the server (disable when there is no terminal, ie.: CI).
+            cwd (Path): The working directory of the executable (default: the launcher one).
         """
-        local_ip_address = network_utils.get_local_ip()
+        await self.serve_runners(exe_path, [args], port=port, host=host, interactive=interactive, cwd=cwd, sock=sock)
 
-        await asyncio.gather(
-            self._serve(host=local_ip_address, port=port),
-            async_utils.wait_for_space_key(self.stop_event),
-            async_utils.run_and_monitor_exe(exe_path=exe_path, args=args, stop_event=self.stop_event, reboot_event=self.reboot_event, restart_delay=0.5)
-        )
+    async def serve_runners(self, exe_path, runner_args: list[list[str]], port=8000, host: Optional[str] = None, interactive: bool = True, cwd: Optional[Path] = None, sock: Optional[socket.socket] = None):
+        """
+        Same as 'serve_or_wait_for_space' but starts (and monitors) one executable per item of 'runner_args',
+        ie.: the same build running on every device of a device pool. Their runners share the tests, each
+        test is sent to the first runner free to run it.
+        """
+        local_ip_address = host or network_utils.get_local_ip()
+
+        # A single runner is restarted directly, several are all restarted together (see '_request_reboot')
+        reboot_events = [self.reboot_event] if len(runner_args) == 1 else [asyncio.Event() for _ in runner_args]
+
+        # Runners exiting before running a test are restarted with a growing delay, then given up on (see '_give_up_runner')
+        self.progress_events = [asyncio.Event() for _ in runner_args]
+        self.starting_runners.clear()
+        self.crash_looping_runners = 0
+
+        tasks = [self._serve(host=local_ip_address, port=port, sock=sock)]
+        for runner, (args, reboot_event, progress_event) in enumerate(zip(runner_args, reboot_events, self.progress_events)):
+            tasks.append(async_utils.run_and_monitor_exe(exe_path=exe_path, args=args, stop_event=self.stop_event, reboot_event=reboot_event, restart_delay=self.restart_delay, cwd=cwd, max_restart_delay=self.max_restart_delay, progress_event=progress_event, crash_loop_limit=self.crash_loop_limit, on_crash_loop=self._give_up_runner,
+                on_start=functools.partial(self._runner_started, runner), on_exit=functools.partial(self._runner_exited, runner)))
+        if len(runner_args) > 1:
+            tasks.append(self._forward_reboots(reboot_events))
+        # The manual mode console reads the terminal itself
+        if interactive and self.mode == ExecutionMode.AUTOMATIC:
+            tasks.append(async_utils.wait_for_space_key(self.stop_event))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if self.recorder:
+                self.recorder.close()
+            if self.crash_history is not None:
+                self.crash_history.save()
 
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import struct
+import zlib
+from enum import Enum
+from typing import NamedTuple, Optional
+
+# Every frame sent by the runner is either a null terminated string (plain frame)
+# or starts with one of the frame type bytes below followed by a little-endian
+# uint32 with the size of the payload (the runner never starts a plain frame with these).
+FRAME_PLAIN = 0x00
+FRAME_COMPRESSED = 0x01
+FRAME_RECORD = 0x02
+FRAME_TAGGED = 0x03
+
+FRAME_HEADER = struct.Struct('<BI')
+
+# Tagged frames (only when multiplexing) wrap any of the frames above with the id of the
+# RUN request they reply to: u8 FRAME_TAGGED | u32 request id | frame
+TAGGED_HEADER = struct.Struct('<BI')
+
+# Binary test result record (FRAME_RECORD payload):
+#   u8 result | f64 duration | u32 assertions | u16 error count | u16 exception count | f64 timestamp
+# followed by the null terminated name and suite strings and, only if there are errors or
+# exceptions, a null terminated JSON string with the { "errors", "exceptions" } details.
+RECORD_HEADER = struct.Struct('<BdIHHd')
+
+# Same order as the 'TestResult' enum in 'Test.gml'
+RESULT_NAMES = ["Unset", "Passed", "Failed", "Skipped", "Bailed", "Expired"]
+
+class Capability(Enum):
+    """
+    Optional protocol features negotiated with the runner through the HELLO command.
+    Runners that don't know the HELLO command reply with an error message and the
+    connection falls back to plain frames.
+    """
+    ZLIB = "zlib"
+    BINARY = "binary"
+    MULTIPLEX = "multiplex"
+
+class Frame(NamedTuple):
+    """
+    A frame received from the runner (FRAME_PLAIN for text and decompressed frames, FRAME_RECORD for
+    binary records) and the id of the request it replies to (only set for tagged frames).
+    """
+    type: int
+    payload: bytes
+    request_id: Optional[int] = None
+
+def encode_hello(capabilities: list[Capability]) -> str:
+    return f"HELLO {','.join(capability.value for capability in capabilities)}"
+
+def decode_hello(response: str) -> list[Capability]:
+    """
+    Parses the runner reply to the HELLO command.
+
+    Returns:
+        list[Capability]: The capabilities accepted by the runner (empty for older runners).
+    """
+    parts = response.split(' ', 1)
+    if parts[0].upper() != "HELLO" or len(parts) != 2:
+        return []
+
+    known = { capability.value: capability for capability in Capability }
+    return [known[name] for name in parts[1].strip().split(',') if name in known]
+
+def capabilities_from_options(compression: Optional[str] = None, encoding: Optional[str] = None, max_in_flight: int = 1) -> list[Capability]:
+    """
+    Builds the list of capabilities to offer from the command line options.
+    """
+    capabilities = []
+    if compression == 'zlib':
+        capabilities.append(Capability.ZLIB)
+    if encoding == 'binary':
+        capabilities.append(Capability.BINARY)
+    if max_in_flight > 1:
+        capabilities.append(Capability.MULTIPLEX)
+    return capabilities
+
+def encode_frame(payload: bytes, compressed: bool = False) -> bytes:
+    """
+    Encodes a payload the same way the runner does (used by simulated runners and benchmarks).
+    """
+    if compressed:
+        payload = zlib.compress(payload)
+        return FRAME_HEADER.pack(FRAME_COMPRESSED, len(payload)) + payload
+
+    return payload + b'\0'
+
+def encode_tagged(request_id: int, frame: bytes) -> bytes:
+    """
+    Tags an encoded frame with the id of the request it replies to.
+    """
+    return TAGGED_HEADER.pack(FRAME_TAGGED, request_id) + frame
+
+def encode_record(record: dict) -> bytes:
+    """
+    Encodes a result record ({ 'details', 'suite', 'timestamp' }) as a binary record frame.
+    """
+    details: dict = record['details']
+    errors = details.get('errors') or []
+    exceptions = details.get('exceptions') or []
+
+    payload = RECORD_HEADER.pack(
+        RESULT_NAMES.index(details['result'].capitalize()),
+        details.get('duration', 0),
+        details.get('assertions', 0),
+        len(errors),
+        len(exceptions),
+        record['timestamp'])
+
+    payload += details['name'].encode() + b'\0' + record['suite'].encode() + b'\0'
+    if errors or exceptions:
+        payload += json.dumps({ 'errors': errors, 'exceptions': exceptions }).encode() + b'\0'
+
+    return FRAME_HEADER.pack(FRAME_RECORD, len(payload)) + payload
+
+def decode_record(payload: bytes) -> dict:
+    """
+    Decodes a binary record payload into a result record ({ 'details', 'suite', 'timestamp' }).
+    """
+    result, duration, assertions, error_count, exception_count, timestamp = RECORD_HEADER.unpack_from(payload)
+    strings = payload[RECORD_HEADER.size:].split(b'\0')
+
+    details = {
+        'name': strings[0].decode(),
+        'result': RESULT_NAMES[result],
+        'duration': duration,
+        'assertions': assertions,
+        'errors': [],
+        'exceptions': [],
+    }
+
+    # Verbose details are only present when there are errors or exceptions
+    if error_count or exception_count:
+        details.update(json.loads(strings[2]))
+
+    return { 'details': details, 'suite': strings[1].decode(), 'timestamp': timestamp }
+
+async def read_frame(reader: asyncio.StreamReader) -> Frame:
+    """
+    Reads a single frame from the runner.
+
+    Returns:
+        Frame: The frame type (FRAME_PLAIN for text and decompressed frames), its payload and request id.
+
+    Raises:
+        asyncio.IncompleteReadError: If the connection is closed mid-frame.
+    """
+    frame_type = await reader.readexactly(1)
+
+    if frame_type[0] == FRAME_TAGGED:
+        header = frame_type + await reader.readexactly(TAGGED_HEADER.size - 1)
+        _, request_id = TAGGED_HEADER.unpack(header)
+        frame = await read_frame(reader)
+        return frame._replace(request_id=request_id)
+
+    if frame_type[0] in [FRAME_COMPRESSED, FRAME_RECORD]:
+        header = frame_type + await reader.readexactly(FRAME_HEADER.size - 1)
+        _, size = FRAME_HEADER.unpack(header)
+        payload = await reader.readexactly(size)
+
+        if frame_type[0] == FRAME_COMPRESSED:
+            return Frame(FRAME_PLAIN, zlib.decompress(payload))
+        return Frame(FRAME_RECORD, payload)
+
+    if frame_type == b'\0':
+        return Frame(FRAME_PLAIN, b'')
+
+    return Frame(FRAME_PLAIN, frame_type + (await reader.readuntil(b'\0'))[:-1])
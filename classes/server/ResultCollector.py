@@ -0,0 +1,89 @@
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree
+
+from classes.model.TestFrameworkResult import TestFrameworkResult
+from classes.model.TestResult import TestResult
+from classes.model.TestSuiteResult import TestSuiteResult
+from utils import file_utils
+from utils.logging_utils import LOGGER
+
+class ResultCollector:
+    """
+    Accumulates raw result records (as sent by the runner) and only builds the
+    result models once the run is finalized. Appending a record is cheap and safe
+    to do inside the event loop, while `finalize` and `write` are meant to be
+    executed in a worker thread.
+    """
+
+    def __init__(self, run_name: str = 'xUnit', run_id: Optional[str] = None):
+        self.run_name = run_name
+        self.run_id = run_id
+        self.records: list[dict] = []
+
+    def add_record(self, record: dict) -> bool:
+        """
+        Queues a single result record ({ 'details', 'suite', 'timestamp' }).
+
+        Returns:
+            bool: False if the record is missing any of the required fields.
+        """
+        if record.get('details') is None or record.get('suite') is None or record.get('timestamp') is None:
+            LOGGER.error("Result record missing required fields. Skipping.")
+            return False
+
+        self.records.append(record)
+        return True
+
+    def finalize(self) -> Optional[TestFrameworkResult]:
+        """
+        Builds the framework result from all the queued records.
+
+        Returns:
+            TestFrameworkResult: The built result or None if no records were received.
+        """
+        framework_result: Optional[TestFrameworkResult] = None
+        suite_results: dict[str, TestSuiteResult] = {}
+
+        for record in self.records:
+            result_data: dict = record['details']
+            suite: str = record['suite']
+            timestamp: float = record['timestamp']
+
+            # Initialize framework result if not already set
+            if not framework_result:
+                framework_result = TestFrameworkResult(name=self.run_name, timestamp=timestamp)
+                LOGGER.debug(f"Initialized framework result: {framework_result.name} at {timestamp}")
+
+            # Initialize suite result or switch to a new suite if necessary
+            if not suite in suite_results:
+                suite_result = TestSuiteResult(name=suite, timestamp=timestamp)
+                framework_result.testsuites.append(suite_result)
+                suite_results[suite] = suite_result
+                LOGGER.debug(f"Initialized new test suite result: {suite} at {timestamp}")
+
+            # Add the test result to the current suite
+            suite_results[suite].tests.append(TestResult(**result_data))
+
+        return framework_result
+
+    def write(self, output_path: Path, filename: str) -> Optional[TestFrameworkResult]:
+        """
+        Builds the framework result and writes both the JSON and XML files (blocking).
+        """
+        framework_result = self.finalize()
+        if framework_result is None:
+            LOGGER.warning(f"No results received for run '{self.run_name}', nothing to write.")
+            return None
+
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        # Save to a json file
+        file_utils.save_data_as_json(framework_result.to_dict(), output_path / f'{filename}.json')
+
+        # Create an ElementTree object from the root element
+        tree = ElementTree.ElementTree(framework_result.to_xml())
+        tree.write(output_path / f'{filename}.xml', encoding='UTF-8', xml_declaration=True)
+
+        LOGGER.info(f"Results for run '{self.run_name}' written to {output_path} ({len(self.records)} tests)")
+        return framework_result
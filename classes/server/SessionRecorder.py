@@ -0,0 +1,126 @@
+import base64
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+from classes.server import RemoteProtocol
+
+# Event kinds stored in a session file
+EVENT_CONNECT = "connect"
+EVENT_DISCONNECT = "disconnect"
+EVENT_COMMAND = "out"
+EVENT_FRAME = "in"
+
+class SessionRecorder:
+    """
+    Records a remote control session (connections, commands sent and frames received) to a
+    gzip compressed NDJSON file. Each line is a single event:
+
+        { "t": <seconds since start>, "e": <event>, "c": <connection>, ... }
+
+    Commands carry their text ("p"), frames their type ("k"), request id ("id", only for tagged
+    frames) and payload ("p", text for plain frames and base64 for binary records).
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.start = time.perf_counter()
+        self.connection = 0
+
+    def _write(self, event: str, **data):
+        line = { 't': round(time.perf_counter() - self.start, 6), 'e': event, 'c': self.connection, **data }
+        self.file.write(json.dumps(line, separators=(',', ':')) + '\n')
+
+    def record_connect(self):
+        self.connection += 1
+        self._write(EVENT_CONNECT)
+
+    def record_disconnect(self):
+        self._write(EVENT_DISCONNECT)
+
+    def record_command(self, command: str):
+        self._write(EVENT_COMMAND, p=command)
+
+    def record_frame(self, frame: RemoteProtocol.Frame):
+        if frame.type == RemoteProtocol.FRAME_RECORD:
+            payload = base64.b64encode(frame.payload).decode()
+        else:
+            payload = frame.payload.decode(errors='replace')
+
+        data = { 'k': frame.type, 'p': payload }
+        if frame.request_id is not None:
+            data['id'] = frame.request_id
+        self._write(EVENT_FRAME, **data)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+def load_session(path: Path) -> list[dict]:
+    """
+    Loads all the events of a recorded session.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def decode_frame_payload(event: dict) -> bytes:
+    """
+    Returns the raw payload of a recorded frame event.
+    """
+    if event.get('k') == RemoteProtocol.FRAME_RECORD:
+        return base64.b64decode(event['p'])
+    return event['p'].encode()
+
+def get_round_trips(events: list[dict]) -> dict[str, list[float]]:
+    """
+    Computes the time between each command and its reply (grouped by command name). When
+    multiplexing, RUN replies are matched through their request id.
+
+    Returns:
+        dict[str, list[float]]: Maps each command name to its round trip times (in seconds).
+    """
+    round_trips: dict[str, list[float]] = {}
+    pending: Optional[tuple[str, float]] = None
+    tagged: dict[int, float] = {}
+
+    for event in events:
+        if event['e'] == EVENT_COMMAND:
+            parts = event['p'].split(' ')
+            name = parts[0].upper()
+            if name == 'RUN' and len(parts) > 2 and parts[1].isdigit():
+                tagged[int(parts[1])] = event['t']
+            else:
+                pending = (name, event['t'])
+
+        elif event['e'] == EVENT_FRAME:
+            if event.get('id') is not None and event['id'] in tagged:
+                round_trips.setdefault('RUN', []).append(event['t'] - tagged.pop(event['id']))
+            elif pending is not None:
+                round_trips.setdefault(pending[0], []).append(event['t'] - pending[1])
+                pending = None
+
+        elif event['e'] == EVENT_DISCONNECT:
+            pending = None
+            tagged.clear()
+
+    return round_trips
+
+def get_recovery_latencies(events: list[dict]) -> list[float]:
+    """
+    Computes the time between each disconnection and the next connection (runner restarts).
+    """
+    latencies = []
+    disconnected_at = None
+
+    for event in events:
+        if event['e'] == EVENT_DISCONNECT:
+            disconnected_at = event['t']
+        elif event['e'] == EVENT_CONNECT and disconnected_at is not None:
+            latencies.append(event['t'] - disconnected_at)
+            disconnected_at = None
+
+    return latencies
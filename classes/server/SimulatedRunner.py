@@ -0,0 +1,254 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+from classes.server import RemoteProtocol, SessionRecorder
+from classes.server.RemoteProtocol import Capability
+from utils import bench_utils
+from utils.logging_utils import LOGGER
+
+# Outcomes of a simulated runner session
+OUTCOME_EXIT = "exit"
+OUTCOME_CRASH = "crash"
+OUTCOME_HANG = "hang"
+OUTCOME_DISCONNECTED = "disconnected"
+
+class SimulatedTest(NamedTuple):
+    path: str
+    record: dict
+    duration: float = 0
+    crash: bool = False
+    hang: bool = False
+    is_async: bool = False
+    exclusive: bool = False
+
+    def get_flags(self) -> list[str]:
+        return (['async'] if self.is_async else []) + (['exclusive'] if self.exclusive else [])
+
+def generate_tests(count: int, duration: float = 0, failure_rate: float = 0, crash_rate: float = 0, hang_rate: float = 0, async_rate: float = 0, seed: int = 0) -> list[SimulatedTest]:
+    """
+    Synthesises a list of tests (results are shaped like the real ones, see 'bench_utils').
+
+    Args:
+        count (int): The number of tests.
+        duration (float): How long each test takes (in seconds).
+        failure_rate (float): The ratio of failed tests.
+        crash_rate (float): The ratio of tests that crash the runner.
+        hang_rate (float): The ratio of tests that hang the runner.
+        async_rate (float): The ratio of async (non exclusive) tests.
+        seed (int): Seed used for the random generator (tests are deterministic).
+    """
+    rng = random.Random(seed)
+    tests = []
+
+    for record in bench_utils.generate_result_records(count, failure_rate, seed):
+        record['details']['duration'] = duration * 1000000
+        roll = rng.random()
+        tests.append(SimulatedTest(
+            path=f"{record['suite']}@{record['details']['name']}",
+            record=record,
+            duration=duration,
+            crash=roll < crash_rate,
+            hang=crash_rate <= roll < crash_rate + hang_rate,
+            is_async=rng.random() < async_rate))
+
+    return tests
+
+class SimulatedRunner:
+    """
+    A pure Python runner that talks the real TCP protocol of 'objRunner'. It either runs synthetic
+    tests (with configurable durations, crashes and hangs) or replays a recorded session.
+    """
+
+    def __init__(self, tests: Optional[list[SimulatedTest]] = None, session: Optional[list[dict]] = None, capabilities: Optional[list[Capability]] = None, speed: float = 0):
+        """
+        Args:
+            tests (list[SimulatedTest]): The tests to run (ignored when replaying a session).
+            session (list[dict]): The events of a recorded session to replay (see 'SessionRecorder').
+            capabilities (list[Capability]): The capabilities the runner accepts (default: all).
+            speed (float): Replay speed relative to the recording (0 replies immediately).
+        """
+        self.tests = { test.path: test for test in tests or [] }
+        self.capabilities = list(Capability) if capabilities is None else capabilities
+        self.speed = speed
+
+        self.replies: dict[str, deque] = {}
+        if session is not None:
+            self._load_replies(session)
+
+        self.negotiated: list[Capability] = []
+        self.pending: set[asyncio.Task] = set()
+
+    def _load_replies(self, session: list[dict]):
+        """
+        Groups the recorded frames by the command they reply to (RUN commands by test path).
+        """
+        last_command = None
+        tagged: dict[tuple[int, int], tuple[str, float]] = {}
+
+        for event in session:
+            if event['e'] == SessionRecorder.EVENT_COMMAND:
+                key, request_id = self._command_key(event['p'])
+                if request_id is None:
+                    last_command = (key, event['t'])
+                    self.replies.setdefault(key, deque())
+                else:
+                    tagged[(event['c'], request_id)] = (key, event['t'])
+                    self.replies.setdefault(key, deque())
+
+            elif event['e'] == SessionRecorder.EVENT_FRAME:
+                if event.get('id') is not None:
+                    source = tagged.pop((event['c'], event['id']), None)
+                else:
+                    source, last_command = last_command, None
+
+                if source is None:
+                    continue
+
+                key, sent_at = source
+                self.replies[key].append((event['t'] - sent_at, event.get('k', RemoteProtocol.FRAME_PLAIN), SessionRecorder.decode_frame_payload(event)))
+
+    @staticmethod
+    def _command_key(command: str) -> tuple[str, Optional[int]]:
+        parts = command.split(' ', 2)
+        if parts[0].upper() == 'RUN' and len(parts) == 3 and parts[1].isdigit():
+            return f'RUN {parts[2]}', int(parts[1])
+        return command, None
+
+    def _encode(self, frame_type: int, payload: bytes, request_id: Optional[int] = None) -> bytes:
+        if frame_type == RemoteProtocol.FRAME_RECORD:
+            frame = RemoteProtocol.FRAME_HEADER.pack(RemoteProtocol.FRAME_RECORD, len(payload)) + payload
+        else:
+            frame = RemoteProtocol.encode_frame(payload, compressed=Capability.ZLIB in self.negotiated)
+
+        if request_id is not None and Capability.MULTIPLEX in self.negotiated:
+            frame = RemoteProtocol.encode_tagged(request_id, frame)
+        return frame
+
+    def _encode_result(self, test: SimulatedTest, request_id: Optional[int]) -> bytes:
+        if Capability.BINARY in self.negotiated:
+            payload = RemoteProtocol.encode_record(test.record)[RemoteProtocol.FRAME_HEADER.size:]
+            return self._encode(RemoteProtocol.FRAME_RECORD, payload, request_id)
+        return self._encode(RemoteProtocol.FRAME_PLAIN, json.dumps(test.record).encode(), request_id)
+
+    async def _send(self, writer: asyncio.StreamWriter, data: bytes):
+        writer.write(data)
+        await writer.drain()
+
+    async def _reply_later(self, writer: asyncio.StreamWriter, delay: float, data: bytes):
+        await asyncio.sleep(delay)
+        if not writer.is_closing():
+            await self._send(writer, data)
+
+    async def _schedule_reply(self, writer: asyncio.StreamWriter, delay: float, data: bytes, concurrent: bool):
+        """
+        Sends a reply after the given delay, concurrent replies (multiplexed async tests) don't block other commands.
+        """
+        if not concurrent:
+            await self._reply_later(writer, delay, data)
+            return
+
+        task = asyncio.create_task(self._reply_later(writer, delay, data))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _connect(self, host: str, port: int, connect_timeout: float) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Connects to the server, retrying until it is listening (it might be starting at the same time).
+        """
+        deadline = time.perf_counter() + connect_timeout
+        while True:
+            try:
+                return await asyncio.open_connection(host, port)
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+
+    async def run(self, host: str, port: int, connect_timeout: float = 5) -> str:
+        """
+        Connects to the remote control server and handles its commands until told to exit.
+
+        Returns:
+            str: The outcome of the session (exit, crash, hang or disconnected).
+        """
+        reader, writer = await self._connect(host, port, connect_timeout)
+        self.negotiated = []
+
+        try:
+            while True:
+                try:
+                    command = (await reader.readuntil(b'\0'))[:-1].decode()
+                except (asyncio.IncompleteReadError, ConnectionResetError):
+                    return OUTCOME_DISCONNECTED
+
+                outcome = await self._handle_command(reader, writer, command)
+                if outcome is not None:
+                    return outcome
+        finally:
+            for task in self.pending:
+                task.cancel()
+            writer.close()
+
+    async def _handle_command(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, command: str) -> Optional[str]:
+        key, request_id = self._command_key(command)
+        name = command.split(' ', 1)[0].upper()
+
+        if name in ['EXIT', 'QUIT']:
+            return OUTCOME_EXIT
+
+        # Replay mode (every reply comes from the recording)
+        if self.replies:
+            if name == 'HELLO':
+                self.negotiated = RemoteProtocol.decode_hello(self.replies[key][0][2].decode()) if self.replies.get(key) else []
+
+            replies = self.replies.get(key)
+            if not replies:
+                await self._send(writer, self._encode(RemoteProtocol.FRAME_PLAIN, f"Unknown command: '{command}'".encode()))
+                return None
+
+            # Cycle the replies (the same test can run more than once)
+            delay, frame_type, payload = replies[0]
+            replies.rotate(-1)
+            if name == 'HELLO':
+                await self._send(writer, RemoteProtocol.encode_frame(payload))
+            else:
+                await self._schedule_reply(writer, delay / self.speed if self.speed else 0, self._encode(frame_type, payload, request_id), request_id is not None)
+            return None
+
+        if name == 'HELLO':
+            offered = RemoteProtocol.decode_hello(command)
+            self.negotiated = [capability for capability in offered if capability in self.capabilities]
+            await self._send(writer, RemoteProtocol.encode_frame(RemoteProtocol.encode_hello(self.negotiated).strip().encode()))
+            return None
+
+        if name == 'TESTS':
+            multiplex = Capability.MULTIPLEX in self.negotiated
+            lines = [f"{test.path}\t{','.join(test.get_flags())}" if multiplex else test.path for test in self.tests.values()]
+            await self._send(writer, self._encode(RemoteProtocol.FRAME_PLAIN, '\n'.join(lines).encode()))
+            return None
+
+        if name == 'RUN':
+            test = self.tests.get(key[len('RUN '):])
+            if test is None:
+                await self._send(writer, self._encode(RemoteProtocol.FRAME_PLAIN, f"Unknown test: '{key}'".encode()))
+                return None
+
+            if test.crash:
+                LOGGER.info(f"Simulating a crash on test '{test.path}'")
+                writer.transport.abort()
+                return OUTCOME_CRASH
+
+            if test.hang:
+                LOGGER.info(f"Simulating a hang on test '{test.path}'")
+                await reader.read()  # Wait for the server to give up on us
+                return OUTCOME_HANG
+
+            await self._schedule_reply(writer, test.duration, self._encode_result(test, request_id), request_id is not None and test.is_async)
+            return None
+
+        await self._send(writer, self._encode(RemoteProtocol.FRAME_PLAIN, f"Unknown command: '{name}'".encode()))
+        return None
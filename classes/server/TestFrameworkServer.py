@@ -1,32 +1,59 @@
 import asyncio
+import logging
+import socket
 from pathlib import Path
 from typing import Optional
-import xml.etree.ElementTree as ElementTree
 from aiohttp import web
 import json
 import struct
 
-from classes.model.TestFrameworkResult import TestFrameworkResult
-from classes.model.TestResult import TestResult
-from classes.model.TestSuiteResult import TestSuiteResult
-from utils import (network_utils, file_utils)
+from classes.server.ResultCollector import ResultCollector
+from utils import debug_utils, metrics_utils, network_utils
 from utils.logging_utils import LOGGER
 from utils.path_utils import ROOT_DIR
 
+# Echo limits (messages over the maximum size close the connection, see aiohttp's max_msg_size and writer_limit)
+DEFAULT_MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+DEFAULT_SEND_BUFFER_SIZE = 256 * 1024
+
+# Number of echoed messages between counter updates (per connection)
+ECHO_SAMPLE_SIZE = 1024
+
+class EchoStats:
+    """
+    Counters of a websocket echo endpoint (updated in samples, not per message).
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+        self.bytes = 0
+        self.rejected = 0
+
+    def add(self, messages: int, size: int):
+        self.messages += messages
+        self.bytes += size
+
+    def __str__(self):
+        return f"connections={self.connections} messages={self.messages} bytes={self.bytes} rejected={self.rejected}"
+
 # Define the asynchronous function to manage the server
-async def manage_server(task_func: callable):
+async def manage_server(task_func: callable, port: int = 8080, sock: Optional[socket.socket] = None, **server_options):
     """
     Starts the echo server, executes the provided asynchronous task, 
     and then stops the server.
 
     Args:
     - task_func (callable): An asynchronous function to execute while the server is running.
+    - port (int): The port to listen on.
+    - sock (socket): A reserved listening socket to serve on instead (see 'network_utils.reserve_port').
+    - server_options: Options passed through to the TestFrameworkServer (ie.: max_message_size).
     """
-    server = TestFrameworkServer()
+    server = TestFrameworkServer(**server_options)
     
     # Start the server
     local_ip = network_utils.get_local_ip()
-    await server.start(local_ip)
+    await server.start(local_ip, port, sock)
     
     try:
         # Create a task for the provided function so it can run concurrently with the server
@@ -41,7 +68,25 @@ async def manage_server(task_func: callable):
 
 class TestFrameworkServer:
     
-    def __init__(self):
+    def __init__(self, max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE, send_buffer_size: int = DEFAULT_SEND_BUFFER_SIZE, debug_endpoints: bool = False, output_path: Optional[Path] = None):
+        """
+        Args:
+            max_message_size (int): The maximum size of a websocket message (bigger messages close the connection).
+            send_buffer_size (int): The bytes buffered per websocket connection before echoing waits for the client.
+            debug_endpoints (bool): Adds the '/debug' endpoints (profiling, memory diffs and task counts) for inspecting long runs.
+            output_path (Path): The folder where the results posted to '/tests' are written (default: 'results').
+        """
+        self.output_path = output_path or ROOT_DIR / 'results'
+        self.max_message_size = max_message_size
+        self.send_buffer_size = send_buffer_size
+        self.echo_stats = { 'gm_websocket': EchoStats(), 'raw_websocket': EchoStats() }
+        self.lag_monitor: Optional[asyncio.Task] = None
+
+        metrics_utils.REGISTRY.gauge('gmtf_echo_connections', 'Open websocket echo connections', ('endpoint',), callback=lambda: { (name,): stats.connections for name, stats in self.echo_stats.items() })
+        metrics_utils.REGISTRY.counter('gmtf_echo_messages_total', 'Websocket messages echoed', ('endpoint',), callback=lambda: { (name,): stats.messages for name, stats in self.echo_stats.items() })
+        metrics_utils.REGISTRY.counter('gmtf_echo_bytes_total', 'Websocket bytes echoed', ('endpoint',), callback=lambda: { (name,): stats.bytes for name, stats in self.echo_stats.items() })
+        metrics_utils.REGISTRY.counter('gmtf_echo_rejected_total', 'Websocket connections closed by an error (ie.: message too big)', ('endpoint',), callback=lambda: { (name,): stats.rejected for name, stats in self.echo_stats.items() })
+
         # Initializing the aiohttp application
         self.app = web.Application(middlewares=[TestFrameworkServer.cors_middleware])
 
@@ -56,6 +101,29 @@ class TestFrameworkServer:
         # Used for results
         self.app.add_routes([web.post('/tests', self.http_result_handler)])
 
+        # Metrics (Prometheus text format)
+        self.app.add_routes([web.get('/metrics', self.http_metrics_handler)])
+
+        # Debugging of the launcher process itself (only when requested, these expose its internals)
+        self.profiler = debug_utils.Profiler()
+        self.memory_tracker = debug_utils.MemoryTracker()
+        if debug_endpoints:
+            self.app.add_routes([
+                web.post('/debug/profile/start', self.http_profile_start_handler),
+                web.post('/debug/profile/stop', self.http_profile_stop_handler),
+                web.post('/debug/memory/start', self.http_memory_start_handler),
+                web.get('/debug/memory', self.http_memory_diff_handler),
+                web.post('/debug/memory/stop', self.http_memory_stop_handler),
+                web.get('/debug/tasks', self.http_tasks_handler),
+            ])
+
+        # Results being received (by run id) and result files being written
+        self.result_collectors: dict[str, ResultCollector] = {}
+        self.finalized_runs: set[str] = set()
+        self.pending_uploads: dict[str, int] = {}
+        self.uploads_changed = asyncio.Condition()
+        self.pending_writes: set[asyncio.Future] = set()
+
         # Runner and site will be used to control the server's lifecycle
         self.runner = None
         self.site = None
@@ -97,141 +165,218 @@ class TestFrameworkServer:
         # Returning the response with the dynamic status and message
         return web.json_response(data=message, status=status_code)
 
-    @staticmethod
-    async def gm_websocket_handler(request: web.Request):
+    async def gm_websocket_handler(self, request: web.Request):
         """WebSocket handler that performs a handshake with the client and echoes back the binary data received."""
         LOGGER.info("New gm websocket connection initiated")
 
-        ws = web.WebSocketResponse()
+        ws = web.WebSocketResponse(max_msg_size=self.max_message_size, writer_limit=self.send_buffer_size)
         await ws.prepare(request)
 
-        # Handshake is initially required
-        requires_handshake = True
-
         # Server needs to start the handshake by sending a banner
         await ws.send_bytes(bytes("GM:Studio-Connect", "ascii") + b"\x00")
 
-        async for msg in ws:
-            if requires_handshake:
-                if not msg.data or msg.type != web.WSMsgType.BINARY:
-                    await ws.close()
-                    LOGGER.warning("Connection terminated due to non-binary data or empty message during handshake.")
-                    break
-
-                if len(msg.data) != 16:
-                    await ws.close()
-                    LOGGER.warning("Connection terminated due to incorrect data length during handshake.")
-                    break
-
-                # Unpacking data assuming it's structured as per your logic
-                try:
-                    magic1, magic2, magic3, gameid = struct.unpack('<IIIi', msg.data)
-                except struct.error as e:
-                    await ws.close()
-                    LOGGER.error(f"Connection terminated due to unpacking error: {e}")
-                    break
-
-                if (magic1 != 0xCAFEBABE or magic2 != 0xDEADB00B or magic3 != 16):
-                    await ws.close()
-                    LOGGER.warning("Connection terminated due to failed handshake validation.")
-                    break
-
-                # Construct and send response
-                res = struct.pack('<III', 0xDEAFBEAD, 0xF00DBEEB, 12)
-                await ws.send_bytes(res)
-                requires_handshake = False
-                LOGGER.info(f"Handshake succeeded (gameid = {gameid}). Starting Echo.")
-            else:
-                await ws.send_bytes(msg.data)
-                LOGGER.debug("Echoed binary data back to client.")
+        # Handshake is initially required
+        msg = await ws.receive()
+
+        if not msg.data or msg.type != web.WSMsgType.BINARY:
+            await ws.close()
+            LOGGER.warning("Connection terminated due to non-binary data or empty message during handshake.")
+            return ws
+
+        if len(msg.data) != 16:
+            await ws.close()
+            LOGGER.warning("Connection terminated due to incorrect data length during handshake.")
+            return ws
+
+        # Unpacking data assuming it's structured as per your logic
+        try:
+            magic1, magic2, magic3, gameid = struct.unpack('<IIIi', msg.data)
+        except struct.error as e:
+            await ws.close()
+            LOGGER.error(f"Connection terminated due to unpacking error: {e}")
+            return ws
+
+        if (magic1 != 0xCAFEBABE or magic2 != 0xDEADB00B or magic3 != 16):
+            await ws.close()
+            LOGGER.warning("Connection terminated due to failed handshake validation.")
+            return ws
+
+        # Construct and send response
+        res = struct.pack('<III', 0xDEAFBEAD, 0xF00DBEEB, 12)
+        await ws.send_bytes(res)
+        LOGGER.info(f"Handshake succeeded (gameid = {gameid}). Starting Echo.")
+
+        await self._echo(ws, self.echo_stats['gm_websocket'])
 
         LOGGER.info("WebSocket handler completed.")
         return ws
 
-    @staticmethod
-    async def raw_websocket_handler(request: web.Request):
+    async def raw_websocket_handler(self, request: web.Request):
         """WebSocket handler that echoes back the binary data received."""
         LOGGER.info("New raw websocket connection initiated")
 
-        ws = web.WebSocketResponse()
+        ws = web.WebSocketResponse(max_msg_size=self.max_message_size, writer_limit=self.send_buffer_size)
         await ws.prepare(request)
 
         LOGGER.info("WebSocket connection established. Starting Echo.")
 
-        async for msg in ws:
-            if msg.type == web.WSMsgType.BINARY:
-                await ws.send_bytes(msg.data)
-                LOGGER.debug(f"Echoed binary data of length {len(msg.data)} bytes")
-            elif msg.type == web.WSMsgType.TEXT:
-                # Optionally handle text messages differently
-                LOGGER.warning("Received text message on raw binary echo service")
-                await ws.send_str(msg.data)
-            elif msg.type == web.WSMsgType.CLOSE:
-                LOGGER.info("WebSocket connection closed by client.")
-            else:
-                LOGGER.warning(f"Unhandled message type: {msg.type}")
+        await self._echo(ws, self.echo_stats['raw_websocket'])
 
         LOGGER.info("WebSocket handler completed.")
         return ws
-    
-    @staticmethod
-    async def http_result_handler(request: web.Request):
-        LOGGER.info("Received request to save JSON|XML data")
-
-        try:
-            # Parse JSON body
-            body: dict = await request.json()
-            LOGGER.debug(f"JSON data parsed successfully: {body}")
-        
-            run_name: str = body["data"]["run_name"]
-            results: list[dict] = body["data"]["results"]
-
-            framework_result: Optional[TestFrameworkResult] = None
-            suite_results: dict[str, TestSuiteResult] = {}
-
-            for result in results:
-
-                # Extract necessary fields from the parsed JSON
-                result_data: Optional[dict] = result.get('details')
-                suite: Optional[str] = result.get('suite')
-                timestamp: Optional[float] = result.get('timestamp')
 
-                # Initialize framework result if not already set
-                if not framework_result:
-                    framework_result = TestFrameworkResult(name=run_name, timestamp=timestamp)
-                    LOGGER.debug(f"Initialized framework result: {framework_result.name} at {timestamp}")
+    async def _echo(self, ws: web.WebSocketResponse, stats: EchoStats):
+        """
+        Echoes every message received on the websocket. Nothing is formatted per message, the counters
+        are flushed into the endpoint stats every ECHO_SAMPLE_SIZE messages and when the connection ends.
+        Sending waits for the transport to drain once 'send_buffer_size' bytes are pending, so a client
+        that doesn't read its echoes stops being read from (backpressure) instead of growing the buffer.
+        """
+        stats.connections += 1
+        messages = 0
+        size = 0
 
-                # Initialize suite result or switch to a new suite if necessary
-                if not suite in suite_results:
-                    suite_result = TestSuiteResult(name=suite, timestamp=timestamp)
-                    framework_result.testsuites.append(suite_result)
-                    suite_results[suite] = suite_result
-                    LOGGER.debug(f"Initialized new test suite result: {suite} at {timestamp}")
-
-                # Add the test result to the current suite
-                result = TestResult(**result_data)
-                suite_results[suite].tests.append(result)
-                LOGGER.debug(f"Added test result: {result_data['name']} with status {result_data['result']}")
-
-            filename = f'testFramework_{run_name.replace(":", "_")}'
-            output_path = ROOT_DIR / 'results'
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            ## Save to a json file
-            file_utils.save_data_as_json(framework_result.to_dict(), output_path / f'{filename}.json')
+        try:
+            async for msg in ws:
+                if msg.type == web.WSMsgType.BINARY:
+                    await ws.send_bytes(msg.data)
+                elif msg.type == web.WSMsgType.TEXT:
+                    await ws.send_str(msg.data)
+                elif msg.type == web.WSMsgType.ERROR:
+                    # Messages over the size limit end here (the connection is closed with 1009)
+                    stats.rejected += 1
+                    LOGGER.warning(f"WebSocket connection error: {ws.exception()}")
+                    continue
+                else:
+                    LOGGER.warning(f"Unhandled message type: {msg.type}")
+                    continue
+
+                messages += 1
+                size += len(msg.data)
+                if messages == ECHO_SAMPLE_SIZE:
+                    stats.add(messages, size)
+                    messages = size = 0
+
+        except ConnectionResetError as e:
+            LOGGER.warning(f"Failed to echo data back to client: {e}")
+        finally:
+            stats.add(messages, size)
+            stats.connections -= 1
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(f"Echo stats: {stats}")
 
-            element = framework_result.to_xml()         
+    @staticmethod
+    async def http_metrics_handler(request: web.Request):
+        """HTTP handler that exposes the launcher metrics in the Prometheus text format."""
+        return web.Response(body=metrics_utils.REGISTRY.render().encode(), headers={ 'Content-Type': metrics_utils.CONTENT_TYPE })
 
-            ## Create an ElementTree object from the root element
-            tree = ElementTree.ElementTree(element)
-            tree.write(output_path / f'{filename}.xml', encoding='UTF-8', xml_declaration=True)
+    @staticmethod
+    def _get_int_query(request: web.Request, name: str, default: int) -> int:
+        try:
+            return max(int(request.query.get(name, default)), 1)
+        except ValueError:
+            raise web.HTTPBadRequest(text=f"Invalid '{name}' value")
+
+    async def http_profile_start_handler(self, request: web.Request):
+        """HTTP handler that starts a cProfile session of the event loop thread."""
+        if not self.profiler.start():
+            return web.json_response({"error": "A profiling session is already running"}, status=409)
+
+        LOGGER.info("Profiling started")
+        return web.json_response({"profiling": True})
+
+    async def http_profile_stop_handler(self, request: web.Request):
+        """
+        HTTP handler that stops the profiling session and returns its report as text, the
+        'limit' (default: 30) top functions ordered by 'sort' (default: cumulative).
+        """
+        sort = request.query.get('sort', 'cumulative')
+        if sort not in debug_utils.PROFILE_SORT_KEYS:
+            return web.json_response({"error": f"Invalid sort (available: {debug_utils.PROFILE_SORT_KEYS})"}, status=400)
+
+        report = self.profiler.stop(self._get_int_query(request, 'limit', 30), sort)
+        if report is None:
+            return web.json_response({"error": "No profiling session is running"}, status=409)
+
+        LOGGER.info("Profiling stopped")
+        return web.Response(text=report)
+
+    async def http_memory_start_handler(self, request: web.Request):
+        """HTTP handler that starts tracing allocations (keeping 'frames' frames per allocation, default: 1)."""
+        if not self.memory_tracker.start(self._get_int_query(request, 'frames', 1)):
+            return web.json_response({"error": "Allocations are already being traced"}, status=409)
+
+        LOGGER.info("Memory tracing started")
+        return web.json_response({"tracing": True})
+
+    async def http_memory_diff_handler(self, request: web.Request):
+        """
+        HTTP handler that returns the 'limit' (default: 20) biggest allocation changes since the previous
+        call, grouped by 'group' (lineno, filename or traceback). Taking the snapshot runs in a worker thread.
+        """
+        group = request.query.get('group', 'lineno')
+        if group not in ['lineno', 'filename', 'traceback']:
+            return web.json_response({"error": "Invalid group (available: lineno, filename, traceback)"}, status=400)
+
+        limit = self._get_int_query(request, 'limit', 20)
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(None, self.memory_tracker.diff, limit, group)
+        if report is None:
+            return web.json_response({"error": "Allocations are not being traced"}, status=409)
+
+        return web.json_response(report)
+
+    async def http_memory_stop_handler(self, request: web.Request):
+        """HTTP handler that stops tracing allocations."""
+        self.memory_tracker.stop()
+        LOGGER.info("Memory tracing stopped")
+        return web.json_response({"tracing": False})
 
-            # Respond to indicate success
-            return web.Response(text="JSON saved successfully")
+    @staticmethod
+    async def http_tasks_handler(request: web.Request):
+        """HTTP handler that returns the number of asyncio tasks (by coroutine) of the launcher."""
+        return web.json_response(debug_utils.get_task_counts())
+
+    async def http_result_handler(self, request: web.Request):
+        """
+        HTTP handler that ingests test results. The body can either be a full JSON document
+        (`{ "data": { "run_name", "results" } }`) or NDJSON (one result record per line, with
+        an optional `{ "run_name" }` header line) streamed in chunks. Partial posts can be sent
+        under the same `run_id` query parameter, the results are written once `final` is set.
+        Compressed bodies (`Content-Encoding: gzip|deflate`) are decoded by aiohttp while streaming.
+        Model building and file I/O happen off the event loop, the response is a receipt.
+
+        Posts of a run can overlap (partials are sent without waiting for their receipt), the final
+        one is only written once the partials still uploading are in. Posts for a run that was already
+        written are rejected (409).
+        """
+        run_id: Optional[str] = request.query.get('run_id')
+        final = request.query.get('final', 'true' if run_id is None else 'false').lower() in ['1', 'true']
+
+        LOGGER.info(f"Received results (run_id: {run_id}, final: {final}, encoding: {request.headers.get('Content-Encoding', 'identity')})")
+
+        if run_id in self.finalized_runs:
+            LOGGER.warning(f"Dropping results posted after the final ones (run_id: {run_id})")
+            return web.Response(status=409, text="Run already finalized")
+
+        # The collector is registered before reading the body, posts of the same run share it
+        collector = self.result_collectors.get(run_id) if run_id else None
+        if collector is None:
+            collector = ResultCollector(run_id=run_id)
+            if run_id:
+                self.result_collectors[run_id] = collector
+
+        self.pending_uploads[run_id] = self.pending_uploads.get(run_id, 0) + 1
+        try:
+            if request.content_type == 'application/x-ndjson':
+                received = await self._ingest_ndjson(request, collector)
+            else:
+                received = await self._ingest_json(request, collector)
 
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
             # Log and respond to indicate a JSON parsing error
-            LOGGER.error(f"Error parsing JSON from request: {e}")
+            LOGGER.error(f"Error parsing results from request: {e}")
             return web.Response(status=400, text="Invalid JSON data")
 
         except Exception as e:
@@ -239,21 +384,108 @@ class TestFrameworkServer:
             LOGGER.error(f"An error occurred: {e}")
             return web.Response(status=500, text="Internal server error")
 
-    async def start(self, host='localhost', port=8080):
-        """Start the server."""
+        finally:
+            await self._end_upload(run_id)
+
+        if final:
+            if run_id:
+                # Later posts are rejected, the ones still uploading are waited for
+                self.finalized_runs.add(run_id)
+                async with self.uploads_changed:
+                    await self.uploads_changed.wait_for(lambda: not self.pending_uploads.get(run_id))
+                self.result_collectors.pop(run_id, None)
+            self._schedule_write(collector)
+
+        # Respond with a receipt (results are written in the background)
+        return web.json_response({ 'run_id': run_id, 'received': received, 'total': len(collector.records), 'final': final }, status=202)
+
+    async def _end_upload(self, run_id: Optional[str]):
+        async with self.uploads_changed:
+            self.pending_uploads[run_id] -= 1
+            if not self.pending_uploads[run_id]:
+                del self.pending_uploads[run_id]
+            self.uploads_changed.notify_all()
+
+    async def _ingest_ndjson(self, request: web.Request, collector: ResultCollector) -> int:
+        received = 0
+        async for line in request.content:
+            line = line.strip()
+            if not line:
+                continue
+
+            record: dict = json.loads(line)
+            if 'details' not in record:
+                collector.run_name = record.get('run_name', collector.run_name)
+            elif collector.add_record(record):
+                received += 1
+
+        return received
+
+    async def _ingest_json(self, request: web.Request, collector: ResultCollector) -> int:
+        body = await request.read()
+
+        # Parsing big documents is done in a worker thread to keep the endpoints responsive
+        loop = asyncio.get_running_loop()
+        data: dict = (await loop.run_in_executor(None, json.loads, body))["data"]
+
+        collector.run_name = data.get("run_name", collector.run_name)
+        return sum(1 for record in data.get("results", []) if collector.add_record(record))
+
+    def _schedule_write(self, collector: ResultCollector):
+        filename = f'testFramework_{collector.run_name.replace(":", "_")}'
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(loop.run_in_executor(None, collector.write, self.output_path, filename))
+
+        self.pending_writes.add(task)
+        task.add_done_callback(self.pending_writes.discard)
+        task.add_done_callback(lambda task: self._log_write_failure(task, collector))
+
+    @staticmethod
+    def _log_write_failure(task: asyncio.Future, collector: ResultCollector):
+        # The receipt was already sent (202), a failed write can only be reported here
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error(f"Failed to write the results of run '{collector.run_name}' (run_id: {collector.run_id}): {task.exception()!r}")
+
+    async def start(self, host='localhost', port=8080, sock: Optional[socket.socket] = None):
+        """
+        Start the server. A reserved listening socket is served through a duplicate (the reservation
+        stays open so the port can be served again).
+        """
+        if sock is not None:
+            host, port = sock.getsockname()[:2]
         LOGGER.info(f"Starting server on {host}:{port}")
 
         # Initialize the runner, set it up, then create a site to bind to an address
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
-        self.site = web.TCPSite(self.runner, host, port)
+        self.site = web.SockSite(self.runner, sock.dup()) if sock is not None else web.TCPSite(self.runner, host, port)
         await self.site.start()
 
+        self.lag_monitor = asyncio.create_task(metrics_utils.monitor_event_loop_lag())
+
         LOGGER.info("Server started successfully.")
 
     async def stop(self):
         """Stop the server."""
         LOGGER.info("Stopping server...")
+
+        if self.lag_monitor:
+            self.lag_monitor.cancel()
+
+        self.profiler.stop()
+        self.memory_tracker.stop()
+
+        # Runs whose final publish never came (ie.: the runner crashed) still get the results received so far
+        for run_id, collector in list(self.result_collectors.items()):
+            LOGGER.warning(f"Run '{collector.run_name}' (run_id: {run_id}) never sent its final results, writing the {len(collector.records)} received")
+            self._schedule_write(collector)
+        self.result_collectors.clear()
+
+        # Make sure all the result files are written before stopping
+        if self.pending_writes:
+            LOGGER.info(f"Waiting for {len(self.pending_writes)} result file(s) to be written...")
+            await asyncio.gather(*self.pending_writes, return_exceptions=True)
+
         if self.site:
             await self.site.stop()
             await self.runner.cleanup()
@@ -1,19 +1,51 @@
 import asyncio
+import importlib
 import json
 from pathlib import Path
 import argparse
 import subprocess
 import sys
+from typing import Optional
 from dotenv import load_dotenv
 
-from classes.model.TestFrameworkResult import TestFrameworkResult
 from utils import (data_utils, file_utils, logging_utils)
 from utils.logging_utils import LOGGER
-from classes.commands.IgorRunTestsCommand import IgorRunTestsCommand
-from classes.commands.RunTestsCommand import RunTestsCommand
-from classes.commands.RunServerCommand import RunServerCommand
 from utils.path_utils import ROOT_DIR
 
+# The launcher commands (name: module, class and help). Only the module of the command being run is
+# imported, along with its dependencies (aiohttp, pydantic, requests, ...), the others are only listed.
+COMMANDS = {
+    'igorRunTests': ('classes.commands.IgorRunTestsCommand', 'IgorRunTestsCommand', 'Runs the testframework and collects all results'),
+    'runTests': ('classes.commands.RunTestsCommand', 'RunTestsCommand', 'Runs the test servers (useful for IDE execution)'),
+    'runServer': ('classes.commands.RunServerCommand', 'RunServerCommand', 'Runs the test servers (useful for IDE execution)'),
+    'benchmark': ('classes.commands.BenchmarkCommand', 'BenchmarkCommand', 'Runs the launcher benchmarks (no GameMaker install required)'),
+    'indexTests': ('classes.commands.IndexTestsCommand', 'IndexTestsCommand', 'Builds the static test index of a project (no GameMaker install required)'),
+    'mergeResults': ('classes.commands.MergeResultsCommand', 'MergeResultsCommand', 'Merges result files (ie.: from sharded runs) into a single result'),
+    'simulateRunner': ('classes.commands.SimulateRunnerCommand', 'SimulateRunnerCommand', 'Runs a simulated runner against a remote control server (no GameMaker install required)'),
+    'loadTest': ('classes.commands.LoadTestCommand', 'LoadTestCommand', 'Load tests the test server endpoints (echo, status and websockets)'),
+    'watch': ('classes.commands.WatchCommand', 'WatchCommand', 'Re-runs the affected test suites whenever the project changes'),
+}
+
+# Commands whose results decide the exit code of the launcher
+TEST_COMMANDS = ['igorRunTests', 'runTests']
+
+# Value of the command line options given without a value (ie.: '--help')
+FLAG = object()
+
+def load_command_class(name: str) -> type:
+    module_name, class_name, _ = COMMANDS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+def register_commands(subparsers: argparse._SubParsersAction, command: Optional[str]):
+    """
+    Registers the command being run with all its options, the other commands are only listed (by name and help).
+    """
+    for name, (_, _, help) in COMMANDS.items():
+        if name == command:
+            load_command_class(name).register_command(subparsers)
+        else:
+            subparsers.add_parser(name, help=help, add_help=False)
+
 def install_dependencies():
     launcher_folder = Path(__file__).parent
     subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", launcher_folder / "requirements.txt"])
@@ -27,16 +59,23 @@ def filter_scoped_entries(config_args):
 def merge_config_and_cli_args(config_args, cli_args):
     """
     Merge config args with CLI args, with CLI args taking precedence.
-    CLI args are processed as a list of key-value pairs (e.g., ['--key', 'value']).
+    CLI args are processed as a list of key-value pairs (e.g., ['--key', 'value']), options
+    without a value (e.g., '--help') are kept as flags.
     CLI args take precedence over config args.
     """
     cli_args_dict = {}
     
-    # Iterate through the CLI args two items at a time (key, value)
-    for i in range(0, len(cli_args), 2):
+    # Iterate through the CLI args (key, value)
+    i = 0
+    while i < len(cli_args):
         key = cli_args[i].lstrip('--')  # Remove the leading '--'
+        if i + 1 >= len(cli_args) or cli_args[i + 1].startswith('--'):
+            cli_args_dict[key] = FLAG
+            i += 1
+            continue
         value = cli_args[i + 1]  # The next item is the value
         cli_args_dict[key] = value
+        i += 2
     
     # Merge CLI args into config args, with CLI args taking precedence
     config_args.update(cli_args_dict)
@@ -71,7 +110,7 @@ def load_config_and_merge_with_cli_args():
     merged_args = merge_config_and_cli_args(config_args, command_args)
 
     # Reconstruct remaining_argv from merged_args
-    remaining_argv = [f'--{k}={v}' for k, v in merged_args.items() if v is not None]
+    remaining_argv = [f'--{k}' if v is FLAG else f'--{k}={v}' for k, v in merged_args.items() if v is not None]
 
     # Add the original command and non-flag CLI arguments back
     if command:
@@ -80,6 +119,8 @@ def load_config_and_merge_with_cli_args():
     return args, remaining_argv, scoped_args
 
 def check_xml_json_pairs_and_failures(directory):
+    from classes.model.TestFrameworkResult import TestFrameworkResult
+
     # Convert the directory to a Path object
     directory = Path(directory)
     
@@ -143,10 +184,8 @@ async def main():
     parser = argparse.ArgumentParser(description='TestFramework Tools')
     subparsers = parser.add_subparsers(dest='command', required=True)
 
-    # Register commands with the parser
-    IgorRunTestsCommand.register_command(subparsers)
-    RunTestsCommand.register_command(subparsers)
-    RunServerCommand.register_command(subparsers)
+    # Register commands with the parser (only the one being run is imported)
+    register_commands(subparsers, remaining_argv[0] if remaining_argv else None)
 
     # Parse remaining command-line arguments
     args = parser.parse_args(remaining_argv)
@@ -163,9 +202,9 @@ async def main():
         LOGGER.error("Unknown command. Please use a registered command.")
         exit(1)
 
-    # Check if we need to fail execution
-    if args.command_class in [IgorRunTestsCommand, RunTestsCommand]:
-        directory = ROOT_DIR / 'results'
+    # Check if we need to fail execution (build-only runs and manual sessions have no results to check)
+    if args.command in TEST_COMMANDS and getattr(args, 'mode', None) != 'build-only' and not getattr(args, 'manual', False):
+        directory = cmd.get_results_folder()
         failed = check_xml_json_pairs_and_failures(directory)        
         if failed:
             LOGGER.error(f"Failed or Expired tests found!")
@@ -57,6 +57,187 @@ testFramework.addSuite(ResourceTimeSourceTestSuite);
 
 socket = undefined;
 network_buffer = undefined; 
+network_compress = false;
+network_binary = false;
+network_multiplex = false;
+
+/// @function send_header(request_id)
+/// @description Starts a new frame, tagging it with the request id (if given) when multiplexing.
+/// @param {Real} request_id The id of the request being replied to (optional).
+/// @ignore
+send_header = function(_request_id) {
+	buffer_seek(network_buffer, buffer_seek_start, 0);
+	
+	// Tagged frame: [u8 type][u32 request id][frame]
+	if (network_multiplex && !is_undefined(_request_id)) {
+		buffer_write(network_buffer, buffer_u8, 3);
+		buffer_write(network_buffer, buffer_u32, _request_id);
+	}
+}
+
+/// @function send_message(message, [request_id])
+/// @description Sends a message to the remote server (compressed if negotiated through the HELLO command).
+/// @param {String} message The message to be sent.
+/// @param {Real} request_id The id of the request being replied to (optional).
+send_message = function(_message, _request_id = undefined) {
+	send_header(_request_id);
+	
+	if (!network_compress) {
+		buffer_write(network_buffer, buffer_string, _message);
+		network_send_raw(socket, network_buffer, buffer_tell(network_buffer));
+		return;
+	}
+	
+	// Compressed frame: [u8 type][u32 size][zlib payload]
+	var _raw = buffer_create(max(1, string_byte_length(_message)), buffer_fixed, 1);
+	buffer_write(_raw, buffer_text, _message);
+	var _compressed = buffer_compress(_raw, 0, buffer_tell(_raw));
+	var _size = buffer_get_size(_compressed);
+	
+	buffer_write(network_buffer, buffer_u8, 1);
+	buffer_write(network_buffer, buffer_u32, _size);
+	if (buffer_get_size(network_buffer) < buffer_tell(network_buffer) + _size) {
+		buffer_resize(network_buffer, buffer_tell(network_buffer) + _size);
+	}
+	buffer_copy(_compressed, 0, _size, network_buffer, buffer_tell(network_buffer));
+	network_send_raw(socket, network_buffer, buffer_tell(network_buffer) + _size);
+	
+	buffer_delete(_compressed);
+	buffer_delete(_raw);
+}
+
+/// @function send_result(data, result, [request_id])
+/// @description Sends a test result to the remote server (as a binary record if negotiated through the HELLO command).
+/// @param {Struct} data The result data ({ details, suite, timestamp }).
+/// @param {Enum.TestResult} result The result of the test.
+/// @param {Real} request_id The id of the RUN request being replied to (optional).
+send_result = function(_data, _result, _request_id = undefined) {
+	if (!network_binary) {
+		send_message(json_stringify(_data), _request_id);
+		return;
+	}
+	
+	var _details = _data.details;
+	var _errors = _details[$ "errors"] ?? [];
+	var _exceptions = _details[$ "exceptions"] ?? [];
+	
+	send_header(_request_id);
+	var _start = buffer_tell(network_buffer);
+	
+	// Binary record frame: [u8 type][u32 size][u8 result][f64 duration][u32 assertions][u16 errors][u16 exceptions][f64 timestamp][name][suite][details?]
+	buffer_write(network_buffer, buffer_u8, 2);
+	buffer_write(network_buffer, buffer_u32, 0);
+	buffer_write(network_buffer, buffer_u8, _result);
+	buffer_write(network_buffer, buffer_f64, _details[$ "duration"] ?? 0);
+	buffer_write(network_buffer, buffer_u32, _details[$ "assertions"] ?? 0);
+	buffer_write(network_buffer, buffer_u16, array_length(_errors));
+	buffer_write(network_buffer, buffer_u16, array_length(_exceptions));
+	buffer_write(network_buffer, buffer_f64, _data.timestamp);
+	buffer_write(network_buffer, buffer_string, _details.name);
+	buffer_write(network_buffer, buffer_string, _data.suite);
+	
+	// Verbose details are only sent when present
+	if (array_length(_errors) + array_length(_exceptions) > 0) {
+		buffer_write(network_buffer, buffer_string, json_stringify({ errors: _errors, exceptions: _exceptions }));
+	}
+	
+	var _size = buffer_tell(network_buffer);
+	buffer_poke(network_buffer, _start + 1, buffer_u32, _size - _start - 5);
+	network_send_raw(socket, network_buffer, _size);
+}
+
+#macro NETWORK_CMD_HELLO "HELLO"
+#macro NETWORK_CMD_TESTS "TESTS"
+#macro NETWORK_CMD_RUN "RUN"
+#macro NETWORK_CMD_EXIT "EXIT"
+#macro NETWORK_CMD_QUIT "QUIT"
+
+/// @function handle_command(incoming)
+/// @description Handles a command received from the remote server.
+/// @param {String} incoming The command and its arguments.
+handle_command = function(_incoming) {
+	
+	// Split command from arguments
+	var _parts = string_split(_incoming, " ", true, 1);
+	
+	// Command if the first part (make upper case)
+	var _message, _command = string_upper(_parts[0]);
+	
+	// Switch on the available commands
+	switch (_command) {
+		// Negotiates optional protocol features (replies with the accepted ones)
+		case NETWORK_CMD_HELLO:
+			var _accepted = [];
+			var _offered = array_length(_parts) == 2 ? string_split(_parts[1], ",", true) : [];
+			for (var _i = 0; _i < array_length(_offered); _i++) {
+				if (array_contains(["zlib", "binary", "multiplex"], _offered[_i])) array_push(_accepted, _offered[_i]);
+			}
+			_message = string_join_ext(",", _accepted);
+			_message = string_length(_message) > 0 ? $"{NETWORK_CMD_HELLO} {_message}" : NETWORK_CMD_HELLO;
+			
+			// Reply before enabling the features (the reply itself is a plain frame)
+			send_message(_message);
+			network_compress = array_contains(_accepted, "zlib");
+			network_binary = array_contains(_accepted, "binary");
+			network_multiplex = array_contains(_accepted, "multiplex");
+			global.gTestConcurrent = network_multiplex;
+			return;
+			
+		// Return a line break separated list of all tests (ie.: formatted as '<suite>@<test>')
+		// When multiplexing each path is followed by a tab and its flags (ie.: '<suite>@<test>\tasync,exclusive')
+		case NETWORK_CMD_TESTS:
+			var _tests = testFramework.getTestPaths(false);
+			if (network_multiplex) {
+				for (var _i = 0; _i < array_length(_tests); _i++) {
+					var _test = testFramework.findTestByPath(_tests[_i]);
+					var _flags = [];
+					if (is_instanceof(_test, TestAsync)) array_push(_flags, "async");
+					if (_test.exclusive) array_push(_flags, "exclusive");
+					_tests[_i] = $"{_tests[_i]}\t{string_join_ext(",", _flags)}";
+				}
+			}
+			_message = string_join_ext("\n", _tests);
+			break;
+			
+		// Runs a test or suite (arguments should be the test name of suite name)
+		// When multiplexing the test name is preceded by the request id (ie.: 'RUN <ID> <TEST|SUITE>')
+		case NETWORK_CMD_RUN:
+			// Theck if there are arguments
+			if (array_length(_parts) != 2) {
+				_message = "Run command was incorrectly formatted: RUN <TEST|SUITE>";
+				break;
+			}
+			
+			// Get the test name (and request id)
+			var _request_id = undefined;
+			var _test_name = _parts[1];
+			if (network_multiplex) {
+				var _args = string_split(_test_name, " ", true, 1);
+				_request_id = real(_args[0]);
+				_test_name = _args[1];
+			}
+			
+			var _test = testFramework.findTestByPath(_test_name);
+			_test.run(undefined, {
+				path: _test_name,
+				request_id: _request_id,
+			});
+			return;
+			
+		// Quits the runner
+		case NETWORK_CMD_EXIT:
+		case NETWORK_CMD_QUIT:
+			network_destroy(socket);
+			game_end(0);
+			return;
+			
+		// Invalid format
+		default:
+			_message = $"Unknown command: '{_command}'";
+			break;
+	}
+	send_message(_message);
+}
  
 using_remote_server = config_get_param("remote_server"); 
 if (using_remote_server) { 
@@ -3,8 +3,12 @@
 // Get the publisher create in the create event
 var _resultPublisher = http_publisher_get("$$default$$");
 
-// Check if the asyncId of the publisher matches
-if (_resultPublisher.getRequestId() != async_load[? "id"]) return;
+// Requests still in progress report again once they complete (or fail)
+if (async_load[? "status"] == 1) return;
+_resultPublisher.onRequestComplete(async_load[? "id"]);
+
+// Check if the asyncId of the publisher's final publish matches (partial publishes are sent after each suite)
+if (_resultPublisher.getFinalRequestId() != async_load[? "id"]) return;
 
 // Finish the game
 game_end(0);
\ No newline at end of file
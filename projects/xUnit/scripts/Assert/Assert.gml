@@ -46,6 +46,13 @@ function Assert(_configuration = undefined) : PropertyHolder() constructor {
 		return assertionCount;
 	}
 	
+	/// @function setAssertionCount(count)
+	/// @description Sets the assertion number counter (used to switch between concurrent tests).
+	/// @param {Real} count The new assertion count.
+	static setAssertionCount = function(_count) {
+		assertionCount = _count;
+	}
+	
 	/// @function reset()
 	/// @description Resets the current assert_true section including 'assertDepth' and 'userData'.
 	static reset = function() {
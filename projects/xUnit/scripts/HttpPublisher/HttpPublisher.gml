@@ -11,15 +11,40 @@ function HttpPublisher(_configuration = undefined) : IPublisher() constructor {
 	// @ignore
 	port = addProperty("port", 8080, is_numeric);
 	
+	// @ignore
+	compress = addProperty("compress", false, is_bool);
+	
+	/// @function makeRunId()
+	/// @description Builds a run id unique to this launch (the server merges all the posts of a run id).
+	/// The seed is randomised for it (and restored, tests may rely on the default one) and the date is kept to the millisecond.
+	static makeRunId = function() {
+		var _seed = random_get_seed();
+		randomise();
+		var _nonce = irandom(999999);
+		random_set_seed(_seed);
+		return string("{0}_{1}", string_format(date_current_datetime(), 0, 8), _nonce);
+	}
+	
+	// @ignore
+	runId = addProperty("run_id", makeRunId(), is_string);
+	
 	// @ignore
 	requestId = undefined;
 	
-	/// @function publish(data)
+	// @ignore The request of the final publish (the run is over once it completes)
+	finalRequestId = undefined;
+	
+	// @ignore Compressed bodies being sent (by request id), deleted once their request completes
+	pendingBuffers = {};
+	
+	/// @function publish(data, [final])
 	/// @description This function should implement the logic for publishing some data.
+	/// Partial publishes are accumulated by the server under the same run id until the final one.
 	/// @param {Any} data The data being publish
-	static publish = function(_data) {
+	/// @param {Bool} final Whether or not this is the last publish of the run (default: true)
+	static publish = function(_data, _final = true) {
 		
-		var _url = string("http://{0}:{1}/{2}", ip, port, endpoint);
+		var _url = string("http://{0}:{1}/{2}?run_id={3}&final={4}", ip, port, endpoint, runId, _final ? "true" : "false");
 		
 		var _body = {};
 		_body.target_name = os_type_to_string(os_type);
@@ -30,8 +55,37 @@ function HttpPublisher(_configuration = undefined) : IPublisher() constructor {
 		
 		var _headers = ds_map_create();
 		_headers[? "content-type"] = "application/json";
+		
+		var _json = json_stringify(_body);
+		if (!compress) {
+			requestId = http_request(_url, "POST", _headers, _json);
+			if (_final) finalRequestId = requestId;
+			return;
+		}
+		
+		// Compressed body (buffer_compress produces zlib data, which is what 'deflate' stands for in HTTP)
+		var _raw = buffer_create(max(1, string_byte_length(_json)), buffer_fixed, 1);
+		buffer_write(_raw, buffer_text, _json);
+		var _compressed = buffer_compress(_raw, 0, buffer_tell(_raw));
+		buffer_delete(_raw);
+		
+		_headers[? "content-encoding"] = "deflate";
+		requestId = http_request(_url, "POST", _headers, _compressed);
+		if (_final) finalRequestId = requestId;
+		
+		// The request is sent asynchronously, the buffer must live until it completes (see 'onRequestComplete')
+		pendingBuffers[$ string(requestId)] = _compressed;
+	}
 	
-		requestId = http_request(_url, "POST", _headers, json_stringify(_body));
+	/// @function onRequestComplete(requestId)
+	/// @description Releases the resources of a request once it completed (call it from the HTTP async event).
+	/// @param {Real} requestId The id of the completed request.
+	static onRequestComplete = function(_requestId) {
+		var _key = string(_requestId);
+		if (!struct_exists(pendingBuffers, _key)) return;
+		
+		buffer_delete(pendingBuffers[$ _key]);
+		struct_remove(pendingBuffers, _key);
 	}
 	
 	/// @function getRequestId()
@@ -41,6 +95,13 @@ function HttpPublisher(_configuration = undefined) : IPublisher() constructor {
 		return requestId;
 	}
 	
+	/// @function getFinalRequestId()
+	/// @description Returns the request id of the final publish (undefined until it's sent).
+	/// @returns {Real|Undefined}
+	static getFinalRequestId = function() {
+		return finalRequestId;
+	}
+	
 	config(config_get(self));
 	config(_configuration)
 }
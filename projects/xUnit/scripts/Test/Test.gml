@@ -12,6 +12,7 @@ function Test(_name = undefined) : Task() constructor {
 	#macro test_filter platformFilter
 	#macro test_start_hook startHook
 	#macro test_end_hook endHook
+	#macro test_exclusive exclusive
 	
 	enum TestResult { Unset = 0, Passed, Failed, Skipped, Bailed, Expired };
 	
@@ -25,6 +26,8 @@ function Test(_name = undefined) : Task() constructor {
 	timeoutMillis = addProperty("timeoutMillis", 60000, is_real);
 	/// @ignore
 	platformFilter = addProperty("platformFilter", undefined, is_callable);
+	/// @ignore
+	exclusive = addProperty("exclusive", false, is_bool);
 	
 	/// @ignore
 	name = _name;
@@ -73,6 +76,8 @@ function Test(_name = undefined) : Task() constructor {
 	endTimestamp = 0;	
 	/// @ignore
 	resultBag = undefined;
+	/// @ignore
+	assertionCount = 0;
 
 	static run_Task = run;
 	/// @function run(callbackFunc, resultBag)
@@ -11,6 +11,10 @@
 
 global.gCurrentTest = undefined;
 
+// When enabled (negotiated with the remote server) several async tests can be in flight at once.
+// Each handler instance keeps track of its own test, that is made current while its events run.
+global.gTestConcurrent = false;
+
 /// @function test_init()
 /// @description Initializes a test, handles execution context bindings.
 function test_init() {
@@ -34,6 +38,10 @@ function test_init() {
 	
 	applyContext(_test.events, self);
 	
+	// Keep track of the test (concurrent tests are not kept in global scope)
+	__test = _test;
+	_test.assertionCount = 0;
+	
 	// Overwrite the timestamp (tighter timings)
 	_test.startTimestamp = get_timer();
 }
@@ -70,11 +78,45 @@ function test_current() {
 	return global.gCurrentTest;
 }
 
+/// @function test_instance_current()
+/// @description Returns the test handled by the calling instance (the current test if not running concurrently).
+/// @returns {Struct.Test}
+function test_instance_current() {
+	if (!global.gTestConcurrent) return global.gCurrentTest;
+	return variable_instance_exists(id, "__test") ? __test : global.gCurrentTest;
+}
+
+/// @function test_context_enter(test)
+/// @description Makes the given test the current one (used by concurrent tests).
+/// @param {Struct.Test} test The test to be made current.
+/// @ignore
+function test_context_enter(_test) {
+	static assertSingleton = assert_get_singleton();
+	
+	global.gCurrentTest = _test;
+	assertSingleton.setUserData(_test);
+	assertSingleton.setAssertionCount(_test.assertionCount);
+}
+
+/// @function test_context_exit(test, previous)
+/// @description Stores the test assertion count and restores the previous current test (used by concurrent tests).
+/// @param {Struct.Test} test The test that was made current.
+/// @param {Struct.Test} previous The test that was current before.
+/// @ignore
+function test_context_exit(_test, _previous) {
+	static assertSingleton = assert_get_singleton();
+	
+	_test.assertionCount = assertSingleton.getAssertionCount();
+	
+	// If the test was already current (ie.: during creation) keep the state the event left behind
+	if (_previous != _test) global.gCurrentTest = _previous;
+}
+
 /// @function test_run_event()
 /// @description Runs the given event of the current test (doesn't throw)
 function test_run_event(_eventName) {
 	
-	var _test = global.gCurrentTest;
+	var _test = test_instance_current();
 	if (is_undefined(_test)) return;
 	
 	// Execute the method for the given event (if there is one)
@@ -82,6 +124,9 @@ function test_run_event(_eventName) {
 	
 	if (!is_callable(_func)) return;
 	
+	var _previous = global.gCurrentTest;
+	if (global.gTestConcurrent) test_context_enter(_test);
+	
 	if (FRAMEWORK_SHOULD_CATCH) {
 		try {
 			_func();
@@ -93,6 +138,8 @@ function test_run_event(_eventName) {
 	else {
 		_func();
 	}
+	
+	if (global.gTestConcurrent) test_context_exit(_test, _previous);
 }
 
 /// @function test_has_expired()
@@ -114,7 +161,10 @@ function test_end(_forcedResult = TestResult.Unset) {
 
 	// Get timestamp first (tighter timings)
 	var _timestamp = get_timer();
-	var _test = global.gCurrentTest;
+	var _test = test_instance_current();
+	
+	// Concurrent tests can end outside of their own events (ie.: timeout)
+	if (global.gTestConcurrent && global.gCurrentTest != _test) test_context_enter(_test);
 	
 	_test.result = _forcedResult;
 	_test.endTimestamp = _timestamp;
@@ -125,6 +175,7 @@ function test_end(_forcedResult = TestResult.Unset) {
 	
 	_test.postRunFunc();
 	
-	room_goto(rmEmpty);
+	// Concurrent tests would lose their (non persistent) handlers, only exclusive ones reset the room
+	if (!global.gTestConcurrent || _test.exclusive) room_goto(rmEmpty);
 }
 
@@ -40,6 +40,9 @@ function TestAsync(_name, _object, _events = undefined, _options = undefined) :
 			timeoutHandle = call_later(timeoutMillis / 1000, time_source_units_seconds, method(_handler, function() {
 				test_end(TestResult.Expired);
 			}), false);
+			
+			// Concurrent tests release the global scope (the handler keeps track of its test)
+			if (global.gTestConcurrent) global.gCurrentTest = undefined;
 		}
 	};
 	/// @ignore
@@ -64,6 +67,13 @@ function TestAsync(_name, _object, _events = undefined, _options = undefined) :
 		
 	};
 
+	// Async tests run alongside each other when multiplexing (their handlers only react to their own
+	// request/socket ids). Handlers relying on shared state are exclusive by default: drawing (the
+	// application surface), room changes (would destroy the other handlers) and audio (the playback
+	// events aren't tied to a test). The 'test_exclusive' option overrides this per test.
+	static exclusiveHandlers = [ objTestAsyncDraw, objTestAsyncRoomChange, objTestAsyncAudioPlayback, objTestAsyncAudioPlaybackEnded, objTestAsyncAudioRecording ];
+	exclusive = array_contains(exclusiveHandlers, _object);
+
 	config(_options);
 
 }
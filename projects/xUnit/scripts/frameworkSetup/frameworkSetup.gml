@@ -51,7 +51,8 @@ config_set("Test", {
 		static assertSingleton = assert_get_singleton();
 		static usingRemoteServer = objRunner.using_remote_server;
 		
-		var _category = resultToCategory[_test.result];
+		var _result = _test.result; // Cache it ('doReset' below resets the test)
+		var _category = resultToCategory[_result];
 		var _resultData = _test.getResultData();
 		
 		_resultData.assertions = assertSingleton.getAssertionCount();
@@ -77,9 +78,7 @@ config_set("Test", {
 				var _path_parts = string_split(_resultBag.path, "@", 1);
 				_data.suite = _path_parts[0];
 				
-				buffer_seek(network_buffer, buffer_seek_start, 0); 
-				buffer_write(network_buffer, buffer_string, json_stringify(_data)); 
-				network_send_raw(socket, network_buffer, buffer_tell(network_buffer)); 
+				send_result(_data, _result, _resultBag[$ "request_id"]); 
 			}
 		}
 		// This is the data to publish to the http server
@@ -116,6 +115,19 @@ config_set("TestSuite", {
 		// Do any extra required logging and logic here (_testSuite is an instance of TestSuite)
 		log_info("Test suite '{0}' ended", _testSuite.getName());
 		struct_remove(_resultBag, "suite");
+
+		#region [WARNING] Changing this block might break the way the framwork runs from command line!
+		
+		// Publish the suite results as a partial (the server accumulates them by run id)
+		if (!objRunner.using_remote_server && array_length(_resultBag.results_to_publish) > 0) {
+			http_publisher_get("$$default$$").publish({
+				results: _resultBag.results_to_publish,
+				run_name: config_get_param("run_name")
+			}, false);
+			_resultBag.results_to_publish = [];
+		}
+		
+		#endregion
 	}
 
 });
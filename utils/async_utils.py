@@ -1,12 +1,20 @@
 import asyncio
 import sys
+import time
 import psutil
 import signal
+import subprocess
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
 
 from utils.logging_utils import LOGGER
+from utils.metrics_utils import REGISTRY
+from utils.trace_utils import TRACER, describe_command
 
 import asyncio
 
+RUNNER_RESTARTS = REGISTRY.counter('gmtf_runner_restarts_total', 'Times the runner executable was restarted', ('reason',))
+
 def kill_process_tree(pid: int, sig=signal.SIGTERM):
     """
     Kills a process and all its subprocesses.
@@ -31,7 +39,7 @@ def kill_process_tree(pid: int, sig=signal.SIGTERM):
     except psutil.NoSuchProcess:
         pass  # The parent process is already terminated
 
-async def run_exe(exe_path, args) -> asyncio.subprocess.Process:
+async def run_exe(exe_path, args, cwd: Optional[Path] = None) -> asyncio.subprocess.Process:
 
     LOGGER.info(f'Running {exe_path} with arguments {args}')
 
@@ -39,16 +47,43 @@ async def run_exe(exe_path, args) -> asyncio.subprocess.Process:
         exe_path,
         *args,
         stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT
+        stderr=asyncio.subprocess.STDOUT,
+        cwd=cwd
     )
     return process
 
-async def run_and_monitor_exe(exe_path: str, args: list[str], stop_event: asyncio.Event, reboot_event: asyncio.Event, restart_delay: float = 0.5):
+def terminate_process(process: asyncio.subprocess.Process):
+    # The process can exit on its own right before being terminated
+    if process.returncode is None:
+        try:
+            process.terminate()
+        except ProcessLookupError:
+            pass
+
+async def run_and_monitor_exe(exe_path: str, args: list[str], stop_event: asyncio.Event, reboot_event: asyncio.Event, restart_delay: float = 0.5, cwd: Optional[Path] = None, max_restart_delay: float = 30, progress_event: Optional[asyncio.Event] = None, crash_loop_limit: int = 0, on_crash_loop: Optional[Callable[[], Awaitable[None]]] = None, on_start: Optional[Callable[[], None]] = None, on_exit: Optional[Callable[[], None]] = None):
+    """
+    Runs the executable until 'stop_event' is set, restarting it when it exits (or when 'reboot_event' is set).
+
+    Args:
+        restart_delay (float): The wait before a restart (in seconds).
+        max_restart_delay (float): The longest wait before a restart, the wait doubles every time the executable exits without progress.
+        progress_event (asyncio.Event): Set by the caller when the executable makes progress (ie.: runs a test), an executable
+            exiting without progress (ie.: crashing on boot) is restarted with a growing delay.
+        crash_loop_limit (int): Gives up after this many exits without progress in a row, 'on_crash_loop' is then awaited (0: never).
+        on_start, on_exit (Callable): Called every time the executable is started and every time it exited.
+    """
+    failed_starts = 0
     while not stop_event.is_set():
         LOGGER.info(f"Starting executable: {exe_path} with arguments: {args}")
+        reason = 'exited'
+        started_at = time.perf_counter()
+        if progress_event is not None:
+            progress_event.clear()
 
         # Start the subprocess
-        process = await run_exe(exe_path, args)
+        process = await run_exe(exe_path, args, cwd)
+        if on_start is not None:
+            on_start()
 
         # Capture the output and monitor the process
         try:
@@ -58,14 +93,14 @@ async def run_and_monitor_exe(exe_path: str, args: list[str], stop_event: asynci
             while True:
                 if stop_event.is_set():
                     LOGGER.info("Stop event detected. Terminating the process.")
-                    process.terminate()
+                    terminate_process(process)
                     await process.wait()
                     break
 
                 if reboot_event.is_set():
                     LOGGER.info("Reboot event detected. Terminating the process.")
                     kill_process_tree(process.pid)
-                    process.terminate()  # Terminate the process first
+                    terminate_process(process)  # Terminate the process first
                     await process.wait()
 
                     LOGGER.info("Canceling capture task due to reboot.")
@@ -75,22 +110,59 @@ async def run_and_monitor_exe(exe_path: str, args: list[str], stop_event: asynci
                     await asyncio.gather(capture_task, return_exceptions=True)
 
                     reboot_event.clear()
+                    reason = 'reboot'
+                    break
+
+                # The executable exited on its own (ie.: crashed), restart it
+                if process.returncode is not None:
+                    LOGGER.info("Executable exited unexpectedly.")
+                    await asyncio.gather(capture_task, return_exceptions=True)
                     break
 
                 await asyncio.sleep(0.1)  # Sleep briefly to prevent busy-waiting
 
             LOGGER.info(f"Executable {exe_path} exited with return code {process.returncode}")
+            if on_exit is not None:
+                on_exit()
+            TRACER.complete(describe_command(exe_path, args), started_at, track='runner', category='process', returncode=process.returncode, reason=reason)
 
-        except Exception as e:
-            LOGGER.error(f"An error occurred: {str(e)}")
+        except asyncio.CancelledError:
+            # Don't leave the executable running when the monitoring is cancelled
+            kill_process_tree(process.pid)
+            raise
 
-        await asyncio.sleep(restart_delay)
+        except Exception as e:
+            LOGGER.error(f"An error occurred: {e!r}")
 
         if stop_event.is_set():
             LOGGER.info("Stop event set, terminating the monitoring loop.")
             break
 
-        LOGGER.info("Restarting the executable...")
+        # Restarting an executable that can't stay up (ie.: crashing on boot) backs off, then gives up
+        delay = restart_delay
+        if progress_event is not None and not progress_event.is_set():
+            failed_starts += 1
+            if crash_loop_limit and failed_starts >= crash_loop_limit:
+                LOGGER.error(f"Executable exited {failed_starts} times in a row without making progress, giving up on it.")
+                TRACER.instant('runner crash loop', track='runner', category='process', exits=failed_starts)
+                if on_crash_loop is not None:
+                    await on_crash_loop()
+                break
+            delay = min(restart_delay * 2 ** (failed_starts - 1), max(restart_delay, max_restart_delay))
+        else:
+            failed_starts = 0
+
+        # Wait for the restart (unless stopped meanwhile)
+        try:
+            await asyncio.wait_for(stop_event.wait(), delay)
+            LOGGER.info("Stop event set, terminating the monitoring loop.")
+            break
+        except asyncio.TimeoutError:
+            pass
+
+        LOGGER.info(f"Restarting the executable{f' (exited {failed_starts} time(s) in a row without progress, waited {delay:.1f}s)' if failed_starts else ''}...")
+        RUNNER_RESTARTS.inc(labels=(reason,))
+        TRACER.instant('runner restart', track='runner', category='process', reason=reason)
 
     LOGGER.info("Monitoring loop terminated.")
 
@@ -158,22 +230,38 @@ async def wait_for_space_key(stop_event: asyncio.Event = None):
     else:
         await check_keypress_unix()
 
-async def run_and_capture(exe_path: str, args: list[str]):
+async def run_and_capture(exe_path: str, args: list[str], cwd: Optional[Path] = None):
+    """
+    Runs an executable until it exits and returns its output.
+
+    Raises:
+        subprocess.CalledProcessError: If the executable exits with a non-zero return code.
+    """
     # Create a stop event for capturing output
     stop_event = asyncio.Event()
 
-    # Start the subprocess
-    process = await run_exe(exe_path, args)
+    with TRACER.span(describe_command(exe_path, args), track='processes', category='process'):
+        # Start the subprocess
+        process = await run_exe(exe_path, args, cwd)
 
-    # Capture the output
-    stdout_output = await capture_output(process, stop_event)
+        try:
+            # Capture the output
+            stdout_output = await capture_output(process, stop_event)
 
-    # Wait for the subprocess to exit
-    await process.wait()
+            # Wait for the subprocess to exit
+            await process.wait()
+        except asyncio.CancelledError:
+            # Don't leave the process running (ie.: a build interrupted by a newer change, see 'watch')
+            kill_process_tree(process.pid)
+            raise
 
     # Ensure the stop event is set to clean up the capture task
     stop_event.set()
 
+    if process.returncode != 0:
+        LOGGER.error(f'Process failed with return code {process.returncode}')
+        raise subprocess.CalledProcessError(process.returncode, [exe_path, *args], output=stdout_output)
+
     LOGGER.info(f'Process completed')
     return stdout_output
 
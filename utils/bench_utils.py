@@ -0,0 +1,108 @@
+import random
+import time
+from typing import Callable
+
+SUITE_NAMES = ['BasicArrayTestSuite', 'BasicBufferTestSuite', 'BasicJsonTestSuite', 'BasicNetworkTestSuite', 'ResourceAudioEmittersTestSuite']
+
+def generate_result_records(count: int, failure_rate: float = 0.1, seed: int = 0) -> list[dict]:
+    """
+    Generates result records shaped like the ones sent by the runner (see 'frameworkSetup.gml').
+    Failed tests carry assertion errors with stack information, like real failures do.
+
+    Args:
+        count (int): The number of records to generate.
+        failure_rate (float): The ratio of failed tests.
+        seed (int): Seed used for the random generator (results are deterministic).
+
+    Returns:
+        list[dict]: The list of { 'details', 'suite', 'timestamp' } records.
+    """
+    rng = random.Random(seed)
+    timestamp = 1700000000
+    records = []
+
+    for index in range(count):
+        suite = SUITE_NAMES[index * len(SUITE_NAMES) // max(count, 1)]
+        failed = rng.random() < failure_rate
+
+        errors = [
+            {
+                'title': 'assert_equals',
+                'description': f'#{n} The value should be equal to the expected value',
+                'actual': str(rng.randint(0, 1000)),
+                'expected': str(rng.randint(0, 1000)),
+                'stack': f'gml_Script_anon@{rng.randint(100, 9999)}@{suite} (line {rng.randint(1, 2000)})',
+            } for n in range(rng.randint(1, 5))
+        ] if failed else []
+
+        records.append({
+            'details': {
+                'name': f'{suite.lower()}_test_{index}',
+                'result': 'failed' if failed else 'passed',
+                'duration': rng.randint(10, 50000),
+                'assertions': rng.randint(1, 40),
+                'errors': errors,
+                'exceptions': [],
+            },
+            'suite': suite,
+            'timestamp': timestamp + index,
+        })
+
+    return records
+
+def measure(func: Callable, repeat: int = 5) -> float:
+    """
+    Runs a function multiple times and returns the best wall time (in seconds).
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def percentile(values: list[float], ratio: float) -> float:
+    """
+    Returns the given percentile (0 to 1) of a list of values, using linear interpolation.
+    """
+    if not values:
+        return 0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * ratio
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(values: list[float]) -> dict:
+    """
+    Summarizes a list of timings (in seconds) as milliseconds.
+    """
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else 0,
+        'p50_ms': round(percentile(values, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        'max_ms': round(max(values) * 1000, 3) if values else 0,
+    }
+
+def parse_import_times(output: str) -> tuple[float, dict[str, float]]:
+    """
+    Parses the output of 'python -X importtime'.
+
+    Returns:
+        tuple[float, dict[str, float]]: The total import time and the cumulative time of each top level import (in seconds).
+    """
+    total = 0
+    top_level = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        total += int(self_us)
+        # Nested imports are indented by two spaces per level
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative_us) / 1_000_000
+
+    return total / 1_000_000, top_level
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import psutil
+
+from utils.logging_utils import LOGGER
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Default location of the caches shared between launcher invocations (runtimes, compile caches, ...)
+CACHE_ROOT = Path(os.environ.get('GMTF_CACHE_DIR', Path.home() / '.gmtf' / 'cache'))
+
+GIGABYTE = 1024 * 1024 * 1024
+
+class FileLock:
+    """
+    An exclusive lock between processes, held on a lock file (released by the OS if the process dies).
+    Use it as a context manager, 'with' blocks the thread and 'async with' polls from the event loop.
+    """
+
+    def __init__(self, path: Path, timeout: float = 3600, poll_interval: float = 0.25):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.file = None
+
+    def _try_acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file = open(self.path, 'a+b')
+        try:
+            if os.name == 'nt':
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+
+        self.file = file
+        return True
+
+    def release(self):
+        if self.file is None:
+            return
+
+        try:
+            if os.name == 'nt':
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def _timed_out(self, start: float) -> bool:
+        if time.monotonic() - start < self.timeout:
+            return False
+        raise TimeoutError(f"Timed out after {self.timeout}s waiting for the lock '{self.path}'")
+
+    def __enter__(self):
+        start = time.monotonic()
+        while not self._try_acquire():
+            self._timed_out(start)
+            time.sleep(self.poll_interval)
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    async def __aenter__(self):
+        start = time.monotonic()
+        if not self._try_acquire():
+            LOGGER.info(f"Waiting for the lock '{self.path}' (used by another launcher)")
+        while self.file is None and not self._try_acquire():
+            self._timed_out(start)
+            await asyncio.sleep(self.poll_interval)
+        return self
+
+    async def __aexit__(self, *args):
+        self.release()
+
+def get_size(path: Path) -> int:
+    """
+    Returns the size of a file or the total size of the files in a folder (in bytes).
+    """
+    if path.is_file():
+        return path.stat().st_size
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def fingerprint_folder(folder: Path, ignored: frozenset[str] = frozenset(), extra: tuple[str, ...] = ()) -> str:
+    """
+    Returns a fingerprint of the contents of a folder (paths and bytes of its files), ie.: to find out whether
+    a build of it can be reused. Hidden files and folders and the 'ignored' paths (relative, in posix form)
+    are skipped, 'extra' values (ie.: build options) are part of the fingerprint.
+    """
+    digest = hashlib.sha1()
+    for value in extra:
+        digest.update(value.encode() + b'\0')
+
+    for root, folders, files in os.walk(folder):
+        folders[:] = sorted(name for name in folders if not name.startswith('.'))
+        for name in sorted(files):
+            path = Path(root) / name
+            key = path.relative_to(folder).as_posix()
+            if name.startswith('.') or key in ignored:
+                continue
+
+            digest.update(key.encode() + b'\0')
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+class LruStore:
+    """
+    A folder of entries (one sub folder per key) shared between launcher invocations. Each entry has
+    a metadata file (its size and when it was last used) and the least recently used entries are
+    removed once the store is bigger than its budget. Entries leased by a running launcher are never
+    removed, changes to the metadata happen under the store lock.
+    """
+
+    METADATA_FILE = 'entry.json'
+
+    def __init__(self, root: Path, budget_bytes: int):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def get_folder_name(key: str) -> str:
+        return re.sub(r'[^\w.-]', '_', key)
+
+    def lock(self) -> FileLock:
+        """Returns the lock of the whole store (metadata and eviction)."""
+        return FileLock(self.root / '.lock')
+
+    def entry_lock(self, key: str) -> FileLock:
+        """Returns the lock of an entry (held while its contents are written)."""
+        return FileLock(self.root / '.locks' / f'{self.get_folder_name(key)}.lock')
+
+    def get_path(self, key: str) -> Path:
+        return self.root / self.get_folder_name(key)
+
+    def _metadata_path(self, key: str) -> Path:
+        return self.get_path(key) / self.METADATA_FILE
+
+    def get_metadata(self, key: str) -> Optional[dict[str, Any]]:
+        path = self._metadata_path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def set_metadata(self, key: str, **data):
+        """
+        Updates the entry metadata (merged with the existing one), also setting its size and last use.
+        """
+        metadata = { **(self.get_metadata(key) or {}), **data, 'key': key, 'last_used': time.time() }
+        metadata['size'] = get_size(self.get_path(key))
+
+        path = self._metadata_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(metadata, indent=4), encoding='utf-8')
+
+    def touch(self, key: str):
+        metadata = self.get_metadata(key)
+        if metadata is None:
+            return
+
+        metadata['last_used'] = time.time()
+        self._metadata_path(key).write_text(json.dumps(metadata, indent=4), encoding='utf-8')
+
+    def _lease_path(self, key: str) -> Path:
+        return self.root / '.leases' / self.get_folder_name(key) / str(os.getpid())
+
+    def is_leased(self, key: str) -> bool:
+        """Returns whether a running process is using the entry (leases of dead processes are removed)."""
+        folder = self._lease_path(key).parent
+        if not folder.exists():
+            return False
+
+        leased = False
+        for lease in folder.iterdir():
+            if lease.name.isdigit() and psutil.pid_exists(int(lease.name)):
+                leased = True
+            else:
+                lease.unlink(missing_ok=True)
+        return leased
+
+    def lease(self, key: str):
+        """Marks the entry as used by this process (it won't be evicted until 'release')."""
+        path = self._lease_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    def release(self, key: str):
+        self._lease_path(key).unlink(missing_ok=True)
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Returns the metadata of all entries, least recently used first."""
+        entries = []
+        for folder in self.root.iterdir():
+            metadata_path = folder / self.METADATA_FILE
+            if folder.name.startswith('.') or not metadata_path.exists():
+                continue
+            try:
+                entries.append(json.loads(metadata_path.read_text(encoding='utf-8')))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return sorted(entries, key=lambda entry: entry.get('last_used', 0))
+
+    def evict(self, keep: tuple[str, ...] = ()) -> list[str]:
+        """
+        Removes least recently used entries until the store fits its budget (call it with the store lock held).
+        Leased entries and the 'keep' ones are skipped.
+
+        Returns:
+            list[str]: The keys of the removed entries.
+        """
+        entries = self.entries()
+        total = sum(entry.get('size', 0) for entry in entries)
+
+        evicted = []
+        for entry in entries:
+            if total <= self.budget_bytes:
+                break
+
+            key = entry['key']
+            if key in keep or self.is_leased(key):
+                continue
+
+            LOGGER.info(f"Evicting '{key}' from {self.root} ({entry.get('size', 0) / GIGABYTE:.2f} GB, budget {self.budget_bytes / GIGABYTE:.2f} GB)")
+            shutil.rmtree(self.get_path(key), ignore_errors=True)
+            total -= entry.get('size', 0)
+            evicted.append(key)
+
+        return evicted
+
+class TtlCache:
+    """
+    A small JSON file of values that expire after 'ttl' seconds (ie.: feed lookups), shared between processes.
+    A 'ttl' of 0 disables the cache.
+    """
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, key: str) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+
+        entry = self._load().get(key)
+        if entry is None or time.time() - entry['time'] > self.ttl:
+            return None
+        return entry['value']
+
+    def set(self, key: str, value: Any):
+        if self.ttl <= 0:
+            return
+
+        with FileLock(self.path.with_suffix('.lock'), timeout=30):
+            now = time.time()
+            data = { name: entry for name, entry in self._load().items() if now - entry['time'] <= self.ttl }
+            data[key] = { 'value': value, 'time': now }
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(data, indent=4), encoding='utf-8')
+            os.replace(temp_path, self.path)
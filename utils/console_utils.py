@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from pathlib import Path
+from typing import Optional
+
+from utils.cache_utils import CACHE_ROOT
+from utils.logging_utils import LOGGER
+
+try:
+    import readline  # Line editing and up/down history (not available on every platform)
+except ImportError:
+    readline = None
+
+# Commands typed in previous sessions (one per line, most recent last)
+HISTORY_FILE = CACHE_ROOT / 'console_history'
+HISTORY_LENGTH = 500
+
+# Separates the commands of a pipelined line (ie.: 'TESTS; RUN BasicArrayTestSuite@*')
+COMMAND_SEPARATOR = ';'
+
+def split_commands(line: str) -> list[str]:
+    """
+    Returns the commands of a console line (empty ones are dropped).
+    """
+    return [command.strip() for command in line.split(COMMAND_SEPARATOR) if command.strip()]
+
+class AsyncConsole:
+    """
+    Reads the operator's commands without blocking the event loop: the terminal is read from a thread
+    and every line is handed to the loop through a queue, so the servers (and the runner connections)
+    keep going while the prompt waits. Lines typed while a command is running are queued.
+
+    The history is kept between sessions (see 'HISTORY_FILE'), '!<n>' runs its n-th entry again.
+    """
+
+    def __init__(self, prompt: str = 'Enter command and args: ', history_path: Optional[Path] = HISTORY_FILE):
+        self.prompt = prompt
+        self.history_path = history_path
+        self.history: list[str] = []
+        self.lines: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self.thread: Optional[threading.Thread] = None
+
+    def load_history(self):
+        if self.history_path is None or not self.history_path.exists():
+            return
+        try:
+            self.history = self.history_path.read_text(encoding='utf-8').splitlines()[-HISTORY_LENGTH:]
+        except OSError as e:
+            LOGGER.warning(f"Couldn't read the console history: {e}")
+            return
+
+        if readline is not None:
+            for line in self.history:
+                readline.add_history(line)
+
+    def save_history(self):
+        if self.history_path is None:
+            return
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            self.history_path.write_text(''.join(f'{line}\n' for line in self.history[-HISTORY_LENGTH:]), encoding='utf-8')
+        except OSError as e:
+            LOGGER.warning(f"Couldn't save the console history: {e}")
+
+    def expand(self, line: str) -> str:
+        """
+        Replaces a '!<n>' line with the n-th entry of the history and records the line.
+        """
+        line = line.strip()
+        if line.startswith('!') and line[1:].isdigit():
+            index = int(line[1:]) - 1
+            if not 0 <= index < len(self.history):
+                print(f"No command {line[1:]} in the history")
+                return ''
+            recalled = self.history[index]
+            print(recalled)
+
+            # readline recorded the '!<n>' line itself (only when reading from a terminal)
+            length = readline.get_current_history_length() if readline is not None else 0
+            if length and readline.get_history_item(length) == line:
+                readline.replace_history_item(length - 1, recalled)
+            line = recalled
+
+        if line and (not self.history or self.history[-1] != line):
+            self.history.append(line)
+        return line
+
+    def _read_lines(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            try:
+                line = self.expand(input(self.prompt))
+            except (EOFError, OSError):
+                line = None  # The terminal was closed (ie.: Ctrl+D)
+
+            loop.call_soon_threadsafe(self.lines.put_nowait, line)
+            if line is None:
+                return
+
+    def start(self):
+        """
+        Starts reading the terminal (once, later calls are ignored).
+        """
+        if self.thread is not None:
+            return
+
+        self.load_history()
+
+        # A daemon thread, a prompt left waiting doesn't keep the launcher alive
+        self.thread = threading.Thread(target=self._read_lines, args=(asyncio.get_running_loop(),), name='console', daemon=True)
+        self.thread.start()
+
+    async def read_line(self) -> Optional[str]:
+        """
+        Returns the next line typed by the operator, None once the terminal is closed.
+        """
+        self.start()
+        line = await self.lines.get()
+        if line is None:
+            # Any later read is told the terminal is closed as well
+            self.lines.put_nowait(None)
+        return line
+
+    def has_line(self) -> bool:
+        return not self.lines.empty()
+
+    def close(self):
+        self.save_history()
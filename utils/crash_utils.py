@@ -0,0 +1,107 @@
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils.cache_utils import CACHE_ROOT, FileLock
+from utils.logging_utils import LOGGER
+
+# Default location of the crash histories (one JSON file per target)
+CRASH_HISTORY_DIR = CACHE_ROOT / 'crashes'
+
+# A test that didn't crash the runner for this long is trusted again (in seconds)
+CRASH_MAX_AGE = 30 * 24 * 3600
+
+# Default restart back off of a runner exiting before it runs a test (see 'async_utils.run_and_monitor_exe')
+DEFAULT_MAX_RESTART_DELAY = 30
+DEFAULT_CRASH_LOOP_LIMIT = 5
+
+class CrashHistory:
+    """
+    The tests that crashed (or hung) the runner of a target in previous runs. They're run last (and alone,
+    see 'RemoteControlServer._is_concurrent') so a test that reliably kills the runner costs a single
+    restart at the end of the run instead of interrupting it. A test is forgotten once it completes.
+
+    The history is shared between processes, changes are merged into the file when saved.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.crashes: dict[str, dict] = self._load()
+
+        # Changes of this run (applied to the file as it is when saving)
+        self.crashed: dict[str, int] = {}
+        self.cleared: set[str] = set()
+
+    @classmethod
+    def for_target(cls, folder: Path, target: str) -> 'CrashHistory':
+        return cls(folder / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', target)}.json")
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        now = time.time()
+        return { test: entry for test, entry in data.items() if now - entry.get('time', 0) <= CRASH_MAX_AGE }
+
+    def is_suspect(self, test: str) -> bool:
+        return test in self.crashes
+
+    def order(self, tests: list[str]) -> list[str]:
+        """
+        Moves the tests that crashed the runner before to the end (keeping the order of both groups).
+        """
+        suspects = [test for test in tests if test in self.crashes]
+        if not suspects:
+            return tests
+
+        LOGGER.info(f"Running {len(suspects)} test(s) that crashed the runner in previous runs last: {', '.join(suspects[:5])}{', ...' if len(suspects) > 5 else ''}")
+        return [test for test in tests if test not in self.crashes] + suspects
+
+    def record_crash(self, test: str):
+        entry = self.crashes.setdefault(test, { 'count': 0 })
+        entry['count'] += 1
+        entry['time'] = time.time()
+        self.crashed[test] = self.crashed.get(test, 0) + 1
+        self.cleared.discard(test)
+
+    def record_pass(self, test: str):
+        if test in self.crashes and test not in self.crashed:
+            LOGGER.info(f"Test '{test}' completed, it's no longer expected to crash the runner")
+            del self.crashes[test]
+            self.cleared.add(test)
+
+    def save(self):
+        if not self.crashed and not self.cleared:
+            return
+
+        with FileLock(self.path.with_suffix('.lock'), timeout=30):
+            data = self._load()
+            now = time.time()
+            for test, count in self.crashed.items():
+                entry = data.setdefault(test, { 'count': 0 })
+                entry['count'] += count
+                entry['time'] = now
+            for test in self.cleared:
+                data.pop(test, None)
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(data, indent=4), encoding='utf-8')
+            os.replace(temp_path, self.path)
+
+        self.crashed.clear()
+        self.cleared.clear()
+        LOGGER.debug(f"Saved the crash history: {self.path}")
+
+def get_server_options(history_folder: Optional[str], target: str, max_restart_delay: float = DEFAULT_MAX_RESTART_DELAY, crash_loop_limit: int = DEFAULT_CRASH_LOOP_LIMIT) -> dict:
+    """
+    Builds the crash handling options of the remote control server from the command line options
+    (a 'history_folder' of 'none' disables the crash history).
+    """
+    crash_history = CrashHistory.for_target(Path(history_folder), target) if history_folder and history_folder.lower() != 'none' else None
+    return { 'crash_history': crash_history, 'max_restart_delay': max_restart_delay, 'crash_loop_limit': crash_loop_limit }
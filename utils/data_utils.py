@@ -1,3 +1,4 @@
+import argparse
 import json
 from utils.logging_utils import LOGGER
 
@@ -31,4 +32,17 @@ def json_parse(json_str):
         return json.loads(json_str)
     except (json.JSONDecodeError, TypeError) as e:
         LOGGER.error(f'Error while parsing JSON string: {e}')
-        return None
\ No newline at end of file
+        return None
+
+def validate_bool(value) -> bool:
+    """
+    Argument type for boolean options, they take a value (ie.: '--debug-endpoints true') so they
+    can also be set from a config file.
+    """
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ['1', 'true', 'yes', 'on']:
+        return True
+    if str(value).lower() in ['0', 'false', 'no', 'off']:
+        return False
+    raise argparse.ArgumentTypeError(f"Invalid boolean value '{value}' (use true or false)")
@@ -0,0 +1,125 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+# Orders accepted by the profiler report (see pstats.SortKey)
+PROFILE_SORT_KEYS = ['cumulative', 'tottime', 'calls', 'ncalls', 'time']
+
+class Profiler:
+    """
+    A cProfile session that can be started and stopped while the launcher runs. Only the thread that
+    started it is profiled, which is the event loop thread (the servers, the result ingestion and the
+    output capture), work handed to executor threads is not included.
+    """
+
+    def __init__(self):
+        self.profile: Optional[cProfile.Profile] = None
+
+    @property
+    def running(self) -> bool:
+        return self.profile is not None
+
+    def start(self) -> bool:
+        """
+        Starts profiling, returns False if a session is already running.
+        """
+        if self.profile is not None:
+            return False
+
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return True
+
+    def stop(self, limit: int = 30, sort: str = 'cumulative') -> Optional[str]:
+        """
+        Stops profiling and returns the 'limit' top entries (ordered by 'sort') as text,
+        or None if no session was running.
+        """
+        if self.profile is None:
+            return None
+
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+class MemoryTracker:
+    """
+    Wraps tracemalloc to report where the memory grew between two calls. Each report is the
+    difference against the previous snapshot (or the one taken when tracking started).
+    """
+
+    def __init__(self):
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def running(self) -> bool:
+        return self.snapshot is not None
+
+    def start(self, frames: int = 1) -> bool:
+        """
+        Starts tracing allocations (keeping 'frames' frames per allocation), returns False if already tracing.
+        """
+        if self.snapshot is not None:
+            return False
+
+        tracemalloc.start(frames)
+        self.snapshot = self._take_snapshot()
+        return True
+
+    def stop(self):
+        if self.snapshot is None:
+            return
+
+        tracemalloc.stop()
+        self.snapshot = None
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        # Allocations done by tracemalloc itself are noise
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+
+    def diff(self, limit: int = 20, key_type: str = 'lineno') -> Optional[dict]:
+        """
+        Returns the 'limit' biggest allocation changes since the previous call (grouped by 'key_type':
+        'lineno', 'filename' or 'traceback'), or None if allocations are not being traced.
+        """
+        if self.snapshot is None:
+            return None
+
+        snapshot = self._take_snapshot()
+        stats = snapshot.compare_to(self.snapshot, key_type)
+        self.snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'traced_bytes': current,
+            'peak_bytes': peak,
+            'top': [{
+                'location': str(stat.traceback) if key_type != 'traceback' else stat.traceback.format(),
+                'size_bytes': stat.size,
+                'size_diff_bytes': stat.size_diff,
+                'count': stat.count,
+                'count_diff': stat.count_diff,
+            } for stat in stats[:limit]],
+        }
+
+def get_task_counts() -> dict:
+    """
+    Returns the number of asyncio tasks of the running loop, in total and by coroutine name.
+    """
+    tasks = asyncio.all_tasks()
+    names = Counter(getattr(task.get_coro(), '__qualname__', task.get_name()) for task in tasks)
+    return {
+        'total': len(tasks),
+        'by_coroutine': dict(names.most_common()),
+    }
@@ -0,0 +1,197 @@
+import json
+import re
+from typing import Iterator, Optional
+
+# Character used to replace the contents of comments and strings in masked sources
+MASK_CHAR = ' '
+
+STRING_ESCAPES = { 'n': '\n', 'r': '\r', 't': '\t', 'b': '\b', 'f': '\f', 'v': '\v', 'a': '\a', '0': '\0', '\\': '\\', '"': '"', "'": "'" }
+
+def mask_source(source: str) -> str:
+    """
+    Replaces the contents of comments and string literals with blanks, so the result can be
+    searched for code (calls, brackets, commas) without being fooled by commented out code or
+    text inside strings. The string quotes are kept and the result has the same length (offsets
+    in the masked source are valid in the original one).
+
+    Args:
+        source (str): The GML source code.
+
+    Returns:
+        str: The masked source code.
+    """
+    masked = list(source)
+    length = len(source)
+    index = 0
+
+    def blank(start: int, end: int):
+        for i in range(start, end):
+            if masked[i] not in '\r\n':
+                masked[i] = MASK_CHAR
+
+    while index < length:
+        char = source[index]
+        pair = source[index:index + 2]
+
+        # Line comment
+        if pair == '//':
+            end = source.find('\n', index)
+            end = length if end == -1 else end
+            blank(index, end)
+            index = end
+
+        # Block comment
+        elif pair == '/*':
+            end = source.find('*/', index + 2)
+            end = length if end == -1 else end + 2
+            blank(index, end)
+            index = end
+
+        # Verbatim string (no escapes, can span multiple lines)
+        elif pair in ['@"', "@'"]:
+            end = source.find(pair[1], index + 2)
+            end = length if end == -1 else end + 1
+            blank(index + 2, end - 1)
+            index = end
+
+        # Regular and template strings
+        elif char == '"' or pair == '$"':
+            start = index + (2 if char == '$' else 1)
+            end = start
+            while end < length and source[end] != '"' and source[end] != '\n':
+                end += 2 if source[end] == '\\' else 1
+            blank(start, min(end, length))
+            index = end + 1
+
+        else:
+            index += 1
+
+    return ''.join(masked)
+
+def find_closing(masked: str, start: int) -> int:
+    """
+    Finds the bracket closing the one at the given offset of a masked source.
+
+    Returns:
+        int: The offset of the closing bracket or -1 if it's not closed.
+    """
+    depth = 0
+    for index in range(start, len(masked)):
+        char = masked[index]
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+def split_arguments(masked: str, start: int, end: int) -> list[tuple[int, int]]:
+    """
+    Splits the text between two offsets of a masked source by the top level commas.
+
+    Returns:
+        list[tuple[int, int]]: The (start, end) offsets of each (stripped) argument.
+    """
+    spans = []
+    depth = 0
+    arg_start = start
+
+    for index in range(start, end + 1):
+        char = masked[index] if index < end else ','
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            text = masked[arg_start:index]
+            left = len(text) - len(text.lstrip())
+            right = len(text.rstrip())
+            if right > left:
+                spans.append((arg_start + left, arg_start + right))
+            arg_start = index + 1
+
+    return spans
+
+def find_calls(masked: str, names: list[str], start: int = 0, end: Optional[int] = None) -> Iterator[tuple[str, int, list[tuple[int, int]]]]:
+    """
+    Finds the calls to the given functions in a masked source.
+
+    Yields:
+        tuple[str, int, list[tuple[int, int]]]: The function name, the offset of the call and the argument spans.
+    """
+    pattern = re.compile(rf"(?<![\w.])({'|'.join(re.escape(name) for name in names)})\s*\(")
+    end = len(masked) if end is None else end
+
+    for match in pattern.finditer(masked, start, end):
+        open_index = match.end() - 1
+        close_index = find_closing(masked, open_index)
+        if close_index == -1:
+            continue
+        yield match.group(1), match.start(), split_arguments(masked, open_index + 1, close_index)
+
+def parse_string_literal(text: str) -> Optional[str]:
+    """
+    Parses a GML string literal (regular or verbatim).
+
+    Returns:
+        str: The value of the literal or None if the text is not a plain string literal.
+    """
+    text = text.strip()
+
+    if len(text) >= 3 and text[0] == '@' and text[1] in '"\'' and text[-1] == text[1]:
+        return text[2:-1]
+
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        return None
+
+    value = []
+    index = 1
+    while index < len(text) - 1:
+        char = text[index]
+        if char == '"':
+            # Concatenated or unterminated strings aren't plain literals
+            return None
+        if char == '\\' and index + 1 < len(text) - 1:
+            escape = text[index + 1]
+            if escape == 'u' and re.fullmatch(r'[0-9a-fA-F]{4}', text[index + 2:index + 6]):
+                value.append(chr(int(text[index + 2:index + 6], 16)))
+                index += 6
+                continue
+            if escape == 'x' and re.fullmatch(r'[0-9a-fA-F]{2}', text[index + 2:index + 4]):
+                value.append(chr(int(text[index + 2:index + 4], 16)))
+                index += 4
+                continue
+            value.append(STRING_ESCAPES.get(escape, escape))
+            index += 2
+            continue
+        value.append(char)
+        index += 1
+
+    return ''.join(value)
+
+def parse_struct_fields(source: str, masked: str, start: int, end: int) -> Optional[dict[str, str]]:
+    """
+    Parses the top level fields of a struct literal ('{ key: value, ... }') spanning the given offsets.
+
+    Returns:
+        dict[str, str]: Maps each field name to its (whitespace normalized) source text, or None if the text is not a struct literal.
+    """
+    if masked[start] != '{' or find_closing(masked, start) != end - 1:
+        return None
+
+    fields = {}
+    for field_start, field_end in split_arguments(masked, start + 1, end - 1):
+        colon = masked.find(':', field_start, field_end)
+        if colon == -1:
+            continue
+        key = source[field_start:colon].strip()
+        fields[key] = ' '.join(source[colon + 1:field_end].split())
+
+    return fields
+
+def parse_yy(text: str) -> dict:
+    """
+    Parses a GameMaker resource file (.yy), which is JSON with trailing commas.
+    """
+    return json.loads(re.sub(r',(\s*[}\]])', r'\1', text))
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import struct
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+import aiohttp
+
+from utils import bench_utils
+
+ENDPOINTS = ['echo', 'status', 'gm_websocket', 'raw_websocket']
+
+# Status codes cycled through by the 'status' endpoint clients
+STATUS_CODES = [200, 201, 404, 503]
+
+# GM:Studio-Connect handshake (see 'TestFrameworkServer.gm_websocket_handler')
+GM_BANNER = b"GM:Studio-Connect\x00"
+GM_HANDSHAKE = struct.pack('<IIIi', 0xCAFEBABE, 0xDEADB00B, 16, 0)
+GM_HANDSHAKE_REPLY = struct.pack('<III', 0xDEAFBEAD, 0xF00DBEEB, 12)
+
+class LoadError(Exception):
+    """
+    Raised by a load client when the server reply is not the expected one.
+    """
+
+class LoadStats:
+    """
+    Counters of a single endpoint load test (shared by all of its clients).
+    """
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.handshakes: list[float] = []
+        self.errors: dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def add_error(self, error: Exception):
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def to_dict(self, elapsed: float) -> dict:
+        requests = len(self.latencies)
+        errors = sum(self.errors.values())
+        report = {
+            'requests': requests,
+            'errors': errors,
+            'error_rate': round(errors / (requests + errors), 6) if requests + errors else 0,
+            'error_types': self.errors,
+            'seconds': round(elapsed, 6),
+            'requests_per_second': round(requests / elapsed, 2) if elapsed else 0,
+            'sent_mb_per_second': round(self.bytes_sent / elapsed / 1000000, 3) if elapsed else 0,
+            'received_mb_per_second': round(self.bytes_received / elapsed / 1000000, 3) if elapsed else 0,
+            'latency': bench_utils.summarize(self.latencies),
+        }
+        if self.handshakes:
+            report['handshake'] = bench_utils.summarize(self.handshakes)
+        return report
+
+async def _timed(stats: LoadStats, request: Callable[[], Awaitable[None]]):
+    start = time.perf_counter()
+    await request()
+    stats.latencies.append(time.perf_counter() - start)
+
+async def http_echo_client(session: aiohttp.ClientSession, url: str, payload: bytes, stats: LoadStats, deadline: float, window: int = 1):
+    """
+    Posts the payload to '/echo' until the deadline, checking that it is echoed back.
+    """
+    async def request():
+        async with session.post(f'{url}/echo', data=payload) as response:
+            body = await response.read()
+            if response.status != 200 or body != payload:
+                raise LoadError(f'Unexpected echo reply (status {response.status}, {len(body)} bytes)')
+            stats.bytes_sent += len(payload)
+            stats.bytes_received += len(body)
+
+    while time.perf_counter() < deadline:
+        try:
+            await _timed(stats, request)
+        except (aiohttp.ClientError, LoadError, asyncio.TimeoutError) as error:
+            stats.add_error(error)
+
+async def http_status_client(session: aiohttp.ClientSession, url: str, payload: bytes, stats: LoadStats, deadline: float, window: int = 1):
+    """
+    Requests '/status/{status}' (cycling through STATUS_CODES) until the deadline, checking the returned status.
+    """
+    index = 0
+
+    while time.perf_counter() < deadline:
+        status = STATUS_CODES[index % len(STATUS_CODES)]
+        index += 1
+
+        async def request():
+            async with session.get(f'{url}/status/{status}') as response:
+                body = await response.read()
+                if response.status != status:
+                    raise LoadError(f'Unexpected status {response.status} (expected {status})')
+                stats.bytes_received += len(body)
+
+        try:
+            await _timed(stats, request)
+        except (aiohttp.ClientError, LoadError, asyncio.TimeoutError) as error:
+            stats.add_error(error)
+
+async def _websocket_echo(ws: aiohttp.ClientWebSocketResponse, payload: bytes, stats: LoadStats, deadline: float, window: int):
+    """
+    Echoes the payload until the deadline, keeping up to 'window' messages in flight (pipelining).
+    """
+    in_flight: deque[float] = deque()
+
+    while (time.perf_counter() < deadline or in_flight) and not ws.closed:
+        while len(in_flight) < window and time.perf_counter() < deadline:
+            in_flight.append(time.perf_counter())
+            await ws.send_bytes(payload)
+            stats.bytes_sent += len(payload)
+
+        if not in_flight:
+            break
+
+        msg = await ws.receive()
+        if msg.type != aiohttp.WSMsgType.BINARY or msg.data != payload:
+            stats.add_error(LoadError(f'Unexpected echo reply ({msg.type.name})'))
+            return
+
+        stats.latencies.append(time.perf_counter() - in_flight.popleft())
+        stats.bytes_received += len(msg.data)
+
+async def gm_websocket_client(session: aiohttp.ClientSession, url: str, payload: bytes, stats: LoadStats, deadline: float, window: int = 1):
+    """
+    Connects to '/gm_websocket', performs the GM:Studio-Connect handshake and echoes the payload until the deadline.
+    A failed connection or handshake counts as an error and the client reconnects.
+    """
+    while time.perf_counter() < deadline:
+        try:
+            start = time.perf_counter()
+            async with session.ws_connect(f'{url}/gm_websocket', receive_timeout=session.timeout.total) as ws:
+                banner = await ws.receive_bytes()
+                if banner != GM_BANNER:
+                    raise LoadError(f'Unexpected banner {banner!r}')
+
+                await ws.send_bytes(GM_HANDSHAKE)
+                if await ws.receive_bytes() != GM_HANDSHAKE_REPLY:
+                    raise LoadError('Unexpected handshake reply')
+                stats.handshakes.append(time.perf_counter() - start)
+
+                await _websocket_echo(ws, payload, stats, deadline, window)
+        except (aiohttp.ClientError, LoadError, TypeError, asyncio.TimeoutError) as error:
+            stats.add_error(error)
+
+async def raw_websocket_client(session: aiohttp.ClientSession, url: str, payload: bytes, stats: LoadStats, deadline: float, window: int = 1):
+    """
+    Connects to '/raw_websocket' and echoes the payload until the deadline (reconnecting on failures).
+    """
+    while time.perf_counter() < deadline:
+        try:
+            start = time.perf_counter()
+            async with session.ws_connect(f'{url}/raw_websocket', receive_timeout=session.timeout.total) as ws:
+                stats.handshakes.append(time.perf_counter() - start)
+                await _websocket_echo(ws, payload, stats, deadline, window)
+        except (aiohttp.ClientError, LoadError, asyncio.TimeoutError) as error:
+            stats.add_error(error)
+
+CLIENTS = {
+    'echo': http_echo_client,
+    'status': http_status_client,
+    'gm_websocket': gm_websocket_client,
+    'raw_websocket': raw_websocket_client,
+}
+
+async def run_load_test(url: str, endpoint: str, clients: int, duration: float, payload_size: int, timeout: float = 10, window: int = 1) -> dict:
+    """
+    Runs concurrent clients against one of the TestFrameworkServer endpoints.
+
+    Args:
+        url (str): The base url of the server (ie.: http://127.0.0.1:8080).
+        endpoint (str): One of ENDPOINTS.
+        clients (int): The number of concurrent clients (connections).
+        duration (float): How long the clients keep sending requests (in seconds).
+        payload_size (int): The size of the echoed payloads (in bytes).
+        timeout (float): Timeout of each request (in seconds).
+        window (int): The number of messages each websocket client keeps in flight (HTTP clients ignore it).
+
+    Returns:
+        dict: The throughput, latency percentiles and error rates of the endpoint.
+    """
+    stats = LoadStats()
+    payload = os.urandom(payload_size)
+    connector = aiohttp.TCPConnector(limit=clients)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[CLIENTS[endpoint](session, url, payload, stats, deadline, window) for _ in range(clients)])
+        elapsed = time.perf_counter() - start
+
+    return { 'clients': clients, 'payload_bytes': payload_size, 'window': window, **stats.to_dict(elapsed) }
@@ -0,0 +1,148 @@
+import datetime
+import json
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree
+from xml.sax.saxutils import quoteattr
+
+from classes.model.TestResult import TestResult
+from utils import file_utils
+from utils.logging_utils import LOGGER
+
+# Suffix added to the run name of sharded runs (ie.: 'xUnit_windows_vm_shard3of8')
+SHARD_SUFFIX = re.compile(r'_shard\d+of\d+$')
+
+class Tallies:
+    """
+    Running totals of a suite (or of the whole run), matching the ones computed by the result models.
+    """
+
+    def __init__(self, timestamp: float = 0):
+        self.timestamp = timestamp
+        self.tests = 0
+        self.failures = 0
+        self.errors = 0
+        self.skipped = 0
+        self.assertions = 0
+        self.time = 0.0
+
+    def add_test(self, test: dict):
+        result = str(test.get('result', '')).lower()
+        self.tests += 1
+        self.failures += result in ['failed', 'expired']
+        self.errors += len(test.get('exceptions') or []) != 0
+        self.skipped += result == 'skipped'
+        self.assertions += test.get('assertions', 0)
+        self.time += test.get('time', 0)
+
+    def add(self, other: 'Tallies'):
+        self.timestamp = min(self.timestamp, other.timestamp) if self.timestamp else other.timestamp
+        for name in ['tests', 'failures', 'errors', 'skipped', 'assertions', 'time']:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self) -> dict:
+        return { 'tests': self.tests, 'failures': self.failures, 'errors': self.errors, 'skipped': self.skipped, 'assertions': self.assertions }
+
+    def get_iso_timestamp(self):
+        return datetime.datetime.fromtimestamp(self.timestamp).isoformat()
+
+    def to_xml_attributes(self, name: str) -> str:
+        attributes = { 'name': name, **{ key: str(value) for key, value in self.to_dict().items() }, 'time': str(self.time), 'timestamp': self.get_iso_timestamp() }
+        return ' '.join(f'{key}={quoteattr(value)}' for key, value in attributes.items())
+
+def get_result_files(inputs: list[Path]) -> list[Path]:
+    """
+    Expands the given files and folders into the list of result JSON files to merge.
+    """
+    files = []
+    for path in inputs:
+        files += sorted(path.glob('*.json')) if path.is_dir() else [path]
+    return files
+
+def get_run_name(file: Path) -> str:
+    """
+    Returns the run name of a result file (from its file name, without the shard suffix).
+    """
+    return SHARD_SUFFIX.sub('', file.stem)
+
+def merge_result_files(files: list[Path], output_path: Path, filename: str, run_name: Optional[str] = None) -> dict:
+    """
+    Merges result files (as written by the servers) into a single JSON and JUnit XML pair. Only one
+    input file is loaded at a time, the tests are spooled to disk (per suite) and then streamed
+    into both outputs once the tallies are known.
+
+    Args:
+        files (list[Path]): The result JSON files to merge (ie.: one per shard).
+        output_path (Path): The folder where the merged files are written.
+        filename (str): The name (without extension) of the merged files.
+        run_name (str): The name of the merged run (defaults to the first file's run without the shard suffix).
+
+    Returns:
+        dict: The tallies of the merged run.
+    """
+    total = Tallies()
+    suites: dict[str, Tallies] = {}
+    # Spool files are named after the suite position (names aren't always valid file names)
+    spools: dict[str, Path] = {}
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        spool_path = Path(spool_dir)
+
+        for file in files:
+            data = file_utils.read_data_from_json(file)
+            if not isinstance(data, dict) or 'testsuites' not in data:
+                LOGGER.warning(f"Skipping {file}, not a result file.")
+                continue
+
+            run_name = run_name or SHARD_SUFFIX.sub('', data.get('name', 'xUnit'))
+
+            for suite in data['testsuites']:
+                name = suite['name']
+                if name not in suites:
+                    suites[name] = Tallies(suite.get('timestamp', 0))
+                    spools[name] = spool_path / f'{len(spools)}.ndjson'
+
+                tallies = suites[name]
+                tallies.timestamp = min(tallies.timestamp, suite.get('timestamp', tallies.timestamp))
+
+                with open(spools[name], 'a', encoding='utf-8') as spool:
+                    for test in suite.get('tests', []):
+                        tallies.add_test(test)
+                        spool.write(json.dumps(test) + '\n')
+
+            LOGGER.info(f"Merged {file}")
+            del data
+
+        for tallies in suites.values():
+            total.add(tallies)
+
+        run_name = run_name or 'xUnit'
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        with open(output_path / f'{filename}.json', 'w', encoding='utf-8') as json_file, open(output_path / f'{filename}.xml', 'w', encoding='utf-8') as xml_file:
+            json_file.write(json.dumps({ 'name': run_name, 'tallies': total.to_dict(), 'time': total.time, 'timestamp': total.timestamp, 'timestamp_iso': total.get_iso_timestamp() })[:-1] + ', "testsuites": [')
+            xml_file.write(f"<?xml version='1.0' encoding='UTF-8'?>\n<testsuites {total.to_xml_attributes(run_name)}>")
+
+            for index, (name, tallies) in enumerate(suites.items()):
+                header = { 'name': name, 'tallies': tallies.to_dict(), 'time': tallies.time, 'timestamp': tallies.timestamp, 'timestamp_iso': tallies.get_iso_timestamp() }
+                json_file.write((', ' if index else '') + json.dumps(header)[:-1] + ', "tests": [')
+                xml_file.write(f'<testsuite {tallies.to_xml_attributes(f"{name}:{run_name}")}>')
+
+                with open(spools[name], encoding='utf-8') as spool:
+                    for line_index, line in enumerate(spool):
+                        json_file.write((', ' if line_index else '') + line.rstrip('\n'))
+
+                        test: dict = json.loads(line)
+                        result = TestResult(**{ **test, 'duration': test.get('time', 0) * 1000000 })
+                        xml_file.write(ElementTree.tostring(result.to_xml(), encoding='unicode'))
+
+                json_file.write(']}')
+                xml_file.write('</testsuite>')
+
+            json_file.write(']}')
+            xml_file.write('</testsuites>')
+
+    LOGGER.info(f"Merged {len(files)} result files into {output_path / filename} ({total.to_dict()})")
+    return total.to_dict()
@@ -0,0 +1,145 @@
+import asyncio
+import bisect
+import math
+import time
+from typing import Callable, Optional
+
+# Default buckets (in seconds) for latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Metric:
+    """
+    Base class of the metrics, values are kept per label values tuple (in the order of 'label_names').
+    Updating a metric is a dictionary access, nothing is formatted until the metrics are rendered.
+    Metrics with a callback compute their values when rendered instead (the callback returns a
+    { labels: value } dictionary), for values that are already counted elsewhere.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), callback: Optional[Callable[[], dict[tuple, float]]] = None):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.callback = callback
+        self.values: dict[tuple, float] = {}
+
+    def get(self, labels: tuple = ()) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        if self.callback is not None:
+            self.values = self.callback()
+        return [f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}' for labels, value in self.values.items()]
+
+    def render(self) -> list[str]:
+        return [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type}'] + self.samples()
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, labels: tuple = ()):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, labels: tuple = ()):
+        self.values[labels] = value
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.counts: dict[tuple, list[int]] = {}
+        self.sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def get(self, labels: tuple = ()) -> float:
+        return sum(self.counts.get(labels, []))
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, 'le="' + _format_value(bound) + '"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(self.sums[labels])}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the launcher process, rendered in the Prometheus text format by '/metrics'.
+    Registering the same name twice returns the existing metric (with the latest callback).
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def _register(self, cls, name: str, *args, **kwargs) -> Metric:
+        if name not in self.metrics:
+            self.metrics[name] = cls(name, *args, **kwargs)
+        elif kwargs.get('callback') is not None:
+            self.metrics[name].callback = kwargs['callback']
+        return self.metrics[name]
+
+    def counter(self, name: str, description: str, label_names: tuple = (), callback: Optional[Callable[[], dict[tuple, float]]] = None) -> Counter:
+        return self._register(Counter, name, description, label_names, callback=callback)
+
+    def gauge(self, name: str, description: str, label_names: tuple = (), callback: Optional[Callable[[], dict[tuple, float]]] = None) -> Gauge:
+        return self._register(Gauge, name, description, label_names, callback=callback)
+
+    def histogram(self, name: str, description: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, description, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+EVENT_LOOP_LAG = REGISTRY.histogram('gmtf_event_loop_lag_seconds', 'How late the event loop wakes up a sleeping task', buckets=LAG_BUCKETS)
+EVENT_LOOP_LAG_LAST = REGISTRY.gauge('gmtf_event_loop_lag_last_seconds', 'The last measured event loop lag')
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    Measures the event loop lag (how late a sleep of 'interval' seconds wakes up) until cancelled.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - start - interval, 0)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
@@ -1,20 +1,36 @@
-import random
+import functools
+import os
 import socket
-import requests
 
 from utils.logging_utils import LOGGER
 
-def get_random_available_port():
-    while True:
-        port = random.randint(49152, 65535)
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            try:
-                s.bind(("", port))
-                return port  # Return the port if it is available
-            except OSError:
-                continue  # If the port is in use, try another one
+def reserve_port(host: str = '', port: int = 0) -> socket.socket:
+    """
+    Returns a listening TCP socket bound to the given port (0 lets the OS pick a free one, read it
+    with 'sock.getsockname()[1]'). Hand the socket itself to the server (asyncio.start_server(sock=...)
+    or aiohttp's SockSite) instead of the port number, so no other process can take the port in between.
 
+    Raises:
+        OSError: If the port is already in use.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        # Allows binding again while old connections are in TIME_WAIT (on Windows it would allow sharing the port)
+        if os.name != 'nt':
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(128)
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+@functools.cache
 def get_local_ip() -> str:
+    """
+    Returns the address of the interface used to reach the network (the first call opens a socket, the result is cached).
+    """
     try:
         # Create a temporary UDP socket to determine the local IP address
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as temp_socket:
@@ -27,6 +43,8 @@ def get_local_ip() -> str:
     return local_ip
 
 def query_url(url: str) -> str:
+    import requests
+
     LOGGER.info(f'Querying URL: {url}')
     try:
         response = requests.get(url)
@@ -0,0 +1,115 @@
+import argparse
+import heapq
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from utils import file_utils
+from utils.logging_utils import LOGGER
+
+SHARD_STRATEGIES = ['hash', 'duration']
+
+def validate_shard(value: str) -> tuple[int, int]:
+    """
+    Parses a shard in the 'k/n' format (1 based).
+
+    Raises:
+        argparse.ArgumentTypeError: If the format is not valid.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Invalid shard "{value}" (follow the format "<INDEX>/<COUNT>", ie.: 3/8)')
+
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f'Invalid shard "{value}" (index must be between 1 and {count})')
+
+    return index, count
+
+def get_hash_shard(test: str, count: int) -> int:
+    """
+    Returns the (0 based) shard of a test, only depends on the test path (stable across runs and machines).
+    """
+    return zlib.crc32(test.encode()) % count
+
+def assign_by_duration(tests: list[str], count: int, durations: dict[str, float]) -> dict[str, int]:
+    """
+    Assigns the tests to shards balancing their total duration (longest tests first, each to the
+    currently lightest shard). Tests without a known duration are assumed to take the average one.
+
+    Returns:
+        dict[str, int]: Maps each test to its (0 based) shard.
+    """
+    known = [durations[test] for test in tests if test in durations]
+    default = sum(known) / len(known) if known else 1
+
+    # Sort by duration (path breaks ties so the assignment is deterministic)
+    ordered = sorted(tests, key=lambda test: (-durations.get(test, default), test))
+
+    loads = [(0.0, shard) for shard in range(count)]
+    assignment = {}
+    for test in ordered:
+        load, shard = heapq.heappop(loads)
+        assignment[test] = shard
+        heapq.heappush(loads, (load + durations.get(test, default), shard))
+
+    return assignment
+
+def select_shard(tests: list[str], shard: tuple[int, int], strategy: str = 'hash', durations: Optional[dict[str, float]] = None) -> list[str]:
+    """
+    Selects the tests of a shard (keeping their original order).
+
+    Args:
+        tests (list[str]): The full list of test paths.
+        shard (tuple[int, int]): The shard (1 based index, count).
+        strategy (str): Either 'hash' or 'duration'.
+        durations (dict[str, float]): Known test durations (required by the 'duration' strategy).
+
+    Returns:
+        list[str]: The test paths that belong to the shard.
+    """
+    index, count = shard
+
+    if strategy == 'duration' and durations:
+        assignment = assign_by_duration(tests, count, durations)
+        return [test for test in tests if assignment[test] == index - 1]
+
+    if strategy == 'duration':
+        LOGGER.warning("No test durations available, falling back to hash based sharding.")
+
+    return [test for test in tests if get_hash_shard(test, count) == index - 1]
+
+def load_durations(path: Path) -> dict[str, float]:
+    """
+    Loads the test durations (in seconds) from previous result files (a JSON file or a folder with them).
+
+    Returns:
+        dict[str, float]: Maps each test path ('<suite>@<test>') to its duration.
+    """
+    files = sorted(path.glob('*.json')) if path.is_dir() else [path]
+    durations = {}
+
+    for file in files:
+        data = file_utils.read_data_from_json(file)
+        if not isinstance(data, dict):
+            continue
+
+        for suite in data.get('testsuites', []):
+            for test in suite.get('tests', []):
+                durations[f"{suite['name']}@{test['name']}"] = test.get('time', 0)
+
+    LOGGER.info(f"Loaded durations for {len(durations)} tests from {path}")
+    return durations
+
+def get_run_suffix(shard: Optional[tuple[int, int]]) -> str:
+    """
+    Returns the suffix added to the run name of a shard (removed again when merging results).
+    """
+    return f'_shard{shard[0]}of{shard[1]}' if shard else ''
+
+def get_server_options(shard: Optional[tuple[int, int]], strategy: str = 'hash', durations_path: Optional[str] = None) -> dict:
+    """
+    Builds the sharding options of the remote control server from the command line options.
+    """
+    durations = load_durations(Path(durations_path)) if shard and strategy == 'duration' and durations_path else None
+    return { 'shard': shard, 'shard_strategy': strategy, 'durations': durations }
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from utils.logging_utils import LOGGER
+from utils.trace_utils import TRACER
+
+class Stage:
+    """
+    A step of a pipeline. 'func' receives the results of the finished stages (by name) and
+    returns this stage's result, it starts as soon as all the stages it 'depends' on are done.
+    """
+
+    def __init__(self, name: str, func: Callable[[dict[str, Any]], Awaitable[Any]], depends: tuple[str, ...] = ()):
+        self.name = name
+        self.func = func
+        self.depends = tuple(depends)
+
+def sort_stages(stages: list[Stage]) -> list[Stage]:
+    """
+    Returns the stages in dependency order.
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage or the dependencies have a cycle.
+    """
+    by_name = { stage.name: stage for stage in stages }
+    ordered: list[Stage] = []
+    visiting: set[str] = set()
+    visited: set[str] = set()
+
+    def visit(stage: Stage):
+        if stage.name in visited:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Stage '{stage.name}' is part of a dependency cycle")
+
+        visiting.add(stage.name)
+        for name in stage.depends:
+            if name not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{name}'")
+            visit(by_name[name])
+        visiting.discard(stage.name)
+
+        visited.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+async def run_stages(stages: list[Stage], track: str = 'setup') -> dict[str, Any]:
+    """
+    Runs the stages with as much concurrency as their dependencies allow, logging (and tracing)
+    the time each one took. When a stage fails the stages still running or waiting are cancelled
+    and its exception is raised (blocking work already handed to a thread finishes in the background).
+
+    Returns:
+        dict[str, Any]: The result of each stage (by name).
+    """
+    ordered = sort_stages(stages)
+    results: dict[str, Any] = {}
+    timings: dict[str, float] = {}
+    tasks: dict[str, asyncio.Task] = {}
+    failures: list[tuple[str, BaseException]] = []
+
+    async def run(index: int, stage: Stage):
+        if stage.depends:
+            await asyncio.gather(*[tasks[name] for name in stage.depends])
+
+        LOGGER.info(f"Stage '{stage.name}' started")
+        start = time.perf_counter()
+        try:
+            results[stage.name] = await stage.func(results)
+        except Exception as error:
+            failures.append((stage.name, error))
+            raise
+        timings[stage.name] = time.perf_counter() - start
+
+        TRACER.complete(stage.name, start, track=track, async_id=index)
+        LOGGER.info(f"Stage '{stage.name}' finished in {timings[stage.name]:.2f}s")
+
+    start = time.perf_counter()
+    for index, stage in enumerate(ordered):
+        tasks[stage.name] = asyncio.create_task(run(index, stage), name=stage.name)
+
+    try:
+        await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+
+        if failures:
+            name, error = failures[0]
+            cancelled = [task.get_name() for task in tasks.values() if not task.done()]
+            LOGGER.error(f"Stage '{name}' failed ({type(error).__name__}: {error}), cancelling {cancelled}")
+            raise error
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    total = time.perf_counter() - start
+    summary = ', '.join(f'{name}={seconds:.2f}s' for name, seconds in timings.items())
+    LOGGER.info(f"Stages finished in {total:.2f}s (sequential: {sum(timings.values()):.2f}s): {summary}")
+    return results
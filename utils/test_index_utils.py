@@ -0,0 +1,302 @@
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+from classes.model.TestIndex import IndexedSuite, IndexedTest, TestIndex
+from utils import cache_utils, file_utils, gml_utils
+from utils.logging_utils import LOGGER
+
+# Bump whenever the indexer output changes (invalidates existing caches)
+INDEX_VERSION = 1
+
+SUITE_DECLARATION = re.compile(r'\bfunction\s+(\w+)\s*\([^)]*\)\s*:\s*TestSuite\s*\(\s*\)\s*constructor\s*\{')
+SUITE_REGISTRATION = re.compile(r'\btestFramework\s*\.\s*addSuite\s*\(\s*(\w+)\s*\)')
+
+# Maps each of the 'TestSuite' methods to the kind of test it adds and the position of its arguments
+TEST_FUNCTIONS = {
+    'addFact': { 'kind': 'fact', 'object': None, 'options': 2 },
+    'addTheory': { 'kind': 'theory', 'object': None, 'options': 3 },
+    'addTestAsync': { 'kind': 'async', 'object': 1, 'options': 3 },
+    'addObjectTest': { 'kind': 'async', 'object': 1, 'options': 2 },
+}
+
+# The only async handler that is not exclusive by default (see 'TestAsync.gml')
+CONCURRENT_OBJECT = 'objTestAsync'
+
+# The platforms (as used by the launcher targets) for which each of the predicates in 'platform_filters.gml' holds
+ALL_PLATFORMS = ['windows', 'mac', 'linux', 'android', 'ios', 'ipad', 'tvos', 'HTML5', 'ps4', 'ps5']
+PLATFORM_PREDICATES = {
+    'platform_not_browser': [platform for platform in ALL_PLATFORMS if platform != 'HTML5'],
+    'platform_browser': ['HTML5'],
+    'platform_android': ['android'],
+    'platform_ios': ['ios', 'ipad'],
+    'platform_mobile': ['android', 'ios', 'ipad'],
+    'platform_windows': ['windows'],
+    'platform_macosx': ['mac'],
+    'platform_linux': ['linux'],
+    'platform_desktop': ['windows', 'mac', 'linux'],
+    'platform_console': ['ps4', 'ps5'],
+    'platform_not_console': [platform for platform in ALL_PLATFORMS if platform not in ['ps4', 'ps5']],
+}
+
+FILTER_FUNCTION = re.compile(r'^function\s*\(\s*\)\s*\{\s*return\s+(.+?);?\s*\}$')
+FILTER_TOKEN = re.compile(r'\s*(?:(\w+)\s*\(\s*\)|(\w+)|(&&|\|\||!|\(|\)))')
+
+def fingerprint_files(*paths: Path) -> str:
+    """
+    Computes a fingerprint of the contents of the given files (missing files are skipped).
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if path.exists():
+            digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def evaluate_filter(expression: Optional[str], platform: str) -> Optional[bool]:
+    """
+    Statically evaluates a platform filter for the given target platform. Only the predicates
+    from 'platform_filters.gml' (used directly or combined with '!', '&&' and '||' inside a
+    function literal) can be evaluated.
+
+    Args:
+        expression (str): The filter source (as stored in the index).
+        platform (str): The target platform (as used by the launcher, ie.: windows, HTML5, android).
+
+    Returns:
+        bool: Whether the test runs on the platform, or None if it can only be known at runtime.
+    """
+    if expression is None:
+        return True
+
+    if expression in PLATFORM_PREDICATES:
+        return platform in PLATFORM_PREDICATES[expression]
+
+    if expression == 'function() { return false; }':
+        return False
+
+    match = FILTER_FUNCTION.match(expression)
+    if not match:
+        return None
+
+    body = match.group(1)
+    python_tokens = []
+    position = 0
+    while position < len(body):
+        token = FILTER_TOKEN.match(body, position)
+        if not token or token.end() == position:
+            return None
+        position = token.end()
+
+        call, name, operator = token.groups()
+        if call is not None:
+            if call not in PLATFORM_PREDICATES:
+                return None
+            python_tokens.append(str(platform in PLATFORM_PREDICATES[call]))
+        elif name is not None:
+            if name not in ['true', 'false']:
+                return None
+            python_tokens.append(name.capitalize())
+        else:
+            python_tokens.append({ '&&': 'and', '||': 'or', '!': 'not' }.get(operator, operator))
+
+    try:
+        return bool(eval(' '.join(python_tokens), { '__builtins__': {} }))
+    except SyntaxError:
+        return None
+
+def index_suite_file(gml_path: Path, yy_path: Optional[Path] = None) -> list[IndexedSuite]:
+    """
+    Extracts the test suites declared in a GML script (and its .yy metadata).
+
+    Args:
+        gml_path (Path): The path to the script source.
+        yy_path (Path): The path to the script resource file (optional).
+
+    Returns:
+        list[IndexedSuite]: The suites (with their tests in declaration order).
+    """
+    source = gml_path.read_text(encoding='utf-8-sig')
+    masked = gml_utils.mask_source(source)
+
+    metadata = {}
+    if yy_path and yy_path.exists():
+        try:
+            metadata = gml_utils.parse_yy(yy_path.read_text(encoding='utf-8-sig'))
+        except ValueError as e:
+            LOGGER.warning(f"Failed to parse resource file {yy_path}: {e}")
+
+    suites = []
+    for declaration in SUITE_DECLARATION.finditer(masked):
+        body_start = declaration.end() - 1
+        body_end = gml_utils.find_closing(masked, body_start)
+        if body_end == -1:
+            LOGGER.warning(f"Unterminated suite '{declaration.group(1)}' in {gml_path}")
+            continue
+
+        suite = IndexedSuite(
+            name=declaration.group(1),
+            file=gml_path.name,
+            tags=metadata.get('tags', []),
+            folder=(metadata.get('parent') or {}).get('path'))
+
+        # Suite options ('config({ suite_filter: ... })')
+        for _, _, spans in gml_utils.find_calls(masked, ['config'], body_start, body_end):
+            if spans:
+                fields = gml_utils.parse_struct_fields(source, masked, *spans[0]) or {}
+                suite.platform_filter = fields.get('suite_filter', suite.platform_filter)
+
+        # Test declarations (the 'x' prefixed variants are added but always filtered)
+        function_names = list(TEST_FUNCTIONS) + [f'x{name}' for name in TEST_FUNCTIONS]
+        for function_name, offset, spans in gml_utils.find_calls(masked, function_names, body_start, body_end):
+            disabled = function_name.startswith('x')
+            spec = TEST_FUNCTIONS[function_name[1:] if disabled else function_name]
+
+            test = IndexedTest(kind=spec['kind'], line=source.count('\n', 0, offset) + 1, disabled=disabled)
+            if spans:
+                test.name = gml_utils.parse_string_literal(source[slice(*spans[0])])
+
+            if spec['object'] is not None and len(spans) > spec['object']:
+                test.object = source[slice(*spans[spec['object']])]
+
+            # Theories are handled by 'objTest', only the generic async handler is concurrent
+            test.exclusive = test.is_async() and test.object != CONCURRENT_OBJECT
+
+            if len(spans) > spec['options']:
+                fields = gml_utils.parse_struct_fields(source, masked, *spans[spec['options']]) or {}
+                test.platform_filter = fields.get('test_filter')
+                if fields.get('test_exclusive') in ['true', 'false']:
+                    test.exclusive = fields['test_exclusive'] == 'true'
+
+            if disabled:
+                test.platform_filter = 'function() { return false; }'
+
+            suite.tests.append(test)
+
+        suites.append(suite)
+
+    return suites
+
+def get_registered_suites(project_folder: Path) -> list[str]:
+    """
+    Returns the suite names registered by the runner (in registration order).
+    """
+    create_event = project_folder / 'objects' / 'objRunner' / 'Create_0.gml'
+    if not create_event.exists():
+        LOGGER.warning(f"Runner create event not found: {create_event}")
+        return []
+
+    masked = gml_utils.mask_source(create_event.read_text(encoding='utf-8-sig'))
+    return [match.group(1) for match in SUITE_REGISTRATION.finditer(masked)]
+
+def build_test_index(project_folder: Path, cache_file: Optional[Path] = None) -> TestIndex:
+    """
+    Builds the test index of a project from its '*TestSuite' scripts without building the project.
+    Suites are only parsed again when the fingerprint of their files changes.
+
+    Args:
+        project_folder (Path): The project folder (the one containing the .yyp file).
+        cache_file (Path): The JSON file used to cache the parsed suites (optional).
+
+    Returns:
+        TestIndex: The index, with the registered suites first (in registration order).
+    """
+    cache = {}
+    if cache_file and cache_file.exists():
+        try:
+            data: dict = file_utils.read_data_from_json(cache_file)
+            if data.get('version') == INDEX_VERSION:
+                cache = data.get('files', {})
+        except Exception as e:
+            LOGGER.warning(f"Ignoring invalid test index cache {cache_file}: {e}")
+
+    files = {}
+    suites: list[IndexedSuite] = []
+    parsed = 0
+
+    for gml_path in sorted((project_folder / 'scripts').glob('*TestSuite/*.gml')):
+        yy_path = gml_path.with_suffix('.yy')
+        key = gml_path.relative_to(project_folder).as_posix()
+        fingerprint = fingerprint_files(gml_path, yy_path)
+
+        cached = cache.get(key)
+        if cached and cached.get('fingerprint') == fingerprint:
+            file_suites = [IndexedSuite(**suite) for suite in cached['suites']]
+        else:
+            file_suites = index_suite_file(gml_path, yy_path)
+            parsed += 1
+
+        for suite in file_suites:
+            suite.fingerprint = fingerprint
+            suite.registered = False
+
+        files[key] = { 'fingerprint': fingerprint, 'suites': [suite.model_dump() for suite in file_suites] }
+        suites += file_suites
+
+    # Order suites the same way the runner registers them
+    registered = get_registered_suites(project_folder)
+    for suite in suites:
+        suite.registered = suite.name in registered
+    suites.sort(key=lambda suite: registered.index(suite.name) if suite.registered else len(registered))
+
+    for name in registered:
+        if not any(suite.name == name for suite in suites):
+            LOGGER.warning(f"Suite '{name}' is registered by the runner but wasn't found in the scripts")
+
+    LOGGER.debug(f"Test index built ({parsed} of {len(files)} files parsed)")
+
+    if cache_file and (parsed or files.keys() != cache.keys()):
+        # The cache is shared by concurrent launchers, it's replaced in one go so readers never see a partial file
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with cache_utils.FileLock(cache_file.with_suffix('.lock'), timeout=60):
+            temp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            file_utils.save_data_as_json({ 'version': INDEX_VERSION, 'files': files }, temp_file)
+            os.replace(temp_file, cache_file)
+
+    return TestIndex(project=project_folder.name, suites=suites)
+
+def compare_test_paths(expected: list[str], actual: list[str]) -> dict:
+    """
+    Compares the test paths from the index with the ones reported by the runner (TESTS command).
+
+    Returns:
+        dict: The 'missing' (indexed but not reported) and 'unexpected' (reported but not indexed)
+        paths and whether both lists match (including order).
+    """
+    expected_set = set(expected)
+    actual_set = set(actual)
+
+    return {
+        'matches': expected == actual,
+        'same_order': [path for path in expected if path in actual_set] == [path for path in actual if path in expected_set],
+        'missing': [path for path in expected if path not in actual_set],
+        'unexpected': [path for path in actual if path not in expected_set],
+    }
+
+def select_test_paths(index: TestIndex, platform: Optional[str] = None) -> list[str]:
+    """
+    Returns the test paths of the index that can run on the given platform. Tests whose
+    filters can only be evaluated at runtime are kept.
+    """
+    paths = []
+    for suite in index.get_registered_suites():
+        if platform and evaluate_filter(suite.platform_filter, platform) is False:
+            continue
+        paths += [f'{suite.name}@{test.name}' for test in suite.tests if test.name is not None and not (platform and evaluate_filter(test.platform_filter, platform) is False)]
+    return paths
+
+def log_comparison(comparison: dict):
+    """
+    Logs the result of 'compare_test_paths'.
+    """
+    if comparison['matches']:
+        LOGGER.info("Test index matches the tests reported by the runner.")
+        return
+
+    LOGGER.warning(f"Test index doesn't match the tests reported by the runner ({len(comparison['missing'])} missing, {len(comparison['unexpected'])} unexpected, same order: {comparison['same_order']})")
+    for path in comparison['missing']:
+        LOGGER.warning(f"Indexed but not reported: {path}")
+    for path in comparison['unexpected']:
+        LOGGER.warning(f"Reported but not indexed: {path}")
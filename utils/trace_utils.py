@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+class Tracer:
+    """
+    Collects spans in the Chrome trace event format (open the saved file in chrome://tracing or
+    https://ui.perfetto.dev). Spans are grouped in named tracks (shown as threads), overlapping spans
+    (ie.: multiplexed tests) are written as async events so they get their own rows.
+
+    The tracer is disabled until 'start' is called, spans are then a list append each.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[Path] = None
+        self.origin = time.perf_counter()
+        self.events: list[dict] = []
+        self.tracks: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def start(self, path: Path):
+        self.enabled = True
+        self.path = path
+        self.origin = time.perf_counter()
+        self.events = []
+        self.tracks = {}
+
+    def _timestamp(self, perf_time: float) -> float:
+        return round((perf_time - self.origin) * 1000000, 3)
+
+    def _track(self, track: str) -> int:
+        tid = self.tracks.get(track)
+        if tid is None:
+            tid = self.tracks[track] = len(self.tracks) + 1
+            self.events.append({ 'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': { 'name': track } })
+        return tid
+
+    def complete(self, name: str, start: float, end: Optional[float] = None, track: str = 'launcher', category: str = 'launcher', async_id: Optional[int] = None, **args):
+        """
+        Adds a span that already finished (times from 'time.perf_counter').
+
+        Args:
+            async_id (int): Set for spans that overlap others on the same track (written as async begin/end events).
+        """
+        if not self.enabled:
+            return
+
+        end = time.perf_counter() if end is None else end
+        with self.lock:
+            tid = self._track(track)
+            event = { 'name': name, 'cat': category, 'pid': os.getpid(), 'tid': tid, 'ts': self._timestamp(start) }
+            if args:
+                event['args'] = args
+
+            if async_id is None:
+                self.events.append({ **event, 'ph': 'X', 'dur': round((end - start) * 1000000, 3) })
+            else:
+                self.events.append({ **event, 'ph': 'b', 'id': async_id })
+                self.events.append({ 'name': name, 'cat': category, 'pid': event['pid'], 'tid': tid, 'ts': self._timestamp(end), 'ph': 'e', 'id': async_id })
+
+    def instant(self, name: str, track: str = 'launcher', category: str = 'launcher', **args):
+        """
+        Adds a point in time event (ie.: a runner restart).
+        """
+        if not self.enabled:
+            return
+
+        with self.lock:
+            event = { 'name': name, 'cat': category, 'ph': 'i', 's': 't', 'pid': os.getpid(), 'tid': self._track(track), 'ts': self._timestamp(time.perf_counter()) }
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, track: str = 'launcher', category: str = 'launcher', **args):
+        """
+        Times the enclosed block (works in both sync and async code).
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, track=track, category=category, **args)
+
+    def save(self, path: Optional[Path] = None) -> Optional[Path]:
+        """
+        Writes the collected events to the trace file.
+        """
+        path = path or self.path
+        if not self.enabled or path is None:
+            return None
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock, open(path, 'w', encoding='utf-8') as file:
+            json.dump({ 'traceEvents': self.events, 'displayTimeUnit': 'ms' }, file)
+        return path
+
+TRACER = Tracer()
+
+def describe_command(exe_path, args: list[str]) -> str:
+    """
+    Returns a short span name for an executable invocation: its name followed by the arguments
+    that are not options (ie.: 'igor.exe Runtime Install'). Option values are never included,
+    neither as '-key=value' nor as the argument following a '--key'.
+    """
+    verbs = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg.startswith('--') and len(arg) > 2 and '=' not in arg:
+            skip = True
+        elif arg and arg[0] not in '-/':
+            verbs.append(arg)
+    return ' '.join([Path(str(exe_path)).name] + verbs[-3:])
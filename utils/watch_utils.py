@@ -0,0 +1,78 @@
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+
+from utils.logging_utils import LOGGER
+
+# A file's state as seen by the watcher (modification time in nanoseconds, size)
+FileState = tuple[int, int]
+
+def snapshot_folder(folder: Path, ignored: frozenset[str] = frozenset()) -> dict[str, FileState]:
+    """
+    Returns the state of every file in the folder (by path relative to it, in posix form). Hidden files
+    and folders (ie.: '.git') and the 'ignored' paths (ie.: files written by the launcher) are skipped.
+    """
+    snapshot = {}
+    for root, folders, files in os.walk(folder):
+        folders[:] = [name for name in folders if not name.startswith('.')]
+        for name in files:
+            if name.startswith('.'):
+                continue
+
+            path = os.path.join(root, name)
+            key = Path(path).relative_to(folder).as_posix()
+            if key in ignored:
+                continue
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed while walking
+            snapshot[key] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def get_changes(old: dict[str, FileState], new: dict[str, FileState]) -> list[str]:
+    """
+    Returns the paths that were added, modified or removed between two snapshots (sorted).
+    """
+    return sorted(key for key in old.keys() | new.keys() if old.get(key) != new.get(key))
+
+async def wait_for_changes(folder: Path, snapshot: dict[str, FileState], poll_interval: float = 0.5, debounce: float = 0.3, ignored: frozenset[str] = frozenset()) -> tuple[dict[str, FileState], list[str]]:
+    """
+    Polls the folder until its files differ from 'snapshot'. Editors save in several steps (and several
+    files can be saved at once), the changes are only returned once the folder stayed unchanged for 'debounce' seconds.
+
+    Returns:
+        tuple[dict[str, FileState], list[str]]: The new snapshot and the changed paths.
+    """
+    while True:
+        await asyncio.sleep(poll_interval)
+        current = await asyncio.to_thread(snapshot_folder, folder, ignored)
+        if current != snapshot:
+            break
+
+    settled_at = time.monotonic()
+    while time.monotonic() - settled_at < debounce:
+        await asyncio.sleep(debounce / 3)
+        latest = await asyncio.to_thread(snapshot_folder, folder, ignored)
+        if latest != current:
+            current = latest
+            settled_at = time.monotonic()
+
+    return current, get_changes(snapshot, current)
+
+def sync_changes(source: Path, destination: Path, changes: list[str]):
+    """
+    Applies the changed paths of 'source' to a copy of it (copying modified files and removing deleted ones).
+    """
+    for key in changes:
+        source_path = source / key
+        destination_path = destination / key
+        if source_path.exists():
+            destination_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_path, destination_path)
+        elif destination_path.exists():
+            destination_path.unlink()
+        LOGGER.debug(f"Synced '{key}' to {destination}")